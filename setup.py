@@ -53,7 +53,8 @@ setup(
     entry_points={
         "console_scripts": [
             "ic_rename=app:rename",
-            # "ic_resize=app:resize"
+            "ic_rename_apply=app:rename_apply",
+            "ic_resize=app:resize",
         ]
     },
     tests_require=TEST_DEPENDENCIES,
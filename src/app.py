@@ -4,7 +4,13 @@ def rename():
     main()
 
 
-# todo implement resize module
-# def resize():
-#     from lib.resize import main
-#     main()
+def rename_apply():
+    from lib.plan import main
+
+    main()
+
+
+def resize():
+    from lib.resize import main
+
+    main()
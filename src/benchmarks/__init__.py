@@ -0,0 +1,25 @@
+import sys
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None  # type: ignore
+
+
+def peak_rss() -> Optional[int]:
+    """The peak RSS of this process in MB, or None where the resource module is not available.
+    ru_maxrss is in kilobytes on linux and in bytes on mac.
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss // (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def format_rss(max_rss: Optional[int]) -> str:
+    """
+    >>> format_rss(12), format_rss(None)
+    ('    12 MB', '   n/a   ')
+    """
+    return "   n/a   " if max_rss is None else f"{max_rss:6d} MB"
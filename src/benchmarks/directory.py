@@ -0,0 +1,50 @@
+"""Compare creating the destination directories for each image and with DirectoryCache.
+
+$ cd src
+$ python -m benchmarks.directory
+"""
+import pathlib
+import tempfile
+import time
+from typing import List
+
+from utils.directory import DirectoryCache
+from utils.stdout import Bcolors, styled_stdout
+
+
+def relative_dirs_of(dir_count: int, images_per_dir: int) -> List[str]:
+    """The target directory of each image."""
+    return [f"shoot-{index // images_per_dir:04d}/camera-a" for index in range(dir_count * images_per_dir)]
+
+
+def mkdir_for_each_image(dest_dir_path: pathlib.Path, relative_dirs: List[str]) -> None:
+    for relative_dir in relative_dirs:
+        (dest_dir_path / relative_dir).mkdir(parents=True, exist_ok=True)
+
+
+def directory_cache(dest_dir_path: pathlib.Path, relative_dirs: List[str]) -> None:
+    directories = DirectoryCache()
+    directories.make_skeleton(dest_dir_path, set(relative_dirs))
+    for relative_dir in relative_dirs:
+        directories.make(dest_dir_path / relative_dir)
+
+
+def seconds_of(func, relative_dirs: List[str]) -> float:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        start = time.perf_counter()
+        func(pathlib.Path(temp_dir) / "dest", relative_dirs)
+        return time.perf_counter() - start
+
+
+def main(dir_count: int = 200, images_per_dir: int = 500) -> None:
+    relative_dirs = relative_dirs_of(dir_count=dir_count, images_per_dir=images_per_dir)
+    styled_stdout(
+        Bcolors.OKGREEN.value,
+        f"{len(relative_dirs)} images in {dir_count} directories\n"
+        f"  mkdir for each image: {seconds_of(mkdir_for_each_image, relative_dirs):8.3f} s\n"
+        f"  DirectoryCache:       {seconds_of(directory_cache, relative_dirs):8.3f} s",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Compare the throughput of the file operations with the numbers of workers on a high-latency filesystem.
+
+The round trip of a network filesystem such as SMB and NFS is simulated by sleeping before each copy.
+
+$ cd src
+$ python -m benchmarks.executor
+"""
+import pathlib
+import shutil
+import tempfile
+import time
+from typing import Iterable
+
+from utils.executor import execute
+from utils.metrics import OperationMetrics
+from utils.stdout import Bcolors, styled_stdout
+
+
+def ops_per_second(image_count: int, latency: float, **executor_kwargs) -> OperationMetrics:
+    metrics = OperationMetrics()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        src = pathlib.Path(temp_dir) / "image.png"
+        src.write_bytes(b"\0" * 64 * 1024)
+
+        def copy(index: int) -> None:
+            with metrics.measure("transfer"):
+                time.sleep(latency)
+                shutil.copy2(src, pathlib.Path(temp_dir) / f"{index}.png")
+
+        items: Iterable[int] = range(image_count)
+        for _ in execute(func=copy, items=items, **executor_kwargs):
+            pass
+    return metrics
+
+
+def main(image_count: int = 400, latency: float = 0.005) -> None:
+    lines = [f"{image_count} copies with a {latency * 1000:.0f}ms round trip"]
+    for name, kwargs in [
+        ("1 worker", {"workers": 1}),
+        ("16 workers", {"workers": 16}),
+        ("64 workers", {"workers": 64}),
+        ("64 workers, 64 in flight", {"workers": 64, "in_flight": 64}),
+    ]:
+        metrics = ops_per_second(image_count=image_count, latency=latency, **kwargs)
+        lines.append(
+            f"  {name:<26}{metrics.rate('transfer'):8.1f} ops/s  "
+            f"mean latency {metrics.mean_latency('transfer') * 1000:5.1f}ms  max in flight {metrics.max_in_flight}"
+        )
+    styled_stdout(Bcolors.OKGREEN.value, "\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare the per-path cost of matching extensions with the regex pattern and ExtensionIndex.
+
+$ cd src
+$ python -m benchmarks.extension
+"""
+import pathlib
+import timeit
+from typing import Dict, List
+
+from utils import compile_extension_pattern_from
+from utils.constants import VALID_EXTENSIONS
+from utils.extension import ExtensionIndex
+from utils.stdout import Bcolors, styled_stdout
+
+EXTENSION_LISTS: Dict[str, List[str]] = {
+    "jpeg and png (3)": [".jpg", ".jpeg", ".png"],
+    f"default ({len(VALID_EXTENSIONS)})": VALID_EXTENSIONS,
+    "default and raw formats (30)": VALID_EXTENSIONS
+    + [".arw", ".cr2", ".cr3", ".dng", ".nef", ".nrw", ".orf", ".raf", ".rw2", ".pef", ".srw", ".x3f", ".heic"]
+    + [".heif"],
+}
+
+PATHS: List[str] = [
+    "/mnt/nfs/assets/2023/shoot-0412/camera-a/DSC_01234.JPG",
+    "/mnt/nfs/assets/2023/shoot-0412/camera-a/DSC_01234.ARW",
+    "/mnt/nfs/assets/2023/shoot-0412/camera-b/export/final/IMG_0001.vol1.png",
+    "/mnt/nfs/assets/2023/shoot-0412/camera-b/export/final/sidecar/IMG_0001.xmp",
+    "/mnt/nfs/assets/catalog/products/shoes/sneakers/white/lowcut/front/product-000123-large.webp",
+    "/home/user/images/a.gif",
+]
+
+
+NAMES: List[str] = [pathlib.PurePath(p).name for p in PATHS]
+
+
+def per_path_nanoseconds(func, paths: List[str], number: int) -> float:
+    seconds = min(timeit.repeat(lambda: [func(p) for p in paths], number=number, repeat=5))
+    return seconds / (number * len(paths)) * 1e9
+
+
+def main(number: int = 20000) -> None:
+    for title, extensions in EXTENSION_LISTS.items():
+        pattern = compile_extension_pattern_from(valid_extensions=extensions)
+        index = ExtensionIndex(extensions)
+
+        # the regex ran on the whole path, the index runs on os.DirEntry.name.
+        regex_ns = per_path_nanoseconds(pattern.search, paths=PATHS, number=number)
+        regex_name_ns = per_path_nanoseconds(pattern.search, paths=NAMES, number=number)
+        index_ns = per_path_nanoseconds(index.match, paths=NAMES, number=number)
+
+        styled_stdout(
+            Bcolors.OKGREEN.value,
+            f"{title}\n"
+            f"  regex on the path:  {regex_ns:8.1f} ns/path\n"
+            f"  regex on the name:  {regex_name_ns:8.1f} ns/path\n"
+            f"  index on the name:  {index_ns:8.1f} ns/path",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Compare the peak memory of sorting synthesized paths naturally with sorted() and with sort_images,
+which sorts chunks of the paths in memory and merges the sorted chunks from temporary files.
+
+The paths are not on the disk, so only the natural order is measured.
+
+$ cd src
+$ python -m benchmarks.ordering
+$ python -m benchmarks.ordering --counts 1000000 --chunk_size 100000
+"""
+import argparse
+import pathlib
+import time
+import tracemalloc
+from typing import Callable, Iterator, List, Tuple
+
+from utils.ordering import SORT_CHUNK_SIZE, ImageOrder, natural_key, sort_images
+from utils.stdout import Bcolors, styled_stdout
+
+
+def paths_of(count: int) -> Iterator[pathlib.Path]:
+    """The paths are yielded in a shuffled order as the directory listing of some filesystems."""
+    for index in range(count):
+        # a permutation of range(count), since the prime multiplier is coprime to count.
+        number = index * 2654435761 % count
+        yield pathlib.Path(f"/images/d{number % 100}/IMG_{number}.jpg")
+
+
+def measure(sort: Callable[[], int]) -> Tuple[int, float, float]:
+    """The number of paths, the seconds and the peak memory in MB."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = sort()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, seconds, peak / 1024 / 1024
+
+
+def main(counts: List[int], chunk_size: int) -> None:
+    for count in counts:
+        lines = [f"{count} paths"]
+        in_memory = measure(lambda: len(sorted(paths_of(count), key=lambda p: natural_key(str(p)))))
+        external = measure(
+            lambda: sum(1 for _ in sort_images(paths_of(count), order=ImageOrder.NATURAL.value, chunk_size=chunk_size))
+        )
+        for name, (done, seconds, peak) in [("sorted()", in_memory), (f"chunks of {chunk_size}", external)]:
+            assert done == count
+            lines.append(f"  {name:18s} {done / seconds:10.1f} paths/s  peak {peak:8.1f} MB")
+        styled_stdout(Bcolors.OKGREEN.value, "\n".join(lines))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark sorting the images naturally.")
+    arg_parser.add_argument("--counts", nargs="*", type=int, default=[100000, 1000000])
+    arg_parser.add_argument("--chunk_size", type=int, default=SORT_CHUNK_SIZE)
+    options = arg_parser.parse_args()
+    main(counts=options.counts, chunk_size=options.chunk_size)
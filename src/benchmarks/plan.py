@@ -0,0 +1,52 @@
+"""Measure the memory and the time of planning the renames of many images.
+
+A plan of 1,000,000 images takes about 200 MB, 261 MB before the entries were stored in columns.
+About 75 MB of it is the plan, mostly the utf-8 names, and the rest is the collision index,
+which keeps a name and a serial for each target to find the collisions in O(1).
+So the target is about 200 bytes for each image rather than tens of MB for a million images.
+
+$ cd src
+$ python -m benchmarks.plan
+"""
+import time
+import tracemalloc
+
+from lib.plan import RenamePlan
+from utils.stdout import Bcolors, styled_stdout
+
+# The number of images in a directory.
+IMAGES_PER_DIR = 500
+
+
+def build_plan(count: int) -> RenamePlan:
+    plan = RenamePlan(dir_path="/images", dest_dir_path="/dest/images_2023-01-01_00-00-00")
+    for serial in range(1, count + 1):
+        directory = f"shoot-{serial // IMAGES_PER_DIR:05d}/camera-a/export"
+        plan.add_relative(
+            serial=serial,
+            source=f"{directory}/DSC_{serial:07d}.JPG",
+            target=f"{directory}/DSC_{serial:07d}{serial:07d}.JPG",
+            ext=".JPG",
+        )
+    return plan
+
+
+def main(count: int = 1000000) -> None:
+    start = time.perf_counter()
+    build_plan(count)
+    elapsed = time.perf_counter() - start
+
+    # measured separately, since tracing the allocations slows the planning down.
+    tracemalloc.start()
+    plan = build_plan(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    styled_stdout(
+        Bcolors.OKGREEN.value,
+        f"{len(plan)} images\n" f"  memory:  {current / 1024 ** 2:8.1f} MB\n" f"  time:    {elapsed:8.2f} s",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Measure the hot paths of ic_rename on synthesized trees of images:
+walking the directory with one and several processes, planning the new names and the whole task with --run.
+The single layout puts the whole tree in one top-level folder,
+which the walkers split deeper so that they share the work.
+
+Each stage runs in a new process so that the peak RSS of one does not hide the others.
+The peak RSS is n/a on windows, where the resource module is not available.
+
+$ cd src
+$ python -m benchmarks.rename
+$ python -m benchmarks.rename --counts 1000 10000 100000 --depths 1 3 6
+$ python -m benchmarks.rename --counts 100000 --depths 4 --layouts single
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from benchmarks import format_rss, peak_rss
+from lib.rename import DefaultValues, Rename, RunContext, main, plan_renames
+from utils import get_image_paths_from_within
+from utils.stdout import Bcolors, Verbosity, reporter, styled_stdout
+
+# The number of images in a directory of the tree.
+IMAGES_PER_DIR = 100
+
+# walking is bound by the metadata round trips, so more processes than cores can help on network filesystems.
+DISCOVERY_WORKERS = 4
+
+# nested: the directories are spread over the top level of the tree.
+# single: the same directories are in a single top-level folder.
+LAYOUTS = ["nested", "single"]
+
+
+def make_tree(root: pathlib.Path, count: int, depth: int, layout: str = "nested") -> None:
+    """count empty images in directories nested depth levels, IMAGES_PER_DIR images a directory.
+    The image data is not read by renaming, so the images are empty.
+    """
+    if layout == "single":
+        root = root / "photos"
+    for index in range(count):
+        dir_index = index // IMAGES_PER_DIR
+        parts = [
+            f"d{depth_index}-{dir_index % 10 if depth_index < depth - 1 else dir_index}" for depth_index in range(depth)
+        ]
+        dir_path = root.joinpath(*parts)
+        if index % IMAGES_PER_DIR == 0:
+            dir_path.mkdir(parents=True, exist_ok=True)
+        (dir_path / f"ＩＭＧ {index:07d}.jpg").touch()
+
+
+def args_of(dir_path: str, dest: str, *options: str) -> argparse.Namespace:
+    sys.argv = ["ic_rename", dir_path, "--dest", dest, "--is_separator_and_delimiter_replaced", *options]
+    # the arguments are printed.
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Rename.get_args()
+
+
+def discover(dir_path: str, dest: str) -> Tuple[int, float, Optional[int]]:
+    start = time.perf_counter()
+    count = sum(1 for _ in get_image_paths_from_within(dir_path, DefaultValues.VALID_EXTENSIONS.value))
+    return count, time.perf_counter() - start, peak_rss()
+
+
+def discover_sharded(dir_path: str, dest: str) -> Tuple[int, float, Optional[int]]:
+    start = time.perf_counter()
+    count = sum(
+        1
+        for _ in get_image_paths_from_within(dir_path, DefaultValues.VALID_EXTENSIONS.value, workers=DISCOVERY_WORKERS)
+    )
+    return count, time.perf_counter() - start, peak_rss()
+
+
+def plan(dir_path: str, dest: str) -> Tuple[int, float, Optional[int]]:
+    reporter.configure(verbosity=Verbosity.QUIET)
+    start = time.perf_counter()
+    args = args_of(dir_path, dest)
+    image_paths = get_image_paths_from_within(dir_path, args.valid_extensions)
+    rename_plan = plan_renames(args=args, image_paths=image_paths, context=RunContext.from_args(args))
+    return len(rename_plan), time.perf_counter() - start, peak_rss()
+
+
+def run(dir_path: str, dest: str) -> Tuple[int, float, Optional[int]]:
+    args_of(dir_path, dest, "--verbosity", "quiet", "--run")
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        main()
+    seconds = time.perf_counter() - start
+    # the comparison file and the journal are not counted.
+    count = sum(name.endswith(".jpg") for _, _, file_names in os.walk(dest) for name in file_names)
+    return count, seconds, peak_rss()
+
+
+STAGES: List[Tuple[str, Callable[[str, str], Tuple[int, float, Optional[int]]]]] = [
+    ("discovery", discover),
+    (f"discovery x{DISCOVERY_WORKERS}", discover_sharded),
+    ("plan", plan),
+    ("run", run),
+]
+
+
+def main_benchmark(counts: List[int], depths: List[int], layouts: List[str]) -> None:
+    for count, depth, layout in itertools.product(counts, depths, layouts):
+        lines = [f"{count} images at depth {depth}, {layout} layout"]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            dir_path = pathlib.Path(temp_dir) / "images"
+            make_tree(dir_path, count=count, depth=depth, layout=layout)
+            for name, stage in STAGES:
+                (pathlib.Path(temp_dir) / f"dest-{name}").mkdir()
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    done, seconds, max_rss = executor.submit(
+                        stage, str(dir_path), str(pathlib.Path(temp_dir) / f"dest-{name}")
+                    ).result()
+                assert done == count, f"{name}: {done} images of {count}"
+                lines.append(f"  {name:13s} {done / seconds:10.1f} files/s  peak RSS {format_rss(max_rss)}")
+        styled_stdout(Bcolors.OKGREEN.value, "\n".join(lines))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark the hot paths of ic_rename.")
+    arg_parser.add_argument("--counts", nargs="*", type=int, default=[1000, 10000, 100000])
+    arg_parser.add_argument("--depths", nargs="*", type=int, default=[1, 4])
+    arg_parser.add_argument("--layouts", nargs="*", type=str, choices=LAYOUTS, default=LAYOUTS)
+    options = arg_parser.parse_args()
+    main_benchmark(counts=options.counts, depths=options.depths, layouts=options.layouts)
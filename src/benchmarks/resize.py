@@ -0,0 +1,95 @@
+"""Measure the throughput and the peak memory of resizing JPEG images for each quality,
+and the time of outputting renditions of several widths with and without decoding the image once.
+
+Each measurement runs in a new process so that the peak RSS of one does not hide the others.
+The peak RSS is n/a on windows, where the resource module is not available.
+
+$ cd src
+$ python -m benchmarks.resize
+"""
+import pathlib
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+from benchmarks import format_rss, peak_rss
+from lib.resize import (
+    RenditionTask,
+    ResizeQuality,
+    ResizeTask,
+    resize_image,
+    resize_renditions,
+)
+from utils.stdout import Bcolors, styled_stdout
+
+# 6, 12 and 24 megapixels.
+IMAGE_SIZES: List[Tuple[int, int]] = [(3000, 2000), (4240, 2832), (6000, 4000)]
+WIDTH = 400
+RENDITION_WIDTHS: List[int] = [320, 640, 1280, 1920, 2560]
+
+
+def make_image(path: pathlib.Path, size: Tuple[int, int]) -> None:
+    # a gradient, so the encoder does not compress the image to nothing.
+    gradient = Image.linear_gradient("L").resize(size)
+    Image.merge("RGB", (gradient, gradient.transpose(Image.FLIP_LEFT_RIGHT), gradient)).save(path, quality=90)
+
+
+def measure(src: str, dst: str, quality: str, number: int) -> Tuple[float, Optional[int]]:
+    """Return the seconds for an image and the peak RSS in MB of this process."""
+    resize_task = ResizeTask(serial=1, src=src, dst=dst, width=WIDTH, is_aspect_ratio_kept=True, quality=quality)
+    start = time.perf_counter()
+    for _ in range(number):
+        resize_image(resize_task)
+    seconds = (time.perf_counter() - start) / number
+    return seconds, peak_rss()
+
+
+def measure_renditions(src: str, temp_dir: str, number: int) -> Tuple[float, float]:
+    """Return the seconds for an image resized to each width separately and with the renditions."""
+    dsts = [str(pathlib.Path(temp_dir) / f"resized_{width}.jpg") for width in RENDITION_WIDTHS]
+    resize_tasks = [
+        ResizeTask(serial=1, src=src, dst=dst, width=width, is_aspect_ratio_kept=True)
+        for width, dst in zip(RENDITION_WIDTHS, dsts)
+    ]
+    rendition_task = RenditionTask(serial=1, src=src, renditions=tuple(zip(RENDITION_WIDTHS, dsts)))
+
+    start = time.perf_counter()
+    for _ in range(number):
+        for resize_task in resize_tasks:
+            resize_image(resize_task)
+    separately = (time.perf_counter() - start) / number
+
+    start = time.perf_counter()
+    for _ in range(number):
+        resize_renditions(rendition_task)
+    return separately, (time.perf_counter() - start) / number
+
+
+def main(number: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in IMAGE_SIZES:
+            src = pathlib.Path(temp_dir) / f"{size[0]}x{size[1]}.jpg"
+            make_image(src, size)
+            lines = [f"{size[0]}x{size[1]} => width {WIDTH}"]
+            for quality in ResizeQuality.values():
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    seconds, max_rss = executor.submit(
+                        measure, str(src), str(pathlib.Path(temp_dir) / "resized.jpg"), quality, number
+                    ).result()
+                lines.append(f"  {quality:9s} {1 / seconds:8.1f} images/s  peak RSS {format_rss(max_rss)}")
+            styled_stdout(Bcolors.OKGREEN.value, "\n".join(lines))
+
+        separately, renditions = measure_renditions(str(src), temp_dir, number=number)
+        styled_stdout(
+            Bcolors.OKGREEN.value,
+            f"{IMAGE_SIZES[-1][0]}x{IMAGE_SIZES[-1][1]} => widths {RENDITION_WIDTHS}\n"
+            f"  each width separately: {separately:8.3f} s/image\n"
+            f"  renditions:            {renditions:8.3f} s/image",
+        )
+
+
+if __name__ == "__main__":
+    main()
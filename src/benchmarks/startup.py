@@ -0,0 +1,68 @@
+"""Measure the startup time of the commands with `--help`, which imports the command and parses the arguments.
+
+The commands are run thousands of times a day from job runners, so the time is checked against a budget.
+The modules taking the most time to import are listed from the output of `python -X importtime`.
+The exit status is 1 if a command is over the budget.
+
+$ cd src
+$ python -m benchmarks.startup
+"""
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from utils.stdout import Bcolors, styled_stdout
+
+# The median wall time of `<command> --help` in milliseconds, including the startup of the interpreter.
+BUDGET_MS = 200
+
+# The entry points of setup.py.
+COMMANDS: Dict[str, str] = {
+    "ic_rename": "rename",
+    "ic_rename_apply": "rename_apply",
+    "ic_resize": "resize",
+}
+
+
+def command_line(command: str, *options: str) -> List[str]:
+    code = f"import sys; sys.argv = [{command!r}, '--help']; import app; app.{COMMANDS[command]}()"
+    return [sys.executable, *options, "-c", code]
+
+
+def wall_time_ms(command: str, number: int) -> float:
+    times = []
+    for _ in range(number):
+        start = time.perf_counter()
+        subprocess.run(command_line(command), check=True, stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def slowest_imports(command: str, count: int) -> List[Tuple[str, float]]:
+    """The modules of the command by the self time of importing them in milliseconds."""
+    stderr = subprocess.run(
+        command_line(command, "-X", "importtime"), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    ).stderr.decode()
+    imports = []
+    # import time: self [us] | cumulative | imported package
+    for line in stderr.splitlines()[1:]:
+        self_us, _, module = line[len("import time:") :].split("|")
+        imports.append((module.strip(), int(self_us) / 1000))
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:count]
+
+
+def main(number: int = 10, count: int = 5) -> int:
+    over_budget = False
+    for command in COMMANDS:
+        milliseconds = wall_time_ms(command, number=number)
+        over_budget |= milliseconds > BUDGET_MS
+        lines = [f"{command} --help: {milliseconds:6.1f} ms (budget {BUDGET_MS} ms)"]
+        lines += [f"  {module:30s} {ms:6.1f} ms" for module, ms in slowest_imports(command, count=count)]
+        styled_stdout(Bcolors.FAIL.value if milliseconds > BUDGET_MS else Bcolors.OKGREEN.value, "\n".join(lines))
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
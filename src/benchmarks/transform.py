@@ -0,0 +1,98 @@
+"""Compare the per-image cost of converting names with Rename instances and NameTransformer,
+and of converting full-width characters with zen2han and jaconv.z2h.
+
+$ cd src
+$ python -m benchmarks.transform
+"""
+import pathlib
+import timeit
+from typing import Dict, List
+
+from jaconv import jaconv
+
+from lib.rename import Rename
+from lib.transform import NameTransformer, zen2han
+from utils.stdout import Bcolors, styled_stdout
+
+DIR_PATH = pathlib.Path("/images")
+
+NAMES: List[str] = [
+    "DSC_01234.JPG",
+    "ｆｕｌｌ ｗｉｄｔｈ　ｎａｍｅ－０１.png",
+    "product 000123 (large)%20front.webp",
+    "日本語の画像ファイル名:001?.gif",
+    "IMG_0001.vol1.png",
+]
+
+OPTIONS: Dict[str, dict] = {
+    "default": {},
+    "all options": {
+        "chars_before_replacement": ["DSC", "IMG"],
+        "chars_after_replacement": ["photo", "image"],
+        "prefix": "pre",
+        "suffix": "suf",
+        "is_separator_and_delimiter_replaced": True,
+        "is_url_encoded_char_replaced": True,
+        "is_serial_number_added": True,
+    },
+}
+
+
+def image_paths_of(count: int) -> List[pathlib.Path]:
+    return [DIR_PATH / f"dir{i % 10}" / NAMES[i % len(NAMES)] for i in range(count)]
+
+
+def rename_instances(image_paths: List[pathlib.Path], options: dict) -> List[str]:
+    names = []
+    for serial, image_path in enumerate(image_paths, start=1):
+        rename = Rename(image_path=image_path, now_str="", dir_path=DIR_PATH, loop_count=serial, **options)
+        rename.convert()
+        names.append(rename.renamed_image_name)
+    return names
+
+
+def name_transformer(image_paths: List[pathlib.Path], options: dict) -> List[str]:
+    transformer = NameTransformer(**options)
+    stems = transformer.transform_batch([p.stem for p in image_paths], serials=range(1, len(image_paths) + 1))
+    return [stem + p.suffix for stem, p in zip(stems, image_paths)]
+
+
+def per_image_microseconds(func, image_paths: List[pathlib.Path], options: dict, number: int) -> float:
+    seconds = min(timeit.repeat(lambda: func(image_paths, options), number=number, repeat=3))
+    return seconds / (number * len(image_paths)) * 1e6
+
+
+def zen2han_microseconds(func, stems: List[str], number: int) -> float:
+    seconds = min(timeit.repeat(lambda: [func(stem) for stem in stems], number=number, repeat=3))
+    return seconds / (number * len(stems)) * 1e6
+
+
+def main(count: int = 10000, number: int = 3) -> None:
+    image_paths = image_paths_of(count)
+    for title, options in OPTIONS.items():
+        rename_us = per_image_microseconds(rename_instances, image_paths, options, number=number)
+        transformer_us = per_image_microseconds(name_transformer, image_paths, options, number=number)
+        styled_stdout(
+            Bcolors.OKGREEN.value,
+            f"{title} ({count} images)\n"
+            f"  Rename instances: {rename_us:8.2f} us/image\n"
+            f"  NameTransformer:  {transformer_us:8.2f} us/image",
+        )
+
+    for title, stems in [
+        ("ASCII stems", ["DSC_01234"] * count),
+        ("non-ASCII stems", [pathlib.Path(NAMES[1]).stem] * count),
+    ]:
+        jaconv_us = zen2han_microseconds(
+            lambda stem: jaconv.z2h(stem, kana=False, ascii=True, digit=True), stems, number=number
+        )
+        styled_stdout(
+            Bcolors.OKGREEN.value,
+            f"{title} ({count} stems)\n"
+            f"  jaconv.z2h:       {jaconv_us:8.2f} us/stem\n"
+            f"  zen2han:          {zen2han_microseconds(zen2han, stems, number=number):8.2f} us/stem",
+        )
+
+
+if __name__ == "__main__":
+    main()
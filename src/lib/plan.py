@@ -0,0 +1,577 @@
+import argparse
+import array
+import enum
+import json
+import ntpath
+import os
+import pathlib
+import posixpath
+import sys
+import time
+import unicodedata
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from utils.cache import ProcessingCache
+from utils.comparison import ComparisonFormat, ComparisonWriter
+from utils.directory import DirectoryCache
+from utils.executor import execute
+from utils.journal import Journal
+from utils.metrics import OperationMetrics
+from utils.stdout import Bcolors, Verbosity, reporter, stdout_exception_message
+from utils.transfer import LinkMode, transfer
+from utils.with_statements import task
+
+
+def get_comparison(original_path: Union[str, pathlib.Path], renamed_path: Union[str, pathlib.Path]) -> str:
+    """The record of an image written to comparison.txt"""
+    original_path, renamed_path = os.fspath(original_path), os.fspath(renamed_path)
+    return (
+        f"\nNAME: {os.path.basename(original_path)} => {os.path.basename(renamed_path)}\n"
+        f"PATH: {original_path} => {renamed_path}\n"
+    )
+
+
+def split_posix_path(path: str) -> Tuple[str, str]:
+    """Split a relative posix path into the directory and the name.
+    The directory is interned, so the paths in the same directory share one string.
+    >>> split_posix_path("dir1/dir2/a.png")
+    ('dir1/dir2', 'a.png')
+    >>> split_posix_path("a.png")
+    ('', 'a.png')
+    """
+    directory, _, name = path.rpartition("/")
+    return sys.intern(directory), name
+
+
+def join_posix_path(directory: str, name: str) -> str:
+    return f"{directory}/{name}" if directory else name
+
+
+def is_contained(path: str) -> bool:
+    """Whether a relative posix path stays within the directory it is joined to.
+    >>> is_contained("dir/a.png")
+    True
+    >>> is_contained("../a.png"), is_contained("dir/../../a.png"), is_contained("/etc/a.png")
+    (False, False, False)
+    >>> is_contained("C:/a.png")
+    False
+    """
+    if not path or path.startswith(("/", "\\")) or ntpath.splitdrive(path)[0]:
+        return False
+    return ".." not in path.replace("\\", "/").split("/")
+
+
+class PlanEntry:
+    """An image of the plan.
+
+    A plan keeps its entries in columns and makes an entry for each image when it is iterated,
+    so an entry has no __dict__ and keeps its paths as an interned directory and a name,
+    so the entries of the images in the same directory share the directory string.
+    """
+
+    __slots__ = ("serial", "source_dir", "source_name", "target_dir", "target_name")
+
+    def __init__(self, serial: int, source: str, target: str):
+        self.serial = serial
+        # posix path relative to the directory containing the images.
+        self.source_dir, self.source_name = split_posix_path(source)
+        # posix path relative to the destination directory.
+        self.target_dir, self.target_name = split_posix_path(target)
+
+    @classmethod
+    def of(cls, serial: int, source_dir: str, source_name: str, target_dir: str, target_name: str) -> "PlanEntry":
+        """Make an entry from the paths already split, the directories should be interned."""
+        entry = cls.__new__(cls)
+        entry.serial = serial
+        entry.source_dir, entry.source_name = source_dir, source_name
+        entry.target_dir, entry.target_name = target_dir, target_name
+        return entry
+
+    @property
+    def source(self) -> str:
+        return join_posix_path(self.source_dir, self.source_name)
+
+    @property
+    def target(self) -> str:
+        return join_posix_path(self.target_dir, self.target_name)
+
+    def to_dict(self) -> dict:
+        return {"serial": self.serial, "source": self.source, "target": self.target}
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PlanEntry):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self) -> int:
+        return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self) -> str:
+        return f"PlanEntry(serial={self.serial!r}, source={self.source!r}, target={self.target!r})"
+
+
+class CollisionPolicy(enum.Enum):
+    """What to do when an image is output to the same path as another image."""
+
+    # stop before any image is output.
+    ERROR = "error"
+    # add a number to the name. a.png => a_1.png
+    SUFFIX = "suffix"
+    # do not output the later image.
+    SKIP = "skip"
+    # the later image overwrites the earlier image.
+    OVERWRITE = "overwrite"
+
+    @classmethod
+    def values(cls) -> List[str]:
+        return [var.value for var in cls]
+
+
+class CollisionIndex:
+    """An in-memory index of the target paths to detect collisions in O(1) for each image
+    without scanning the destination directory.
+
+    The targets are compared after the unicode normalization (NFC),
+    and case-insensitively if case_insensitive is True, as on the filesystems of mac and windows.
+    """
+
+    def __init__(
+        self,
+        policy: Union[str, CollisionPolicy] = CollisionPolicy.OVERWRITE,
+        case_insensitive: bool = False,
+        separator: str = "_",
+    ):
+        self.policy = CollisionPolicy(policy)
+        self.case_insensitive = case_insensitive
+        self.separator = separator
+        # normalized directory => normalized name => serial of the image output to the target
+        # The targets are indexed by the directory, so the index keeps the name of a target without its directory.
+        self.serials: Dict[str, Dict[str, int]] = {}
+        # (normalized directory, normalized name) => the last number added to the name,
+        # so numbering does not start over.
+        self.suffix_numbers: Dict[Tuple[str, str], int] = {}
+        # target => serials of the images output to the target
+        self.collisions: Dict[str, List[int]] = {}
+        # serials of the images overwritten by a later image, which are not output at all,
+        # so no two images are output to the same path at once by the workers.
+        self.overwritten: Set[int] = set()
+
+    def key(self, target: str) -> str:
+        key = unicodedata.normalize("NFC", target)
+        return key.casefold() if self.case_insensitive else key
+
+    def resolve(self, serial: int, target: str, ext: str = "") -> Optional[str]:
+        """Return the target the image is output to, or None if the image is skipped.
+        :param ext: the extension of the target, the number is added before it.
+        """
+        directory, name = split_posix_path(target)
+        resolved_name = self.resolve_name(serial=serial, directory=directory, name=name, ext=ext)
+        return None if resolved_name is None else join_posix_path(directory, resolved_name)
+
+    def resolve_name(self, serial: int, directory: str, name: str, ext: str = "") -> Optional[str]:
+        """resolve with the target split into the directory and the name.
+        Return the name the image is output with, or None if the image is skipped.
+        """
+        directory_key = self.key(directory)
+        names = self.serials.setdefault(directory_key, {})
+        key = self.key(name)
+        if key not in names:
+            names[key] = serial
+            return name
+
+        self.collisions.setdefault(join_posix_path(directory, name), [names[key]]).append(serial)
+        if self.policy is CollisionPolicy.ERROR:
+            raise ValueError(
+                f'The image of serial {serial} is output to "{join_posix_path(directory, name)}" '
+                f"as the image of serial {names[key]}. Use --collision_policy to avoid it."
+            )
+        if self.policy is CollisionPolicy.SKIP:
+            return None
+        if self.policy is CollisionPolicy.OVERWRITE:
+            self.overwritten.add(names[key])
+            names[key] = serial
+            return name
+
+        if not ext or not name.endswith(ext):
+            ext = posixpath.splitext(name)[1]
+        stem = name[: len(name) - len(ext)]
+        number = self.suffix_numbers.get((directory_key, key), 0)
+        while True:
+            number += 1
+            suffixed_name = f"{stem}{self.separator}{number}{ext}"
+            suffixed_key = self.key(suffixed_name)
+            if suffixed_key not in names:
+                break
+        self.suffix_numbers[(directory_key, key)] = number
+        names[suffixed_key] = serial
+        return suffixed_name
+
+
+class RenamePlan:
+    """The complete list of the images to be output and their new paths.
+
+    A plan is computed without touching the filesystem,
+    and it can be saved to a file, compared with another plan and applied later on another machine.
+    The paths of the images are kept relative to the directory containing the images
+    and the destination directory, so that those directories can be changed when applying the plan.
+
+    plan.jsonl
+    {"dest_dir_path": "/dest/images_2023-01-01_00-00-00", "dir_path": "/images", "version": 1}
+    {"serial": 1, "source": "dir1/a.png", "target": "dir1/a001.png"}
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self,
+        dir_path: Union[str, pathlib.Path],
+        dest_dir_path: Union[str, pathlib.Path],
+        collision_index: Optional[CollisionIndex] = None,
+    ):
+        self.dir_path = pathlib.Path(dir_path)
+        self.dest_dir_path = pathlib.Path(dest_dir_path)
+        # A plan may have millions of entries, so they are kept in columns rather than as an object each.
+        # index => directory, shared by the sources and the targets.
+        self.directories: List[str] = []
+        # directory => index
+        self.directory_indexes: Dict[str, int] = {}
+        self.serials = array.array("q")
+        # indexes of the directories of the sources and the targets
+        self.source_dirs = array.array("L")
+        self.target_dirs = array.array("L")
+        # utf-8 names of the source and the target of each entry joined,
+        # and the offsets of the ends of the names, two for each entry.
+        self.names = bytearray()
+        self.name_ends = array.array("Q")
+        self.collision_index = collision_index or CollisionIndex()
+        # serials of the images not output because of collisions.
+        self.skipped: List[int] = []
+
+    def __iter__(self) -> Iterator[PlanEntry]:
+        """The entries to output. With the overwrite policy, only the last image of a target is output."""
+        overwritten = self.collision_index.overwritten
+        for position, serial in enumerate(self.serials):
+            if serial not in overwritten:
+                yield self._entry_at(position)
+
+    def __len__(self) -> int:
+        return len(self.serials) - len(self.collision_index.overwritten)
+
+    def _entry_at(self, position: int) -> PlanEntry:
+        source_start = self.name_ends[2 * position - 1] if position else 0
+        source_end, target_end = self.name_ends[2 * position], self.name_ends[2 * position + 1]
+        return PlanEntry.of(
+            serial=self.serials[position],
+            source_dir=self.directories[self.source_dirs[position]],
+            # surrogatepass keeps the undecodable bytes of the file names, which os.fsdecode has escaped.
+            source_name=self.names[source_start:source_end].decode("utf-8", "surrogatepass"),
+            target_dir=self.directories[self.target_dirs[position]],
+            target_name=self.names[source_end:target_end].decode("utf-8", "surrogatepass"),
+        )
+
+    def _directory_index(self, directory: str) -> int:
+        index = self.directory_indexes.get(directory)
+        if index is None:
+            index = self.directory_indexes[directory] = len(self.directories)
+            self.directories.append(directory)
+        return index
+
+    def add(
+        self, serial: int, source_path: pathlib.Path, target_path: pathlib.Path, ext: str = ""
+    ) -> Optional[PlanEntry]:
+        """Add an image to the plan. The target may be changed or the image may be skipped
+        by the collision policy, in which case None is returned.
+        :param ext: the extension of the target.
+        """
+        return self.add_relative(
+            serial=serial,
+            source=source_path.relative_to(self.dir_path).as_posix(),
+            target=target_path.relative_to(self.dest_dir_path).as_posix(),
+            ext=ext,
+        )
+
+    def add_relative(self, serial: int, source: str, target: str, ext: str = "") -> Optional[PlanEntry]:
+        """Add an image with the posix paths relative to dir_path and dest_dir_path."""
+        source_dir, source_name = split_posix_path(source)
+        target_dir, target_name = split_posix_path(target)
+        resolved_name = self.collision_index.resolve_name(
+            serial=serial, directory=target_dir, name=target_name, ext=ext
+        )
+        if resolved_name is None:
+            self.skipped.append(serial)
+            return None
+        entry = PlanEntry.of(
+            serial=serial,
+            source_dir=source_dir,
+            source_name=source_name,
+            target_dir=target_dir,
+            target_name=resolved_name,
+        )
+        self._store(entry)
+        return entry
+
+    def _append(self, entry: PlanEntry) -> None:
+        self.collision_index.resolve_name(serial=entry.serial, directory=entry.target_dir, name=entry.target_name)
+        self._store(entry)
+
+    def _store(self, entry: PlanEntry) -> None:
+        self.serials.append(entry.serial)
+        self.source_dirs.append(self._directory_index(entry.source_dir))
+        self.target_dirs.append(self._directory_index(entry.target_dir))
+        self.names += entry.source_name.encode("utf-8", "surrogatepass")
+        self.name_ends.append(len(self.names))
+        self.names += entry.target_name.encode("utf-8", "surrogatepass")
+        self.name_ends.append(len(self.names))
+
+    def source_path(self, entry: PlanEntry) -> pathlib.Path:
+        return self.dir_path / entry.source
+
+    def target_path(self, entry: PlanEntry) -> pathlib.Path:
+        return self.dest_dir_path / entry.target
+
+    @property
+    def collisions(self) -> Dict[str, List[int]]:
+        """targets that more than one image are output to => their serials"""
+        return self.collision_index.collisions
+
+    @property
+    def header(self) -> dict:
+        return {"version": self.VERSION, "dir_path": str(self.dir_path), "dest_dir_path": str(self.dest_dir_path)}
+
+    def lines(self) -> Iterator[str]:
+        """One line for each entry, so that the plans can be compared with diff."""
+        yield json.dumps(self.header, ensure_ascii=False, sort_keys=True)
+        for entry in self:
+            yield json.dumps(entry.to_dict(), ensure_ascii=False)
+
+    def save(self, path: Union[str, pathlib.Path]) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for line in self.lines():
+                f.write(line + "\n")
+
+    @classmethod
+    def load(
+        cls,
+        path: Union[str, pathlib.Path],
+        dir_path: Optional[Union[str, pathlib.Path]] = None,
+        dest_dir_path: Optional[Union[str, pathlib.Path]] = None,
+    ) -> "RenamePlan":
+        """
+        The plan file may come from another machine, so an entry whose source or target is absolute
+        or has a ".." component is rejected, as it would read or write outside the directories.
+        :param dir_path: the directory containing the images on the machine applying the plan.
+        :param dest_dir_path: the destination directory on the machine applying the plan.
+        """
+        with open(path, encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline())
+                version = header.get("version")
+            except (json.JSONDecodeError, AttributeError):
+                raise ValueError(f'"{path}" is not a plan file.')
+            if version != cls.VERSION:
+                raise ValueError(f'The version of the plan file "{path}" is not supported.')
+            try:
+                plan = cls(
+                    dir_path=dir_path or header["dir_path"], dest_dir_path=dest_dir_path or header["dest_dir_path"]
+                )
+            except (KeyError, TypeError):
+                raise ValueError(f'"{path}" is not a plan file.')
+            # the header is line 1.
+            for line_number, line in enumerate(f, start=2):
+                try:
+                    entry = PlanEntry(**json.loads(line))
+                except (json.JSONDecodeError, TypeError, KeyError, AttributeError):
+                    raise ValueError(f'Line {line_number} of "{path}" is not an entry of a plan.')
+                if not isinstance(entry.serial, int):
+                    raise ValueError(f'Line {line_number} of "{path}" is not an entry of a plan.')
+                for entry_path in (entry.source, entry.target):
+                    if not is_contained(entry_path):
+                        raise ValueError(
+                            f'Line {line_number} of "{path}" has a path outside the directory: "{entry_path}".'
+                        )
+                plan._append(entry)
+        return plan
+
+    def diff(self, other: "RenamePlan") -> Iterator[str]:
+        """Compare the entries with another plan in the unified diff format."""
+        import difflib
+
+        return difflib.unified_diff(
+            list(other.lines())[1:], list(self.lines())[1:], fromfile="other", tofile="this", lineterm=""
+        )
+
+
+def apply_plan(
+    plan: RenamePlan,
+    link_mode: str = LinkMode.COPY.value,
+    workers: int = 1,
+    comparison_formats: Sequence[str] = (ComparisonFormat.TEXT.value,),
+    resume: bool = False,
+    directories: Optional[DirectoryCache] = None,
+    cache: Optional[ProcessingCache] = None,
+    in_flight: Optional[int] = None,
+) -> OperationMetrics:
+    """Output the images of the plan to the destination directory.
+
+    The planned operations are written to the journal before any image is output,
+    and the comparison of each image is written as soon as the image is output,
+    so the task can be resumed and a usable record is left if the task is interrupted.
+    :param directories: the directories already created in the task.
+    :param cache: the images unchanged since they were output by the previous tasks are not output again.
+    :param in_flight: the maximum number of operations submitted to the workers at once.
+    :return: the counts and the latencies of the file operations.
+    """
+    metrics = OperationMetrics()
+    if directories is None:
+        directories = DirectoryCache()
+    journal = Journal(dir_path=plan.dest_dir_path)
+    if resume:
+        journal.load()
+        # the whole plan is checked before the comparison files of the interrupted task are touched.
+        for entry in plan:
+            journal.check(serial=entry.serial, src=plan.source_path(entry), dst=plan.target_path(entry))
+
+    # serials of the images unchanged since the previous tasks.
+    unchanged: Set[int] = set()
+    if cache is not None:
+        unchanged = {entry.serial for entry in plan if cache.lookup(plan.source_path(entry), entry.target) is not None}
+
+    def output(entry: PlanEntry) -> None:
+        if entry.serial in unchanged or journal.is_completed(entry.serial):
+            return
+        target_path = plan.target_path(entry)
+        directories.make(target_path.parent)
+        # The original image is kept intact in its original location,
+        # and the renamed image is linked or copied to the destination.
+        with metrics.measure("transfer"):
+            transfer(src=plan.source_path(entry), dst=target_path, mode=link_mode)
+
+    comparison_writer = ComparisonWriter(dest_dir_path=plan.dest_dir_path, formats=comparison_formats, replace=resume)
+    with comparison_writer, journal:
+        for entry in plan:
+            journal.plan(serial=entry.serial, src=plan.source_path(entry), dst=plan.target_path(entry))
+        journal.sync()
+        # one mkdir for each distinct directory, parent-first, instead of a mkdir for each image.
+        made, started_at = len(directories), time.monotonic()
+        directories.make_skeleton(
+            plan.dest_dir_path, {entry.target_dir for entry in plan if entry.serial not in unchanged}
+        )
+        metrics.add("mkdir", count=len(directories) - made, seconds=time.monotonic() - started_at)
+
+        outputs = execute(func=output, items=plan, workers=workers, in_flight=in_flight)
+        reporter.start(total=len(plan))
+        for entry in outputs:
+            if not journal.is_completed(entry.serial):
+                journal.complete(entry.serial)
+            if entry.serial in unchanged:
+                reporter.advance()
+                continue
+            source_path, target_path = plan.source_path(entry), plan.target_path(entry)
+            if cache is not None:
+                cache.record(source=source_path, target=entry.target, output=target_path)
+            comparison_writer.write(
+                original_path=source_path,
+                renamed_path=target_path,
+                comparison=get_comparison(original_path=source_path, renamed_path=target_path),
+            )
+            reporter.advance()
+    if unchanged:
+        reporter.report(
+            Bcolors.OKBLUE.value,  # type: ignore
+            f"{len(unchanged)} images are not output, since they are unchanged since the previous tasks.",
+            verbosity=Verbosity.PROGRESS,
+        )
+    for line in metrics.summary():
+        reporter.report(Bcolors.OKBLUE.value, line, verbosity=Verbosity.PROGRESS)  # type: ignore
+    return metrics
+
+
+def get_args():
+    from lib.rename import DefaultValues
+
+    arg_parser = argparse.ArgumentParser(description="Apply a plan saved by ic_rename --save_plan.")
+    arg_parser.add_argument("plan_path", type=str, help="The plan file saved by ic_rename --save_plan.")
+    arg_parser.add_argument("-r", "--run", action="store_true")
+    arg_parser.add_argument(
+        "-v",
+        "--verbosity",
+        type=str,
+        choices=Verbosity.names(),
+        help="quiet: errors only. progress: a progress line and the summary. normal: a message for each image.",
+        default=Verbosity.NORMAL.name.lower(),
+    )
+    arg_parser.add_argument(
+        "--dir_path", type=str, help="The directory containing the images if it differs from the plan.", default=None
+    )
+    arg_parser.add_argument(
+        "--dest_dir_path", type=str, help="The destination directory if it differs from the plan.", default=None
+    )
+    arg_parser.add_argument(
+        "--diff", type=str, help="Show the difference from another plan file and exit.", default=None
+    )
+    arg_parser.add_argument(
+        "-lm",
+        "--link_mode",
+        type=str,
+        choices=LinkMode.values(),
+        help="How to output the renamed images. "
+        "hardlink and reflink write no image data and fall back to copy when they are not supported. "
+        "A hardlinked image shares the inode with the original image, so editing either of them changes the other.",
+        default=DefaultValues.LINK_MODE.value,
+    )
+    arg_parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="The number of threads that output the renamed images.",
+        default=DefaultValues.WORKERS.value,
+    )
+    arg_parser.add_argument(
+        "-cf",
+        "--comparison_formats",
+        nargs="*",
+        type=str,
+        choices=ComparisonFormat.values(),
+        help="Formats of the files recording the names before and after the conversion. txt csv jsonl",
+        default=DefaultValues.COMPARISON_FORMATS.value,
+    )
+    arg_parser.add_argument(
+        "--resume", action="store_true", help="Skip the images already output by the interrupted task."
+    )
+    arg_parser.add_argument(
+        "--in_flight",
+        type=int,
+        help="The number of file operations submitted to the workers ahead of the one being waited for, "
+        "which bounds the memory however many images there are. 4 times the workers by default.",
+        default=DefaultValues.IN_FLIGHT.value,
+    )
+    return arg_parser.parse_args()
+
+
+def main():
+    with task(args=get_args(), task_name="Apply") as args:
+        try:
+            plan = RenamePlan.load(path=args.plan_path, dir_path=args.dir_path, dest_dir_path=args.dest_dir_path)
+            if args.diff:
+                for line in plan.diff(RenamePlan.load(path=args.diff)):
+                    reporter.report(Bcolors.NONE.value, line, verbosity=Verbosity.QUIET)  # type: ignore
+                return
+
+            for entry in plan:
+                reporter.report(
+                    Bcolors.OKGREEN.value,  # type: ignore
+                    get_comparison(original_path=plan.source_path(entry), renamed_path=plan.target_path(entry)),
+                )
+            if args.run:
+                apply_plan(
+                    plan=plan,
+                    link_mode=args.link_mode,
+                    workers=args.workers,
+                    comparison_formats=args.comparison_formats,
+                    resume=args.resume,
+                    in_flight=args.in_flight,
+                )
+        except ValueError as value_error:
+            stdout_exception_message(value_error)
+            return
+        reporter.summary(task_name="Apply")
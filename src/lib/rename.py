@@ -1,19 +1,58 @@
 import argparse
+import contextlib
 import dataclasses
 import enum
 import pathlib
-import re
-import shutil
-import tempfile
-from typing import ClassVar, List, Optional, Pattern, Union
-
-from jaconv import jaconv
-
-from utils import datetime2str, get_dest_dir_name, get_image_paths_from_within
+from typing import ClassVar, Iterator, List, Optional, Pattern, Union
+
+from lib.plan import (
+    CollisionIndex,
+    CollisionPolicy,
+    RenamePlan,
+    apply_plan,
+    get_comparison,
+)
+from lib.transform import NameTransformer, zen2han
+from utils import (
+    datetime2str,
+    get_dest_dir_name,
+    get_image_paths_from_within,
+    get_now_str_from,
+    iter_batches,
+)
+from utils.cache import ProcessingCache
+from utils.comparison import ComparisonFormat
+from utils.constants import (
+    ALTERNATIVE_UNAVAILABLE_CHAR_IN_WINDOWS as COMMON_ALTERNATIVE_UNAVAILABLE_CHAR_IN_WINDOWS,
+)
+from utils.constants import (
+    ALTERNATIVE_URL_ENCODED_CHAR as COMMON_ALTERNATIVE_URL_ENCODED_CHAR,
+)
 from utils.constants import ANY_EXTENSION_PATTERN as COMMON_ANY_EXTENSION_PATTERN
+from utils.constants import (
+    REPLACEMENT_WITH_SEPARATOR_PATTERN as COMMON_REPLACEMENT_WITH_SEPARATOR_PATTERN,
+)
+from utils.constants import SEPARATOR as COMMON_SEPARATOR
+from utils.constants import (
+    UNAVAILABLE_CHAR_IN_WINDOWS_PATTERN as COMMON_UNAVAILABLE_CHAR_IN_WINDOWS_PATTERN,
+)
+from utils.constants import URL_ENCODED_CHAR_PATTERN as COMMON_URL_ENCODED_CHAR_PATTERN
 from utils.constants import VALID_EXTENSIONS as COMMON_VALID_EXTENSIONS
-from utils.stdout import Bcolors, stdout_exception_message, styled_stdout
-from utils.with_statements import add_extra_arguments_to, task
+from utils.constants import ZERO_PADDING_DIGIT as COMMON_ZERO_PADDING_DIGIT
+from utils.directory import DirectoryCache
+from utils.extension import ExtensionIndex
+from utils.journal import Journal
+from utils.manifest import (
+    STDIN,
+    ManifestDelimiter,
+    ManifestEntry,
+    manifest_entries_from,
+)
+from utils.ordering import ImageOrder, sort_images
+from utils.replacer import MultiReplacer, ReplacementMode, read_rules, rules_of
+from utils.stdout import Bcolors, Verbosity, reporter, stdout_exception_message
+from utils.transfer import LinkMode, transfer
+from utils.with_statements import add_extra_arguments_to, print_arguments, task
 
 
 class DefaultValues(enum.Enum):
@@ -27,33 +66,74 @@ class DefaultValues(enum.Enum):
     NEW_NAME = ""
     ANY_EXTENSION_PATTERN: Pattern = COMMON_ANY_EXTENSION_PATTERN
 
-    REPLACEMENT_WITH_SEPARATOR_PATTERN: Pattern = re.compile(r"[　\s.,_＿〜～\―\‐\˗֊\‐\‑\‒\–\⁃\⁻\₋\−\﹣\－\—\―\━\─\-\ー]")
-    SEPARATOR = "_"
+    REPLACEMENT_WITH_SEPARATOR_PATTERN: Pattern = COMMON_REPLACEMENT_WITH_SEPARATOR_PATTERN
+    SEPARATOR = COMMON_SEPARATOR
 
-    ###########################################################
-    # Characters that cannot be used in file
-    # windows /:*?"<>|¥
-    # mac /
-    # On mac, "/" cannot be used in filenames because it is a path separator.
-    # finder can use "/", but if you look at the filename in a shell,
-    # you will see ":".
-    ###########################################################
-    ALTERNATIVE_UNAVAILABLE_CHAR_IN_WINDOWS = "-"
-    UNAVAILABLE_CHAR_IN_WINDOWS_PATTERN: Pattern = re.compile(r'[\\/:*?"<>|¥]')
+    # Characters that cannot be used in file. See utils.constants.
+    ALTERNATIVE_UNAVAILABLE_CHAR_IN_WINDOWS = COMMON_ALTERNATIVE_UNAVAILABLE_CHAR_IN_WINDOWS
+    UNAVAILABLE_CHAR_IN_WINDOWS_PATTERN: Pattern = COMMON_UNAVAILABLE_CHAR_IN_WINDOWS_PATTERN
 
-    ALTERNATIVE_URL_ENCODED_CHAR = "X"
-    URL_ENCODED_CHAR_PATTERN: Pattern = re.compile(r"[^-_a-zA-Z0-9]")
+    ALTERNATIVE_URL_ENCODED_CHAR = COMMON_ALTERNATIVE_URL_ENCODED_CHAR
+    URL_ENCODED_CHAR_PATTERN: Pattern = COMMON_URL_ENCODED_CHAR_PATTERN
 
-    ZERO_PADDING_DIGIT = 3
+    ZERO_PADDING_DIGIT = COMMON_ZERO_PADDING_DIGIT
 
     VALID_EXTENSIONS: List[str] = COMMON_VALID_EXTENSIONS
 
     COMPARISON_FILE_NAME = "comparison.txt"
 
+    # Copying keeps the renamed image independent of the original image.
+    # hardlink and reflink write no data, which is much faster for large images.
+    LINK_MODE = LinkMode.COPY.value
+
+    WORKERS = 1
+
+    # A single process walks the directory.
+    DISCOVERY_WORKERS = 1
+
+    # The images are numbered in the order of the directory listing.
+    ORDER = ImageOrder.NONE.value
+
+    # workers * IN_FLIGHT_PER_WORKER
+    IN_FLIGHT = None
+
+    COMPARISON_FORMATS: List[str] = [ComparisonFormat.TEXT.value]
+
+    # The later image overwrites the earlier image with a warning, as before the collision policies.
+    COLLISION_POLICY = CollisionPolicy.OVERWRITE.value
+
+    MANIFEST_DELIMITER = ManifestDelimiter.NEWLINE.value
+
+    REPLACEMENT_MODE = ReplacementMode.SUCCESSIVE.value
+
+    # The options not changing the output images, which are not a part of the key of the processing cache.
+    OPTIONS_NOT_CACHED: List[str] = [
+        "dir_path",
+        "dest",
+        "run",
+        "verbosity",
+        "workers",
+        "discovery_workers",
+        "in_flight",
+        "comparison_formats",
+        "save_plan",
+        "resume",
+        "incremental",
+        "content_hash",
+        "manifest",
+        "manifest_delimiter",
+    ]
+
+    # The number of images whose names are converted at once.
+    PLAN_BATCH_SIZE = 1024
+
 
 class RenameArgsValidator:
     def __init__(self, args):
         self.options = args
+        # The image paths found while validating are kept,
+        # so the directory is not walked again after the validation.
+        self.image_paths: Optional[Iterator[pathlib.Path]] = None
 
     def validate_options(self) -> None:
         skip_fields = [
@@ -61,6 +141,7 @@ class RenameArgsValidator:
             "now_str",
             "loop_count",
             "comparison_log",
+            "directories",  # shared by the instances in a task
         ]
         for class_arg in Rename.__dataclass_fields__.keys():
             if class_arg in skip_fields:
@@ -69,10 +150,60 @@ class RenameArgsValidator:
                 raise ValueError(f'"{class_arg}" options is not passed.')
 
     def validate_image_paths(self) -> None:
-        get_image_paths_from_within(
-            dir_path=self.options.dir_path, valid_extensions=DefaultValues.VALID_EXTENSIONS.value
+        if self.options.manifest:
+            self.validate_manifest()
+        else:
+            self.image_paths = get_image_paths_from_within(
+                dir_path=self.options.dir_path,
+                valid_extensions=self.options.valid_extensions,
+                workers=self.options.discovery_workers,
+            )
+        self.image_paths = sort_images(self.image_paths, order=self.options.order)  # type: ignore
+
+    def validate_manifest(self) -> None:
+        """The images are read from the manifest lazily and the directory is not walked."""
+        if not pathlib.Path(self.options.dir_path).is_dir():
+            raise ValueError(f'"{self.options.dir_path}" is not a directory. Please specify a directory path.')
+        if self.options.manifest != STDIN and not pathlib.Path(self.options.manifest).is_file():
+            raise ValueError(f'--manifest option "{self.options.manifest}" is not a file.')
+        self.image_paths = manifest_entries_from(
+            manifest=self.options.manifest,
+            dir_path=self.options.dir_path,
+            valid_extensions=self.options.valid_extensions,
+            delimiter=self.options.manifest_delimiter,
         )
 
+    def validate_replacement_rules(self) -> None:
+        if not self.options.replacement_rules:
+            return
+        if not pathlib.Path(self.options.replacement_rules).is_file():
+            raise ValueError(f'--replacement_rules option "{self.options.replacement_rules}" is not a file.')
+        read_rules(self.options.replacement_rules)
+
+    def validate_workers(self) -> None:
+        if self.options.workers < 1:
+            raise ValueError(f'--workers option "{self.options.workers}" should be 1 or more.')
+
+    def validate_discovery_workers(self) -> None:
+        if self.options.discovery_workers < 1:
+            raise ValueError(f'--discovery_workers option "{self.options.discovery_workers}" should be 1 or more.')
+
+    def validate_in_flight(self) -> None:
+        if self.options.in_flight is not None and self.options.in_flight < 1:
+            raise ValueError(f'--in_flight option "{self.options.in_flight}" should be 1 or more.')
+
+    def validate_resume(self) -> None:
+        if not self.options.resume:
+            return
+        resume = pathlib.Path(self.options.resume)
+        if not resume.is_dir():
+            raise ValueError(f'--resume option "{self.options.resume}" is not a directory.')
+        get_now_str_from(dest_dir_name=resume.name, dir_path=pathlib.Path(self.options.dir_path))
+        if not (resume / Journal.FILE_NAME).is_file():
+            raise ValueError(f'No journal in "{self.options.resume}". The task cannot be resumed.')
+        if not self.options.run:
+            raise ValueError("--resume option requires --run option.")
+
     def validate_new_name(self) -> None:
         ext_pattern = DefaultValues.ANY_EXTENSION_PATTERN.value
         if ext_pattern.search(self.options.new_name):
@@ -80,8 +211,13 @@ class RenameArgsValidator:
 
     def validate(self) -> None:
         self.validate_options()
+        self.validate_discovery_workers()
         self.validate_image_paths()
         self.validate_new_name()
+        self.validate_replacement_rules()
+        self.validate_workers()
+        self.validate_in_flight()
+        self.validate_resume()
 
 
 @dataclasses.dataclass
@@ -97,6 +233,8 @@ class Rename:
 
     chars_before_replacement: List[str] = dataclasses.field(default_factory=lambda: [])
     chars_after_replacement: List[str] = dataclasses.field(default_factory=lambda: [])
+    replacement_rules: Optional[str] = None
+    replacement_mode: str = DefaultValues.REPLACEMENT_MODE.value
 
     prefix: str = DefaultValues.PREFIX.value
     suffix: str = DefaultValues.SUFFIX.value
@@ -118,11 +256,17 @@ class Rename:
     # To create a list of names of converted images,
     # each time an instance is created from this class,
     # this list is not initialized and the same list is used.
+    # main() does not use this list but writes the comparisons with ComparisonWriter
+    # so that the memory does not grow with the number of images.
     comparison_log: ClassVar[list] = []
 
     is_output_to_same_dir: bool = False
+    link_mode: str = DefaultValues.LINK_MODE.value
     run: bool = False
 
+    # the directories already created in the task, shared by the instances.
+    directories: Optional[DirectoryCache] = None
+
     def __post_init__(self) -> None:
         if type(self.image_path) is str:
             self.image_path: pathlib.Path = pathlib.Path(self.image_path)
@@ -138,20 +282,22 @@ class Rename:
         self.relative_image_parent_path: pathlib.Path = self.relative_image_path.parent  # => './temp/
 
         self.original_image_name: str = self.image_path.name  # type: ignore
-        self.original_image_stem: str = self.image_path.stem  # type: ignore
 
         # The name of the file to be converted may contain characters that are mistaken for file extensions.
-        # In that case, the confusing name is not the file extension, so remove from image_path.suffixes
-        self.ext: str = "".join((s for s in self.image_path.suffixes if s in self.valid_extensions))  # type: ignore
-        # './test.tar.gz' => ['.tar', '.gz']
+        # In that case, the confusing name is not the file extension, so only a valid extension is taken.
+        # './test.vol1.png' => '.png'
+        self.ext: str = ExtensionIndex.of(self.valid_extensions).extension_of(self.original_image_name)
+        self.original_image_stem: str = (
+            self.original_image_name[: -len(self.ext)] if self.ext else self.image_path.stem  # type: ignore
+        )
 
         self.renamed_image_stem: str = self.original_image_stem
         self.zero_padding_string: str = "{{0:0{}d}}".format(self.zero_padding_digit)  # => {0:03}
 
         self.dest_dir_name = get_dest_dir_name(dir_path=self.dir_path, now_str=self.now_str)
 
+        # The directory is created when the image is output, so that computing the name touches no file.
         self.dest_dir_path: pathlib.Path = self.dest / pathlib.Path(self.dest_dir_name)
-        self.dest_dir_path.mkdir(exist_ok=True)
 
         if self.loop_count == 1 and self.comparison_length > 0:
             # An error may occur during the processing of multiple
@@ -198,6 +344,23 @@ class Rename:
                 default=[],
                 help="The part of the image after being changed",
             )
+            arg_parser.add_argument(
+                "-rules",
+                "--replacement_rules",
+                type=str,
+                help="A file of the replacement rules applied after -before and -after. "
+                "Each line is the part before and the part after the replacement separated by a tab.",
+                default=None,
+            )
+            arg_parser.add_argument(
+                "-rm",
+                "--replacement_mode",
+                type=str,
+                choices=ReplacementMode.values(),
+                help="successive: each replacement is applied to the result of the previous ones. "
+                "simultaneous: all replacements are applied to the original name at once.",
+                default=DefaultValues.REPLACEMENT_MODE.value,
+            )
 
             arg_parser.add_argument(
                 "-p", "--prefix", type=str, help="image name prefix.", default=DefaultValues.PREFIX.value
@@ -267,7 +430,127 @@ class Rename:
                 action="store_true",
             )
 
-            args = arg_parser.parse_args()
+            arg_parser.add_argument(
+                "-lm",
+                "--link_mode",
+                type=str,
+                choices=LinkMode.values(),
+                help="How to output the renamed images. "
+                "hardlink and reflink write no image data and fall back to copy when they are not supported. "
+                "A hardlinked image shares the inode with the original image, "
+                "so editing either of them changes the other.",
+                default=DefaultValues.LINK_MODE.value,
+            )
+
+            arg_parser.add_argument(
+                "-w",
+                "--workers",
+                type=int,
+                help="The number of threads that output the renamed images.",
+                default=DefaultValues.WORKERS.value,
+            )
+
+            arg_parser.add_argument(
+                "--discovery_workers",
+                type=int,
+                help="The number of processes that walk the subdirectories of dir_path. "
+                "The images are found in the same order regardless of the number.",
+                default=DefaultValues.DISCOVERY_WORKERS.value,
+            )
+
+            arg_parser.add_argument(
+                "--order",
+                type=str,
+                choices=ImageOrder.values(),
+                help="The order in which the images are numbered. natural: by the path with the numbers "
+                "compared as numbers. mtime: by the modification time. exif: by the capture time in EXIF. "
+                "size: by the file size. none: the order of the directory listing, which depends on the filesystem.",
+                default=DefaultValues.ORDER.value,
+            )
+
+            arg_parser.add_argument(
+                "--in_flight",
+                type=int,
+                help="The number of file operations submitted to the workers ahead of the one being waited for, "
+                "which bounds the memory however many images there are. 4 times the workers by default.",
+                default=DefaultValues.IN_FLIGHT.value,
+            )
+
+            arg_parser.add_argument(
+                "-cf",
+                "--comparison_formats",
+                nargs="*",
+                type=str,
+                choices=ComparisonFormat.values(),
+                help="Formats of the files recording the names before and after the conversion. txt csv jsonl",
+                default=DefaultValues.COMPARISON_FORMATS.value,
+            )
+
+            arg_parser.add_argument(
+                "-collision",
+                "--collision_policy",
+                type=str,
+                choices=CollisionPolicy.values(),
+                help="What to do when images are output to the same path. "
+                "overwrite: the later image overwrites the earlier image with a warning. "
+                "error: stop before any image is output. suffix: add a number to the name. "
+                "skip: skip the later image.",
+                default=DefaultValues.COLLISION_POLICY.value,
+            )
+            arg_parser.add_argument(
+                "-collision_case_insensitive",
+                "--is_collision_case_insensitive",
+                help="Whether to detect collisions case-insensitively, as on the filesystems of mac and windows.",
+                action="store_true",
+            )
+
+            arg_parser.add_argument(
+                "--save_plan",
+                type=str,
+                help="Save the plan of the renamed paths to a file, which can be applied later by ic_rename_apply.",
+                default=None,
+            )
+
+            arg_parser.add_argument(
+                "--resume",
+                type=str,
+                help="The directory where the interrupted task output the images. "
+                "The images already output are skipped and the same serial numbers are used. "
+                "Pass the same options as the interrupted task.",
+                default=None,
+            )
+
+            arg_parser.add_argument(
+                "--manifest",
+                type=str,
+                help="A file listing the images to rename, or - for the standard input, instead of walking dir_path. "
+                "Each record is the path of an image, absolute or relative to dir_path, "
+                "optionally followed by a tab and the new name of the image.",
+                default=None,
+            )
+            arg_parser.add_argument(
+                "--manifest_delimiter",
+                type=str,
+                choices=ManifestDelimiter.values(),
+                help="The delimiter of the records of the manifest. nul reads the output of find -print0.",
+                default=DefaultValues.MANIFEST_DELIMITER.value,
+            )
+
+            arg_parser.add_argument(
+                "--incremental",
+                action="store_true",
+                help="Skip the images unchanged since they were output with the same options "
+                "by the previous tasks to the same --dest. The outputs are recorded in "
+                f"{ProcessingCache.FILE_NAME} in --dest.",
+            )
+            arg_parser.add_argument(
+                "--content_hash",
+                action="store_true",
+                help="With --incremental, compare the contents of the images whose modification times have changed.",
+            )
+
+        args = arg_parser.parse_args()
+        print_arguments(args)
         return args
 
     @property
@@ -357,12 +640,14 @@ class Rename:
         if self.is_all_replaced_with_new_name:
             return
 
-        if not self.chars_before_replacement:
+        rules = rules_of(self.chars_before_replacement, self.chars_after_replacement, self.replacement_rules)
+        if ReplacementMode(self.replacement_mode) is ReplacementMode.SIMULTANEOUS:
+            self.renamed_image_stem = MultiReplacer.of(rules, mode=self.replacement_mode).replace(
+                self.renamed_image_stem
+            )
             return
 
-        # If the number of contents in the two arrays do not match,
-        # the larger portion of the array is not processed.
-        for before, after in zip(self.chars_before_replacement, self.chars_after_replacement):
+        for before, after in rules:
             self.replace_word(before=before, after=after)
 
     def add_prefix_suffix(self) -> None:
@@ -389,7 +674,7 @@ class Rename:
         change illegal characters that can be fixed from full-width to half-width.
         >>> name００１.png => name001.png
         """
-        self.renamed_image_stem = jaconv.z2h(self.renamed_image_stem, kana=False, ascii=True, digit=True)
+        self.renamed_image_stem = zen2han(self.renamed_image_stem)
 
     def replace_unavailable_file_name_chars(self) -> None:
         """
@@ -442,8 +727,11 @@ class Rename:
         self.renamed_image_stem = f"{self.dirs_prefix}{self.renamed_image_stem}"
 
     def _make_recursive_dirs(self) -> None:
-        if not self.is_output_to_same_dir:
-            pathlib.Path.mkdir(self.renamed_relative_image_parent_path, parents=True, exist_ok=True)
+        dir_path = self.dest_dir_path if self.is_output_to_same_dir else self.renamed_relative_image_parent_path
+        if self.directories is not None:
+            self.directories.make(dir_path)
+            return
+        dir_path.mkdir(parents=True, exist_ok=True)
 
     def rename(self) -> None:
         """
@@ -478,6 +766,15 @@ class Rename:
         bar.png => bar002.png
         """
 
+        self.convert()
+
+        reporter.report(Bcolors.OKGREEN.value, self.comparison)  # type: ignore
+        if self.run:
+            self.output()
+            self.append_comparison()
+
+    def convert(self) -> None:
+        """Convert the image name. No file is touched."""
         self.replace_all()
         self.replace_words()
         self.zen2han()
@@ -488,26 +785,15 @@ class Rename:
         self.add_serial_number()
         self.add_dirs_prefix()
 
-        styled_stdout(Bcolors.OKGREEN.value, self.comparison)  # type: ignore
-        if self.run:
-            self._make_recursive_dirs()
-            with tempfile.TemporaryDirectory() as td:
-                # Changing the name and location of an image will cause the image
-                # to disappear from its original location, so to keep the original image intact,
-                # evacuate the original image, including metadata, to a temporary directory and
-                # return the evacuated image to its original location once the image is renamed.
-                td: pathlib.Path = pathlib.Path(td)  # type: ignore
-                shutil.copy2(str(self.image_path), str(td))
-                copy_image: pathlib.Path = td / self.original_image_name  # type:ignore
-
-                # use Path.replace instead of Path.rename.
-                # so FileExistsError will not be raised.
-                self.image_path.replace(self.renamed_image_path)  # type:ignore
-
-                # bring original image back to original location.
-                shutil.move(copy_image, self.image_path)  # type:ignore
-
-            self.append_comparison()
+    def output(self) -> None:
+        """Output the renamed image to the destination.
+        This method is thread-safe, so the images can be output in parallel.
+        """
+        self._make_recursive_dirs()
+        # The original image is kept intact in its original location,
+        # and the renamed image is linked or copied to the destination.
+        # An existing image in the destination is overwritten like Path.replace.
+        transfer(src=self.image_path, dst=self.renamed_image_path, mode=self.link_mode)  # type:ignore
 
     @property
     def comparison_length(self) -> int:
@@ -516,10 +802,7 @@ class Rename:
 
     @property
     def comparison(self) -> str:
-        return (
-            f"\nNAME: {self.original_image_name} => {self.renamed_image_name}\n"
-            f"PATH: {self.image_path} => {self.renamed_image_path}\n"
-        )
+        return get_comparison(original_path=self.image_path, renamed_path=self.renamed_image_path)
 
     def append_comparison(self) -> None:
         self.comparison_log.append(self.comparison)
@@ -552,53 +835,149 @@ class Rename:
         cls.comparison_log = list()
 
 
+@dataclasses.dataclass
+class RunContext:
+    """The state shared by all images of a task, created once per invocation.
+    The timestamp is taken once, so all images are output to the same destination directory.
+    """
+
+    dir_path: pathlib.Path
+    dest_dir_path: pathlib.Path
+    now_str: str
+    transformer: NameTransformer
+    extension_index: ExtensionIndex
+    directories: DirectoryCache = dataclasses.field(default_factory=DirectoryCache)
+
+    @classmethod
+    def from_args(cls, args) -> "RunContext":
+        dir_path = pathlib.Path(args.dir_path)
+        if getattr(args, "resume", None):
+            # output to the directory of the interrupted task.
+            resume = pathlib.Path(args.resume)
+            now_str = get_now_str_from(dest_dir_name=resume.name, dir_path=dir_path)
+            dest = resume.parent
+        else:
+            now_str = datetime2str()
+            dest = pathlib.Path(args.dest)
+        return cls(
+            dir_path=dir_path,
+            dest_dir_path=Rename.get_dest_dir_path(now_str=now_str, dir_path=dir_path, dest=dest),
+            now_str=now_str,
+            transformer=NameTransformer.from_args(args),
+            extension_index=ExtensionIndex.of(args.valid_extensions),
+        )
+
+
+def get_processing_cache(args, dest_path: pathlib.Path) -> Optional[ProcessingCache]:
+    """The cache of the images output by the previous tasks, if --incremental is passed."""
+    if not args.incremental:
+        return None
+    options = {k: v for k, v in vars(args).items() if k not in DefaultValues.OPTIONS_NOT_CACHED.value}
+    if args.replacement_rules:
+        # the images are renamed again when the rules in the file are changed.
+        options["replacement_rules"] = read_rules(args.replacement_rules)
+    return ProcessingCache(
+        dest_path=dest_path,
+        task_name="rename",
+        options=options,
+        use_content_hash=args.content_hash,
+    )
+
+
+def plan_renames(args, image_paths: Iterator[Union[pathlib.Path, ManifestEntry]], context: RunContext) -> RenamePlan:
+    """Compute the new paths of all images. No file is touched.
+    The serial numbers are decided here, so the result does not depend on how the plan is applied.
+    The names are converted in batches by NameTransformer, which gives the same names as Rename.
+    An image given with a new name in the manifest is output with the name as is.
+    """
+    dir_path = context.dir_path
+    plan = RenamePlan(
+        dir_path=dir_path,
+        dest_dir_path=context.dest_dir_path,
+        collision_index=CollisionIndex(
+            policy=args.collision_policy,
+            case_insensitive=args.is_collision_case_insensitive,
+            separator=args.separator,
+        ),
+    )
+    transformer = context.transformer
+    extension_index = context.extension_index
+
+    serial = 0
+    for batch in iter_batches(image_paths, size=DefaultValues.PLAN_BATCH_SIZE.value):
+        new_names = [image.new_name if isinstance(image, ManifestEntry) else None for image in batch]
+        relative_image_paths = [
+            (image.path if isinstance(image, ManifestEntry) else image).relative_to(dir_path) for image in batch
+        ]
+        exts = [extension_index.extension_of(p.name) for p in relative_image_paths]
+        stems = [p.name[: -len(ext)] if ext else p.stem for p, ext in zip(relative_image_paths, exts)]
+        serials = range(serial + 1, serial + len(batch) + 1)
+        renamed_stems = transformer.transform_batch(
+            stems, serials=serials, relative_parent_parts=[p.parent.parts for p in relative_image_paths]
+        )
+
+        for serial, relative_image_path, renamed_stem, ext, new_name in zip(
+            serials, relative_image_paths, renamed_stems, exts, new_names
+        ):
+            renamed_image_name = f"{renamed_stem}{ext}"
+            if new_name is not None:
+                renamed_image_name, ext = new_name, extension_index.extension_of(new_name)
+            parent = relative_image_path.parent.as_posix()
+            target = (
+                renamed_image_name if args.is_output_to_same_dir or parent == "." else f"{parent}/{renamed_image_name}"
+            )
+            entry = plan.add_relative(serial=serial, source=relative_image_path.as_posix(), target=target, ext=ext)
+            if entry is None:
+                reporter.warning(f"'{dir_path / relative_image_path}' is skipped. '{target}' is already planned.")
+            elif reporter.verbosity >= Verbosity.NORMAL:
+                reporter.report(
+                    Bcolors.OKGREEN.value,  # type: ignore
+                    get_comparison(original_path=plan.source_path(entry), renamed_path=plan.target_path(entry)),
+                )
+            reporter.advance()
+    return plan
+
+
 def main():
     with task(args=Rename.get_args(), task_name="Rename") as args:  # function name
         try:
-            image_paths = get_image_paths_from_within(
-                dir_path=args.dir_path, valid_extensions=DefaultValues.VALID_EXTENSIONS.value
-            )
             validator = RenameArgsValidator(args=args)
             validator.validate()
+            image_paths: Iterator[pathlib.Path] = validator.image_paths  # type: ignore
         except ValueError as value_error:
             stdout_exception_message(value_error)
             return
 
-        for loop_count, image_path in enumerate(image_paths):
-            # file '/User/macbook/a.jpg'
-
-            loop_count += 1
-            now_str = datetime2str()
-
-            rename = Rename(
-                image_path=image_path,
-                now_str=now_str,
-                dir_path=args.dir_path,
-                dest=args.dest,
-                is_all_replaced_with_new_name=args.is_all_replaced_with_new_name,
-                new_name=args.new_name,
-                chars_before_replacement=args.chars_before_replacement,
-                chars_after_replacement=args.chars_after_replacement,
-                prefix=args.prefix,
-                suffix=args.suffix,
-                is_separator_and_delimiter_replaced=args.is_separator_and_delimiter_replaced,
-                separator=args.separator,
-                alternative_unavailable_char_in_windows=args.alternative_unavailable_char_in_windows,
-                is_url_encoded_char_replaced=args.is_url_encoded_char_replaced,
-                alternative_url_encoded_char=args.alternative_url_encoded_char,
-                is_serial_number_added=args.is_serial_number_added,
-                loop_count=loop_count,
-                zero_padding_digit=args.zero_padding_digit,
-                valid_extensions=args.valid_extensions,
-                run=args.run,
-            )
-
-            try:
-                rename.rename()
-            except ValueError as value_error:
-                stdout_exception_message(value_error)
-                return
-
-        Rename.make_comparison_file(
-            dest_dir_path=Rename.get_dest_dir_path(now_str=now_str, dir_path=args.dir_path, dest=args.dest)
-        )
+        try:
+            # Plan all names up front, then output the images.
+            # The serial numbers and the comparison log are decided in the plan,
+            # so they are the same regardless of the number of workers.
+            context = RunContext.from_args(args)
+            reporter.start()
+            plan = plan_renames(args=args, image_paths=image_paths, context=context)
+            if plan.collision_index.policy is CollisionPolicy.OVERWRITE:
+                for target, serials in plan.collisions.items():
+                    reporter.warning(
+                        f"{len(serials)} images are output to the same path '{target}'. serials: {serials}"
+                    )
+
+            if args.save_plan:
+                plan.save(args.save_plan)
+
+            if args.run:
+                cache = get_processing_cache(args, dest_path=context.dest_dir_path.parent)
+                with cache or contextlib.nullcontext():
+                    apply_plan(
+                        plan=plan,
+                        link_mode=args.link_mode,
+                        workers=args.workers,
+                        comparison_formats=args.comparison_formats,
+                        resume=bool(args.resume),
+                        directories=context.directories,
+                        cache=cache,
+                        in_flight=args.in_flight,
+                    )
+        except ValueError as value_error:
+            stdout_exception_message(value_error)
+            return
+        reporter.summary(task_name="Rename")
@@ -1,131 +1,537 @@
-# import argparse
-# import enum
-# import os
-# from decimal import ROUND_HALF_UP, Decimal
-# from pathlib import Path
-#
-# from src.utils.stdout import Bcolors, Stdout
-# from src.utils.with_statements import add_extra_arguments_to, task
-#
-#
-# class DefaultValues(enum.Enum):
-#     PREFIX = "resize_"
-#     VALID_EXTENSIONS = [
-#         ".jpg",
-#         ".jpeg",
-#         ".JPG",
-#         ".JPEG",
-#         ".jpe",
-#         ".jfif",
-#         ".pjpeg",
-#         ".pjp",
-#         ".png",
-#         ".gif",
-#         ".tiff",
-#         ".tif",
-#         ".webp",
-#         ".svg",
-#         ".svgz",
-#     ]
-#
-#
-# def get_args():
-#     arg_parser = argparse.ArgumentParser()
-#     with add_extra_arguments_to(arg_parser) as arg_parser:
-#         arg_parser.add_argument("width", type=int)
-#         arg_parser.add_argument("-hi", "--height", default=0, type=int)
-#         arg_parser.add_argument("-ka", "--keep_aspect", action="store_true")
-#
-#         arg_parser.add_argument("-add_prefix", "--is_prefix_added", action="store_true")
-#         arg_parser.add_argument(
-#             "-p", "--prefix", help="you can add an extra word as prefix.", default=DefaultValues.PREFIX.value
-#         )
-#         args = arg_parser.parse_args()
-#     return args
-#
-#
-# def main():
-#     with task(args=get_args(), task_name="resize") as args:
-#
-#         from PIL import Image
-#
-#         # arguments
-#         run = args.run
-#         dir_path = args.dir_path  # => /Users/macbook/images
-#         new_width = args.width
-#         new_height = args.height
-#         prefix = args.prefix
-#         is_prefix_added = args.is_prefix_added
-#         whether_to_keep_aspect_ratio = args.keep_aspect
-#
-#         valid_extensions = args.valid_extensions
-#
-#         file_paths = get_image_paths(dir_path=dir_path)
-#
-#         target_images = "\n".join(file_paths)
-#         Stdout.styled_stdout(
-#             Bcolors.OKBLUE.value,
-#             f"Options => \n"
-#             f"directory path: {dir_path}\n"
-#             f"width: {new_width}\n"
-#             f"height: {new_height}\n"
-#             f"whether to keep aspect ratio: {whether_to_keep_aspect_ratio}\n"
-#             f"images_in_directory: {target_images}\n",
-#         )
-#
-#         Stdout.styled_stdout(Bcolors.OKCYAN.value, "the task gets start.")
-#
-#         for file_path in file_paths:
-#             # file '/User/macbook/a.jpg'
-#             original_file_name_with_ext = os.path.basename(file_path)
-#             file_name, ext = os.path.splitext(original_file_name_with_ext)  # => a, .jpg
-#
-#             if ext not in valid_extensions:
-#                 Stdout.styled_stdout(Bcolors.WARNING.value, f"{file_path} is skipped. the extension is not valid.")
-#                 continue
-#
-#             image = Image.open(file_path)
-#             aspect_ratio = image.height / image.width
-#
-#             if whether_to_keep_aspect_ratio:
-#                 new_height = new_width * aspect_ratio
-#             else:
-#                 if not new_height:
-#                     new_height = image.height
-#
-#             valid_width = int(Decimal(str(new_width)).quantize(Decimal("0"), rounding=ROUND_HALF_UP))
-#             valid_height = int(Decimal(str(new_height)).quantize(Decimal("0"), rounding=ROUND_HALF_UP))
-#             resized_image = image.resize((valid_width, valid_height), Image.ANTIALIAS)
-#
-#             resized_image_dir_path = os.path.join(dir_path, "resized_images")
-#             Path(f"{resized_image_dir_path}").mkdir(parents=True, exist_ok=True)
-#
-#             new_file_name = prefix + file_name if is_prefix_added else file_name
-#             new_file_name_with_ext = f"{new_file_name}{ext}"
-#             resized_image_path = os.path.join(resized_image_dir_path, new_file_name_with_ext)
-#
-#             if run:
-#                 resized_image.save(resized_image_path)
-#
-#                 Stdout.styled_stdout(
-#                     Bcolors.OKGREEN.value,
-#                     f"Original image name: {original_file_name_with_ext}\n"
-#                     f"Resized image name: {new_file_name_with_ext}\n"
-#                     f"Width: {str(image.width)} => {str(new_width)}\n"
-#                     f"Height: {str(image.height)} => {str(new_height)}\n"
-#                     f"Aspect ratio: {str(aspect_ratio)}\n"
-#                     f"Size: {str(os.stat(resized_image_path).st_size)}\n"
-#                     f"Info: {str(image.info)}\n"
-#                     f"##################################################",
-#                 )
-#             else:
-#                 Stdout.styled_stdout(
-#                     Bcolors.OKGREEN.value,
-#                     f"Original image name: {original_file_name_with_ext}\n"
-#                     f"Resized image name: {new_file_name_with_ext}\n"
-#                     f"Width: {str(image.width)} => {str(new_width)}\n"
-#                     f"Height: {str(image.height)} => {str(new_height)}\n"
-#                     f"Aspect ratio: {str(aspect_ratio)}\n"
-#                     f"Info: {str(image.info)}\n"
-#                     f"##################################################",
-#                 )
+import argparse
+import contextlib
+import dataclasses
+import enum
+import os
+import pathlib
+from decimal import ROUND_HALF_UP, Decimal
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Union
+
+from utils import datetime2str, get_dest_dir_name, get_image_paths_from_within
+from utils.cache import ProcessingCache
+from utils.constants import SEPARATOR as COMMON_SEPARATOR
+from utils.constants import VALID_EXTENSIONS as COMMON_VALID_EXTENSIONS
+from utils.constants import ZERO_PADDING_DIGIT as COMMON_ZERO_PADDING_DIGIT
+from utils.directory import DirectoryCache
+from utils.executor import execute_in_processes
+from utils.extension import ExtensionIndex
+from utils.ordering import ImageOrder, sort_images
+from utils.stdout import Bcolors, reporter, stdout_exception_message
+from utils.with_statements import add_extra_arguments_to, print_arguments, task
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class ResizeQuality(enum.Enum):
+    """The balance between the speed and the quality of resizing."""
+
+    # decode at the scale nearest to the new size and resample with a bilinear filter.
+    FAST = "fast"
+    # decode at a scale not below twice the new size and resample with LANCZOS.
+    BALANCED = "balanced"
+    # decode at full size and resample with LANCZOS.
+    BEST = "best"
+
+    @classmethod
+    def values(cls) -> List[str]:
+        return [var.value for var in cls]
+
+
+# quality => (the name of the resampling filter, reducing gap)
+# The image is decoded at the smallest JPEG scale (1/2, 1/4, 1/8) not below the new size times the reducing gap,
+# and reduced by an integer factor while it is at least the reducing gap times larger than the new size.
+# No reducing gap means the image is decoded and resampled at full size.
+RESIZE_SETTINGS: Dict[ResizeQuality, Tuple[str, Optional[float]]] = {
+    ResizeQuality.FAST: ("BILINEAR", 1.0),
+    ResizeQuality.BALANCED: ("LANCZOS", 2.0),
+    ResizeQuality.BEST: ("LANCZOS", None),
+}
+
+
+def resize_settings_of(quality: str) -> Tuple[int, Optional[float]]:
+    """The resampling filter and the reducing gap of the quality.
+    Pillow is imported by the worker resizing the images, not when the command starts.
+    """
+    from PIL import Image
+
+    name, reducing_gap = RESIZE_SETTINGS[ResizeQuality(quality)]
+    # Pillow < 9.1 has the filters on Image.
+    return getattr(getattr(Image, "Resampling", Image), name), reducing_gap
+
+
+class DefaultValues(enum.Enum):
+    DEST = pathlib.Path.cwd()
+
+    # added with the separator as Rename does. image.png => resize_image.png
+    PREFIX = "resize"
+    SUFFIX = ""
+    SEPARATOR = COMMON_SEPARATOR
+    ZERO_PADDING_DIGIT = COMMON_ZERO_PADDING_DIGIT
+
+    # Pillow cannot read svg.
+    VALID_EXTENSIONS: List[str] = [ext for ext in COMMON_VALID_EXTENSIONS if not ext.startswith(".svg")]
+
+    # Resizing is CPU-bound, so all cores are used.
+    WORKERS = os.cpu_count() or 1
+
+    # A single process walks the directory.
+    DISCOVERY_WORKERS = 1
+
+    # The images are numbered in the order of the directory listing.
+    ORDER = ImageOrder.NONE.value
+
+    RESIZE_QUALITY = ResizeQuality.BALANCED.value
+
+    # The options not changing the output images, which are not a part of the key of the processing cache.
+    OPTIONS_NOT_CACHED: List[str] = [
+        "dir_path",
+        "dest",
+        "run",
+        "verbosity",
+        "workers",
+        "discovery_workers",
+        "incremental",
+        "content_hash",
+    ]
+
+
+def round_half_up(value: float) -> int:
+    """
+    >>> round_half_up(2.5)
+    3
+    """
+    return int(Decimal(str(value)).quantize(Decimal("0"), rounding=ROUND_HALF_UP))
+
+
+def get_resized_size(
+    original_size: Tuple[int, int], width: int, height: int = 0, is_aspect_ratio_kept: bool = False
+) -> Tuple[int, int]:
+    """
+    >>> get_resized_size((4000, 3000), width=800, is_aspect_ratio_kept=True)
+    (800, 600)
+    >>> get_resized_size((4000, 3000), width=800)
+    (800, 3000)
+    """
+    original_width, original_height = original_size
+    if is_aspect_ratio_kept:
+        height = width * original_height / original_width
+    elif not height:
+        height = original_height
+    return max(round_half_up(width), 1), max(round_half_up(height), 1)
+
+
+@dataclasses.dataclass(frozen=True)
+class ResizeTask:
+    """An image to be resized, sent to a worker process."""
+
+    serial: int
+    src: str
+    dst: str
+    width: int
+    height: int = 0
+    is_aspect_ratio_kept: bool = False
+    quality: str = ResizeQuality.BALANCED.value
+
+
+@dataclasses.dataclass(frozen=True)
+class ResizeResult:
+    serial: int
+    src: str
+    dst: str
+    original_size: Tuple[int, int] = (0, 0)
+    resized_size: Tuple[int, int] = (0, 0)
+    # the reason why the image is not resized.
+    error: str = ""
+
+
+@dataclasses.dataclass(frozen=True)
+class RenditionTask:
+    """An image resized to several widths keeping the aspect ratio, sent to a worker process."""
+
+    serial: int
+    src: str
+    # the width and the path of each rendition.
+    renditions: Tuple[Tuple[int, str], ...]
+    quality: str = ResizeQuality.BALANCED.value
+
+
+def draft(image: "Image.Image", size: Tuple[int, int], reducing_gap: Optional[float]) -> None:
+    """Shrink-on-load. This does nothing for the formats other than JPEG or without a reducing gap."""
+    if reducing_gap is not None:
+        image.draft(None, (int(size[0] * reducing_gap), int(size[1] * reducing_gap)))  # type: ignore
+
+
+def save_options_of(image: "Image.Image") -> dict:
+    """The resized image keeps the color profile and the EXIF of the original image,
+    and a JPEG image is encoded with the quantization tables and the subsampling of the original image,
+    instead of the default quality of Pillow.
+    The orientation in EXIF is kept, since the pixels are not rotated.
+    """
+    options = {"format": image.format}
+    if image.info.get("icc_profile"):
+        options["icc_profile"] = image.info["icc_profile"]
+    if image.info.get("exif"):
+        options["exif"] = image.info["exif"]
+    if image.format == "JPEG":
+        from PIL import JpegImagePlugin
+
+        options["qtables"] = image.quantization  # type: ignore
+        subsampling = JpegImagePlugin.get_sampling(image)
+        if subsampling != -1:
+            options["subsampling"] = subsampling
+    return options
+
+
+def resize_image(resize_task: ResizeTask) -> ResizeResult:
+    """Resize an image in a worker process.
+
+    Unless the quality is best, JPEG images are decoded at a reduced scale by Image.draft (DCT scaling),
+    so a large photo is never decoded at full size,
+    and the decoded image is reduced by an integer factor before resampling, as Image.thumbnail does.
+    See RESIZE_SETTINGS.
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(resize_task.src) as image:
+            original_size = image.size
+            resized_size = get_resized_size(
+                original_size,
+                width=resize_task.width,
+                height=resize_task.height,
+                is_aspect_ratio_kept=resize_task.is_aspect_ratio_kept,
+            )
+            resample, reducing_gap = resize_settings_of(resize_task.quality)
+            draft(image, resized_size, reducing_gap=reducing_gap)
+            resized_image = image.resize(resized_size, resample, reducing_gap=reducing_gap)
+            resized_image.save(resize_task.dst, **save_options_of(image))
+    except Exception as error:
+        # Pillow raises various errors for a broken or oversized image such as DecompressionBombError.
+        # the image is skipped and the other images are resized.
+        return ResizeResult(serial=resize_task.serial, src=resize_task.src, dst=resize_task.dst, error=str(error))
+    return ResizeResult(
+        serial=resize_task.serial,
+        src=resize_task.src,
+        dst=resize_task.dst,
+        original_size=original_size,
+        resized_size=resized_size,
+    )
+
+
+def resize_renditions(rendition_task: RenditionTask) -> List[ResizeResult]:
+    """Resize an image to several widths in a worker process.
+
+    The image is decoded once at the scale for the largest rendition,
+    and each rendition is resized from the previous larger one, from the largest to the smallest,
+    so the cost of decoding is paid once however many renditions there are.
+    """
+    from PIL import Image
+
+    results: List[ResizeResult] = []
+    try:
+        with Image.open(rendition_task.src) as image:
+            original_size = image.size
+            resample, reducing_gap = resize_settings_of(rendition_task.quality)
+            sized_renditions = sorted(
+                (
+                    (get_resized_size(original_size, width=width, is_aspect_ratio_kept=True), dst)
+                    for width, dst in rendition_task.renditions
+                ),
+                reverse=True,
+            )
+            draft(image, sized_renditions[0][0], reducing_gap=reducing_gap)
+            save_options = save_options_of(image)
+
+            resized_image = image
+            for resized_size, dst in sized_renditions:
+                resized_image = resized_image.resize(resized_size, resample, reducing_gap=reducing_gap)
+                resized_image.save(dst, **save_options)
+                results.append(
+                    ResizeResult(
+                        serial=rendition_task.serial,
+                        src=rendition_task.src,
+                        dst=dst,
+                        original_size=original_size,
+                        resized_size=resized_size,
+                    )
+                )
+    except Exception as error:
+        # as resize_image, the renditions not output are skipped and the other images are resized.
+        done = {result.dst for result in results}
+        results.extend(
+            ResizeResult(serial=rendition_task.serial, src=rendition_task.src, dst=dst, error=str(error))
+            for _, dst in rendition_task.renditions
+            if dst not in done
+        )
+    return results
+
+
+def get_args():
+    arg_parser = argparse.ArgumentParser()
+    with add_extra_arguments_to(arg_parser) as arg_parser:
+        arg_parser.add_argument("width", type=int, nargs="?", default=0, help="Not required with --sizes.")
+        arg_parser.add_argument("-hi", "--height", default=0, type=int)
+        arg_parser.add_argument("-ka", "--keep_aspect", action="store_true")
+
+        arg_parser.add_argument(
+            "-d",
+            "--dest",
+            type=str,
+            help="The path where the directory containing the resized images will be created.",
+            default=DefaultValues.DEST.value,
+        )
+        arg_parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[],
+            help="Widths of the renditions output for each image, keeping the aspect ratio. "
+            "Each image is decoded once for all widths. e.g. --sizes 320 640 1280",
+        )
+        arg_parser.add_argument("-add_prefix", "--is_prefix_added", action="store_true")
+        arg_parser.add_argument(
+            "-p", "--prefix", help="you can add an extra word as prefix.", default=DefaultValues.PREFIX.value
+        )
+        arg_parser.add_argument(
+            "-s", "--suffix", type=str, help="image name suffix.", default=DefaultValues.SUFFIX.value
+        )
+        arg_parser.add_argument(
+            "-sep", "--separator", type=str, help="image name separator.", default=DefaultValues.SEPARATOR.value
+        )
+        arg_parser.add_argument(
+            "-add_serial",
+            "--is_serial_number_added",
+            help="Whether to add serial numbers to the names of images.",
+            action="store_true",
+        )
+        arg_parser.add_argument(
+            "-ext",
+            "--valid_extensions",
+            nargs="*",
+            type=str,
+            help=".png .jpg ...",
+            default=DefaultValues.VALID_EXTENSIONS.value,
+        )
+        arg_parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            help="The number of processes that resize the images.",
+            default=DefaultValues.WORKERS.value,
+        )
+        arg_parser.add_argument(
+            "--discovery_workers",
+            type=int,
+            help="The number of processes that walk the subdirectories of dir_path. "
+            "The images are found in the same order regardless of the number.",
+            default=DefaultValues.DISCOVERY_WORKERS.value,
+        )
+        arg_parser.add_argument(
+            "--order",
+            type=str,
+            choices=ImageOrder.values(),
+            help="The order in which the images are numbered. natural: by the path with the numbers "
+            "compared as numbers. mtime: by the modification time. exif: by the capture time in EXIF. "
+            "size: by the file size. none: the order of the directory listing, which depends on the filesystem.",
+            default=DefaultValues.ORDER.value,
+        )
+        arg_parser.add_argument(
+            "-rq",
+            "--resize_quality",
+            type=str,
+            choices=ResizeQuality.values(),
+            help="fast: decode JPEG at the nearest reduced scale. balanced: decode JPEG at a reduced scale "
+            "keeping the quality. best: decode at full size.",
+            default=DefaultValues.RESIZE_QUALITY.value,
+        )
+        arg_parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Skip the images unchanged since they were output with the same options "
+            "by the previous tasks to the same --dest. The outputs are recorded in "
+            f"{ProcessingCache.FILE_NAME} in --dest.",
+        )
+        arg_parser.add_argument(
+            "--content_hash",
+            action="store_true",
+            help="With --incremental, compare the contents of the images whose modification times have changed.",
+        )
+    args = arg_parser.parse_args()
+    print_arguments(args)
+    return args
+
+
+class ResizeArgsValidator:
+    def __init__(self, args):
+        self.options = args
+        # The image paths found while validating are kept,
+        # so the directory is not walked again after the validation.
+        self.image_paths: Optional[Iterator[pathlib.Path]] = None
+
+    def validate_image_paths(self) -> None:
+        image_paths = get_image_paths_from_within(
+            dir_path=self.options.dir_path,
+            valid_extensions=self.options.valid_extensions,
+            workers=self.options.discovery_workers,
+        )
+        self.image_paths = sort_images(image_paths, order=self.options.order)
+
+    def validate_size(self) -> None:
+        if self.options.sizes:
+            for width in self.options.sizes:
+                if width < 1:
+                    raise ValueError(f'--sizes option "{width}" should be 1 or more.')
+            return
+        if self.options.width < 1:
+            raise ValueError(f'width "{self.options.width}" should be 1 or more.')
+        if self.options.height < 0:
+            raise ValueError(f'--height option "{self.options.height}" should be 0 or more.')
+
+    def validate_workers(self) -> None:
+        if self.options.workers < 1:
+            raise ValueError(f'--workers option "{self.options.workers}" should be 1 or more.')
+        if self.options.discovery_workers < 1:
+            raise ValueError(f'--discovery_workers option "{self.options.discovery_workers}" should be 1 or more.')
+
+    def validate(self) -> None:
+        self.validate_size()
+        self.validate_workers()
+        self.validate_image_paths()
+
+
+def get_resized_stem(args, stem: str, serial: int, width: Optional[int] = None) -> str:
+    """Name the resized image as Rename does, with the width of the rendition at the end.
+    prefix_stem_suffix001_640
+    """
+    if args.is_prefix_added and args.prefix:
+        stem = f"{args.prefix}{args.separator}{stem}"
+    if args.suffix:
+        stem = f"{stem}{args.separator}{args.suffix}"
+    if args.is_serial_number_added:
+        stem = f"{stem}{serial:0{DefaultValues.ZERO_PADDING_DIGIT.value}d}"
+    if width is not None:
+        stem = f"{stem}{args.separator}{width}"
+    return stem
+
+
+def resize_tasks(
+    args,
+    image_paths: Iterator[pathlib.Path],
+    dest_dir_path: pathlib.Path,
+    directories: DirectoryCache,
+    cache: Optional[ProcessingCache] = None,
+    targets: Optional[Dict[int, str]] = None,
+) -> Iterator[Union[ResizeTask, RenditionTask]]:
+    """The images are sent to the workers while the directory is walked.
+    The destination directories are created here, once for each directory, before the image is sent.
+    :param cache: the images unchanged since they were output by the previous tasks are not sent.
+    :param targets: serial => the outputs of the image sent, relative to dest_dir_path, to record to the cache.
+    """
+    dir_path = pathlib.Path(args.dir_path)
+    extension_index = ExtensionIndex.of(args.valid_extensions)
+    for serial, image_path in enumerate(image_paths, start=1):
+        relative_image_path = image_path.relative_to(dir_path)
+        ext = extension_index.extension_of(image_path.name)
+        stem = image_path.name[: -len(ext)] if ext else image_path.stem
+        relative_parent = relative_image_path.parent
+        if args.sizes:
+            widths = list(dict.fromkeys(args.sizes))
+            names = [f"{get_resized_stem(args, stem, serial, width)}{ext}" for width in widths]
+        else:
+            names = [f"{get_resized_stem(args, stem, serial)}{ext}"]
+        # the renditions of an image are recorded to the cache as one target.
+        target = "\n".join((relative_parent / name).as_posix() for name in names)
+        if cache is not None:
+            if cache.lookup(image_path, target) is not None:
+                reporter.report(Bcolors.OKBLUE.value, f"\nPATH: {image_path} is unchanged.\n")  # type: ignore
+                reporter.advance()
+                continue
+            targets[serial] = target  # type: ignore
+
+        resized_image_dir_path = dest_dir_path / relative_parent
+        directories.make(resized_image_dir_path)
+        if args.sizes:
+            yield RenditionTask(
+                serial=serial,
+                src=str(image_path),
+                renditions=tuple((width, str(resized_image_dir_path / name)) for width, name in zip(widths, names)),
+                quality=args.resize_quality,
+            )
+            continue
+        yield ResizeTask(
+            serial=serial,
+            src=str(image_path),
+            dst=str(resized_image_dir_path / names[0]),
+            width=args.width,
+            height=args.height,
+            is_aspect_ratio_kept=args.keep_aspect,
+            quality=args.resize_quality,
+        )
+
+
+def get_processing_cache(args, dest_path: pathlib.Path) -> Optional[ProcessingCache]:
+    """The cache of the images output by the previous tasks, if --incremental is passed."""
+    if not args.incremental:
+        return None
+    return ProcessingCache(
+        dest_path=dest_path,
+        task_name="resize",
+        options={k: v for k, v in vars(args).items() if k not in DefaultValues.OPTIONS_NOT_CACHED.value},
+        use_content_hash=args.content_hash,
+    )
+
+
+def resize(resize_task: Union[ResizeTask, RenditionTask]) -> List[ResizeResult]:
+    if isinstance(resize_task, RenditionTask):
+        return resize_renditions(resize_task)
+    return [resize_image(resize_task)]
+
+
+def main():
+    with task(args=get_args(), task_name="Resize") as args:
+        try:
+            validator = ResizeArgsValidator(args=args)
+            validator.validate()
+            image_paths: Iterator[pathlib.Path] = validator.image_paths  # type: ignore
+        except ValueError as value_error:
+            stdout_exception_message(value_error)
+            return
+
+        dir_path = pathlib.Path(args.dir_path)
+        dest_dir_path = pathlib.Path(args.dest) / get_dest_dir_name(dir_path=dir_path, now_str=datetime2str())
+        reporter.start()
+        if not args.run:
+            for image_path in image_paths:
+                reporter.report(Bcolors.OKGREEN.value, f"\nPATH: {image_path}\n")  # type: ignore
+                reporter.advance()
+            reporter.summary(task_name="Resize")
+            return
+
+        cache = get_processing_cache(args, dest_path=pathlib.Path(args.dest))
+        targets: Dict[int, str] = {}
+        with cache or contextlib.nullcontext():
+            tasks = resize_tasks(
+                args=args,
+                image_paths=image_paths,
+                dest_dir_path=dest_dir_path,
+                directories=DirectoryCache(),
+                cache=cache,
+                targets=targets,
+            )
+            for results in execute_in_processes(func=resize, items=tasks, workers=args.workers):
+                for result in results:
+                    if result.error:
+                        reporter.warning(f"'{result.src}' is skipped. {result.error}")
+                    else:
+                        reporter.report(
+                            Bcolors.OKGREEN.value,  # type: ignore
+                            f"\nPATH: {result.src} => {result.dst}\n"
+                            f"SIZE: {result.original_size[0]}x{result.original_size[1]} "
+                            f"=> {result.resized_size[0]}x{result.resized_size[1]}\n",
+                        )
+                target = targets.pop(results[0].serial, None)
+                if cache is not None and target is not None and not any(result.error for result in results):
+                    cache.record(source=results[0].src, target=target, output=results[0].dst)
+                reporter.advance()
+        reporter.summary(task_name="Resize")
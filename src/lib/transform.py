@@ -0,0 +1,175 @@
+import dataclasses
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence
+
+from utils.constants import (
+    ALTERNATIVE_UNAVAILABLE_CHAR_IN_WINDOWS,
+    ALTERNATIVE_URL_ENCODED_CHAR,
+    REPLACEMENT_WITH_SEPARATOR_PATTERN,
+    SEPARATOR,
+    UNAVAILABLE_CHAR_IN_WINDOWS_PATTERN,
+    URL_ENCODED_CHAR_PATTERN,
+    ZERO_PADDING_DIGIT,
+)
+from utils.replacer import MultiReplacer, ReplacementMode, rules_of
+
+# The stems of a batch are joined with this character and converted at once.
+# It never appears in file names and command line arguments, so no replacement can match across stems.
+BATCH_DELIMITER = "\0"
+
+# The mapping of jaconv.z2h(text, kana=False, ascii=True, digit=True):
+# the full-width forms of the ASCII characters, U+FF01 to U+FF5E, and the ideographic space U+3000.
+ZEN2HAN_TABLE: Dict[int, str] = {code: chr(code - 0xFEE0) for code in range(0xFF01, 0xFF5F)}
+ZEN2HAN_TABLE[0x3000] = " "
+
+
+def zen2han(text: str) -> str:
+    """Convert the full-width alphanumeric characters and symbols to half-width ones.
+    Most names are ASCII camera names such as DSC_01234, which are returned as they are.
+    >>> zen2han("ＡＢＣ１２３")
+    'ABC123'
+    """
+    if text.isascii():
+        return text
+    return text.translate(ZEN2HAN_TABLE)
+
+
+class CharTable(Dict[int, str]):
+    """A translation table for str.translate computing the conversion of a character on the first lookup.
+    Since every character is converted independently, any character, including non-ASCII ones,
+    is converted by one lookup after that.
+    """
+
+    def __init__(self, convert_char):
+        super().__init__()
+        self.convert_char = convert_char
+        # the delimiter of a batch is kept.
+        self[ord(BATCH_DELIMITER)] = BATCH_DELIMITER
+
+    def __missing__(self, key: int) -> str:
+        converted = self[key] = self.convert_char(chr(key))
+        return converted
+
+
+@dataclasses.dataclass
+class NameTransformer:
+    """The conversion of the image names of Rename built once for a task.
+
+    The conversions replacing a character with another character,
+    zen2han, replace_with_separator, replace_unavailable_file_name_chars and replace_url_encoded_chars,
+    are fused into a single str.translate pass, and a batch of stems is converted at once.
+
+    >>> transformer = NameTransformer(is_separator_and_delimiter_replaced=True, is_serial_number_added=True)
+    >>> transformer.transform_batch(["ｆｏｏ ｂａｒ", "baz"], serials=[1, 2])
+    ['foo_bar001', 'baz002']
+    """
+
+    is_all_replaced_with_new_name: bool = False
+    new_name: str = ""
+
+    chars_before_replacement: List[str] = dataclasses.field(default_factory=list)
+    chars_after_replacement: List[str] = dataclasses.field(default_factory=list)
+    # a file of the rules applied after the rules of the command line.
+    replacement_rules: Optional[str] = None
+    replacement_mode: str = ReplacementMode.SUCCESSIVE.value
+
+    prefix: str = ""
+    suffix: str = ""
+
+    alternative_unavailable_char_in_windows: str = ALTERNATIVE_UNAVAILABLE_CHAR_IN_WINDOWS
+
+    is_separator_and_delimiter_replaced: bool = False
+    separator: str = SEPARATOR
+
+    is_url_encoded_char_replaced: bool = False
+    alternative_url_encoded_char: str = ALTERNATIVE_URL_ENCODED_CHAR
+
+    is_serial_number_added: bool = False
+    zero_padding_digit: int = ZERO_PADDING_DIGIT
+
+    is_output_to_same_dir: bool = False
+
+    replacement_with_separator_pattern: Pattern = REPLACEMENT_WITH_SEPARATOR_PATTERN
+    unavailable_char_in_windows_pattern: Pattern = UNAVAILABLE_CHAR_IN_WINDOWS_PATTERN
+    url_encoded_char_pattern: Pattern = URL_ENCODED_CHAR_PATTERN
+
+    def __post_init__(self) -> None:
+        if self.is_all_replaced_with_new_name and not self.new_name:
+            raise ValueError("Specify a new name of the image. (e.g. --new_name newname)")
+
+        self.replacer = MultiReplacer.of(
+            rules_of(self.chars_before_replacement, self.chars_after_replacement, self.replacement_rules),
+            mode=self.replacement_mode,
+        )
+        self.char_table = CharTable(self.convert_char)
+
+        self._prefix = f"{self.prefix}{self.separator}" if self.prefix and type(self.prefix) is str else ""
+        self._suffix = f"{self.separator}{self.suffix}" if self.suffix and type(self.suffix) is str else ""
+        # Serial numbers are always added when all names are replaced, since they would be the same.
+        self.is_serial_number_needed = self.is_all_replaced_with_new_name or self.is_serial_number_added
+        self.zero_padding_string = "{{0:0{}d}}".format(self.zero_padding_digit)  # => {0:03}
+
+    @classmethod
+    def from_args(cls, args) -> "NameTransformer":
+        return cls(
+            **{field.name: getattr(args, field.name) for field in dataclasses.fields(cls) if hasattr(args, field.name)}
+        )
+
+    def convert_char(self, char: str) -> str:
+        """Convert a character in the same order as Rename.rename."""
+        converted = zen2han(char)
+        if self.is_separator_and_delimiter_replaced:
+            converted = self.replacement_with_separator_pattern.sub(self.separator, converted)
+        converted = self.unavailable_char_in_windows_pattern.sub(
+            self.alternative_unavailable_char_in_windows, converted
+        )
+        if self.is_url_encoded_char_replaced:
+            converted = self.url_encoded_char_pattern.sub(self.alternative_url_encoded_char, converted)
+        return converted
+
+    def dirs_prefix(self, relative_parent_parts: Sequence[str]) -> str:
+        """
+        e.g.
+        root/dir1/dir2/img.png => dir1_dir2_
+        """
+        if not relative_parent_parts:
+            return ""
+        return self.separator.join(relative_parent_parts) + self.separator
+
+    def transform_batch(
+        self,
+        stems: Sequence[str],
+        serials: Optional[Sequence[int]] = None,
+        relative_parent_parts: Optional[Iterable[Sequence[str]]] = None,
+    ) -> List[str]:
+        """Convert the stems of the images.
+        :param serials: the serial numbers of the images starting from 1.
+        :param relative_parent_parts: the parts of the parent directory of the images relative to the root,
+            used when outputting to the same directory.
+        """
+        if not stems:
+            return []
+
+        if self.is_all_replaced_with_new_name:
+            joined = BATCH_DELIMITER.join(self.new_name for _ in stems)
+        else:
+            joined = self.replacer.replace(BATCH_DELIMITER.join(stems))
+        converted_stems = joined.translate(self.char_table).split(BATCH_DELIMITER)
+
+        converted_stems = [f"{self._prefix}{stem}{self._suffix}" for stem in converted_stems]
+
+        if self.is_serial_number_needed:
+            if serials is None or any(not serial for serial in serials):
+                raise ValueError("'loop_count' should be start from 1.")
+            converted_stems = [
+                stem + self.zero_padding_string.format(serial) for stem, serial in zip(converted_stems, serials)
+            ]
+
+        if self.is_output_to_same_dir and relative_parent_parts is not None:
+            converted_stems = [
+                f"{self.dirs_prefix(parts)}{stem}" for stem, parts in zip(converted_stems, relative_parent_parts)
+            ]
+        return converted_stems
+
+    def transform(self, stem: str, serial: Optional[int] = None, relative_parent_parts: Sequence[str] = ()) -> str:
+        serials = None if serial is None else [serial]
+        return self.transform_batch([stem], serials=serials, relative_parent_parts=[relative_parent_parts])[0]
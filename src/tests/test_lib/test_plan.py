@@ -0,0 +1,229 @@
+# mypy: ignore-errors
+import pathlib
+import sys
+
+import pytest
+
+from lib.plan import (
+    CollisionIndex,
+    CollisionPolicy,
+    PlanEntry,
+    RenamePlan,
+    apply_plan,
+    get_comparison,
+    main,
+)
+from utils.journal import Journal
+
+
+@pytest.fixture(scope="function")
+def temp_plan(temp_dir_path, temp_dest_path, temp_image_file):
+    def _temp_plan(count: int = 3) -> RenamePlan:
+        _temp_dir: pathlib.Path = temp_dir_path()
+        plan = RenamePlan(dir_path=_temp_dir, dest_dir_path=temp_dest_path() / "dest_dir")
+        for serial in range(1, count + 1):
+            _image: pathlib.Path = temp_image_file(image_path=f"dir/{serial}.png", temp_dir_path=_temp_dir)
+            plan.add(serial=serial, source_path=_image, target_path=plan.dest_dir_path / "dir" / f"new{serial}.png")
+        return plan
+
+    yield _temp_plan
+
+
+class TestPlanEntry:
+    def test_paths(self):
+        entry = PlanEntry(serial=1, source="dir1/dir2/a.png", target="b.png")
+        assert (entry.source_dir, entry.source_name) == ("dir1/dir2", "a.png")
+        assert (entry.target_dir, entry.target_name) == ("", "b.png")
+        assert entry.source == "dir1/dir2/a.png"
+        assert entry.target == "b.png"
+        assert entry.to_dict() == {"serial": 1, "source": "dir1/dir2/a.png", "target": "b.png"}
+        assert entry == PlanEntry(serial=1, source="dir1/dir2/a.png", target="b.png")
+        assert entry != PlanEntry(serial=2, source="dir1/dir2/a.png", target="b.png")
+        with pytest.raises(AttributeError):
+            entry.extra = 1
+
+    def test_directories_are_shared(self):
+        entries = [PlanEntry(serial=i, source=f"dir/{i}.png", target=f"dir/new{i}.png") for i in range(1, 3)]
+        assert entries[0].source_dir is entries[1].source_dir
+        assert entries[0].target_dir is entries[1].target_dir
+
+
+class TestCollisionIndex:
+    def test_error(self):
+        index = CollisionIndex(policy=CollisionPolicy.ERROR)
+        assert index.resolve(serial=1, target="dir/a.png") == "dir/a.png"
+        assert index.resolve(serial=2, target="dir/A.png") == "dir/A.png"
+        with pytest.raises(ValueError) as excinfo:
+            index.resolve(serial=3, target="dir/a.png")
+        assert excinfo.value.args[0].startswith(
+            'The image of serial 3 is output to "dir/a.png" as the image of serial 1.'
+        )
+
+    def test_case_insensitive(self):
+        index = CollisionIndex(policy=CollisionPolicy.SKIP, case_insensitive=True)
+        assert index.resolve(serial=1, target="dir/a.png") == "dir/a.png"
+        assert index.resolve(serial=2, target="DIR/A.PNG") is None
+        # NFD => NFC
+        assert index.resolve(serial=3, target="dir/\u304b\u3099.png") == "dir/\u304b\u3099.png"
+        assert index.resolve(serial=4, target="dir/\u304c.png") is None
+        assert index.collisions == {"DIR/A.PNG": [1, 2], "dir/\u304c.png": [3, 4]}
+
+    def test_suffix(self):
+        index = CollisionIndex(policy=CollisionPolicy.SUFFIX, separator="-")
+        assert index.resolve(serial=1, target="a.vol1.png", ext=".png") == "a.vol1.png"
+        assert index.resolve(serial=2, target="a.vol1.png", ext=".png") == "a.vol1-1.png"
+        assert index.resolve(serial=3, target="a.vol1-2.png", ext=".png") == "a.vol1-2.png"
+        # a.vol1-2.png is already used.
+        assert index.resolve(serial=4, target="a.vol1.png", ext=".png") == "a.vol1-3.png"
+        assert index.resolve(serial=5, target="b.tar.gz") == "b.tar.gz"
+        assert index.resolve(serial=6, target="b.tar.gz", ext=".tar.gz") == "b-1.tar.gz"
+
+    def test_overwrite(self):
+        index = CollisionIndex()
+        assert index.policy is CollisionPolicy.OVERWRITE
+        assert index.resolve(serial=1, target="a.png") == "a.png"
+        assert index.resolve(serial=2, target="a.png") == "a.png"
+        assert index.collisions == {"a.png": [1, 2]}
+
+
+class TestRenamePlan:
+    def test_add(self, temp_plan):
+        plan = temp_plan()
+        assert len(plan) == 3
+        entry = list(plan)[0]
+        assert entry.serial == 1
+        assert entry.source == "dir/1.png"
+        assert entry.target == "dir/new1.png"
+        assert plan.source_path(entry) == plan.dir_path / "dir" / "1.png"
+        assert plan.target_path(entry) == plan.dest_dir_path / "dir" / "new1.png"
+        # nothing is created.
+        assert plan.dest_dir_path.exists() is False
+
+    def test_columns(self):
+        plan = RenamePlan(dir_path="/images", dest_dir_path="/dest")
+        # the names which are not utf-8 are decoded by os.fsdecode with the escaped bytes.
+        names = ["a.png", "é.png", "\udce9.png", ""]
+        for serial, name in enumerate(names, start=1):
+            plan.add_relative(serial=serial, source=f"dir/{name}", target=f"new/{serial}{name}")
+        assert [(entry.source, entry.target) for entry in plan] == [
+            (f"dir/{name}", f"new/{serial}{name}") for serial, name in enumerate(names, start=1)
+        ]
+        # the directories are kept once.
+        assert plan.directories == ["dir", "new"]
+        assert list(plan)[0].source_dir is list(plan)[1].source_dir
+
+    def test_collisions(self, temp_plan):
+        plan = temp_plan()
+        assert plan.collisions == {}
+        plan.add(serial=4, source_path=plan.dir_path / "4.png", target_path=plan.dest_dir_path / "dir/new1.png")
+        assert plan.collisions == {"dir/new1.png": [1, 4]}
+
+        plan.collision_index.policy = CollisionPolicy.SKIP
+        entry = plan.add(serial=5, source_path=plan.dir_path / "5.png", target_path=plan.dest_dir_path / "dir/new1.png")
+        assert entry is None
+        assert plan.skipped == [5]
+        # the image of serial 1 is overwritten by the image of serial 4, so it is not output.
+        assert plan.collision_index.overwritten == {1}
+        assert len(plan) == 3
+        assert [entry.serial for entry in plan] == [2, 3, 4]
+
+    def test_save_and_load(self, temp_plan, tmp_path):
+        plan = temp_plan()
+        plan.save(tmp_path / "plan.jsonl")
+        loaded = RenamePlan.load(tmp_path / "plan.jsonl")
+        assert loaded.dir_path == plan.dir_path
+        assert loaded.dest_dir_path == plan.dest_dir_path
+        assert list(loaded) == list(plan)
+        assert list(loaded.diff(plan)) == []
+
+        # apply on another machine
+        loaded = RenamePlan.load(tmp_path / "plan.jsonl", dir_path="/mnt/images", dest_dir_path="/mnt/dest")
+        entry = list(loaded)[0]
+        assert loaded.source_path(entry) == pathlib.Path("/mnt/images/dir/1.png")
+        assert loaded.target_path(entry) == pathlib.Path("/mnt/dest/dir/new1.png")
+
+        (tmp_path / "broken.jsonl").write_text("broken")
+        with pytest.raises(ValueError) as excinfo:
+            RenamePlan.load(tmp_path / "broken.jsonl")
+        assert excinfo.value.args[0] == f'"{tmp_path / "broken.jsonl"}" is not a plan file.'
+
+    @pytest.mark.parametrize("source, target", [("/etc/passwd", "a.png"), ("a.png", "dir/../../a.png")])
+    def test_load_path_outside(self, source, target, temp_plan, tmp_path):
+        plan = temp_plan()
+        plan.save(tmp_path / "plan.jsonl")
+        with open(tmp_path / "plan.jsonl", "a", encoding="utf-8") as f:
+            f.write(f'{{"serial": 4, "source": "{source}", "target": "{target}"}}\n')
+        with pytest.raises(ValueError) as excinfo:
+            RenamePlan.load(tmp_path / "plan.jsonl")
+        outside = target if source == "a.png" else source
+        assert (
+            excinfo.value.args[0]
+            == f'Line 5 of "{tmp_path / "plan.jsonl"}" has a path outside the directory: "{outside}".'
+        )
+
+    @pytest.mark.parametrize(
+        "line",
+        [
+            "broken",
+            "[1, 2]",
+            '{"serial": 4, "source": "a.png"}',
+            '{"serial": 4, "source": "a.png", "target": "b.png", "extra": 1}',
+            '{"serial": 4, "source": 1, "target": "b.png"}',
+            '{"serial": "4", "source": "a.png", "target": "b.png"}',
+        ],
+    )
+    def test_load_malformed_entry(self, line, temp_plan, tmp_path):
+        plan = temp_plan()
+        plan.save(tmp_path / "plan.jsonl")
+        with open(tmp_path / "plan.jsonl", "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        with pytest.raises(ValueError) as excinfo:
+            RenamePlan.load(tmp_path / "plan.jsonl")
+        assert excinfo.value.args[0] == f'Line 5 of "{tmp_path / "plan.jsonl"}" is not an entry of a plan.'
+
+    def test_diff(self, temp_plan):
+        plan = temp_plan()
+        other = RenamePlan(dir_path=plan.dir_path, dest_dir_path=plan.dest_dir_path)
+        for entry in list(plan)[:2]:
+            other.add(serial=entry.serial, source_path=plan.source_path(entry), target_path=plan.target_path(entry))
+        diff = list(plan.diff(other))
+        assert diff[-1] == '+{"serial": 3, "source": "dir/3.png", "target": "dir/new3.png"}'
+
+
+def test_apply_plan(temp_plan):
+    plan = temp_plan()
+    apply_plan(plan=plan, workers=2, comparison_formats=["txt", "csv"])
+    for entry in plan:
+        assert plan.target_path(entry).read_bytes() == plan.source_path(entry).read_bytes()
+    assert (plan.dest_dir_path / "comparison.txt").read_text() == "\n\n".join(
+        get_comparison(original_path=plan.source_path(entry), renamed_path=plan.target_path(entry)) for entry in plan
+    )
+    assert (plan.dest_dir_path / "comparison.csv").exists() is True
+    assert Journal(dir_path=plan.dest_dir_path).load().completed == {1, 2, 3}
+
+
+def test_apply_plan_in_flight(temp_plan):
+    plan = temp_plan()
+    metrics = apply_plan(plan=plan, workers=2, in_flight=2)
+    for entry in plan:
+        assert plan.target_path(entry).read_bytes() == plan.source_path(entry).read_bytes()
+    assert Journal(dir_path=plan.dest_dir_path).load().completed == {1, 2, 3}
+    assert metrics.counts == {"mkdir": 2, "transfer": 3}
+    assert metrics.max_in_flight <= 2
+
+
+def test_main(monkeypatch, temp_plan, tmp_path):
+    plan = temp_plan()
+    plan.save(tmp_path / "plan.jsonl")
+
+    # dry run
+    monkeypatch.setattr(sys, "argv", ["ic_rename_apply", str(tmp_path / "plan.jsonl")])
+    main()
+    assert plan.dest_dir_path.exists() is False
+
+    _dest_dir_path: pathlib.Path = tmp_path / "another_dest"
+    monkeypatch.setattr(
+        sys, "argv", ["ic_rename_apply", str(tmp_path / "plan.jsonl"), "--dest_dir_path", str(_dest_dir_path), "-r"]
+    )
+    main()
+    assert sorted(p.name for p in _dest_dir_path.glob("dir/*.png")) == ["new1.png", "new2.png", "new3.png"]
@@ -1,13 +1,19 @@
 # mypy: ignore-errors
 import dataclasses
+import io
 import pathlib
 import re
+import subprocess
+import sys
 from typing import List, Union
 
 import pytest
 
-from lib.rename import DefaultValues, Rename, RenameArgsValidator
+from lib.plan import RenamePlan
+from lib.rename import DefaultValues, Rename, RenameArgsValidator, main
 from utils import datetime2str, get_dest_dir_name, is_os_windows
+from utils.directory import DirectoryCache
+from utils.journal import Journal
 
 
 @pytest.fixture(scope="function")
@@ -60,7 +66,8 @@ class TestRename:
         assert rename.dest == _temp_dest
         assert rename.dest_dir_name == get_dest_dir_name(dir_path=_temp_dir, now_str=rename.now_str)
         assert rename.dest_dir_path == _temp_dest / rename.dest_dir_name
-        assert rename.dest_dir_path.exists() is True
+        # the directory is created when the image is output.
+        assert rename.dest_dir_path.exists() is False
 
     def test_replace_all(self, temp_image_file, rename_class_mock):
         _temp_dir: pathlib.Path = rename_class_mock.dir_path
@@ -654,6 +661,42 @@ class TestRename:
         assert rename.image_path.is_file() is True
         assert rename.image_path.as_posix() == _dir2_img_path.as_posix()
 
+    def test_link_mode(self, temp_image_file, rename_class_mock):
+        _temp_dir: pathlib.Path = rename_class_mock.dir_path
+        _temp_image_file: pathlib.Path = temp_image_file(image_path="image.png", temp_dir_path=_temp_dir)
+
+        # default link mode copies the image.
+        rename = rename_class_mock(image_path=_temp_image_file, run=True, prefix="copy")
+        assert rename.link_mode == DefaultValues.LINK_MODE.value
+        rename.rename()
+        assert rename.renamed_image_path.exists() is True
+        assert rename.renamed_image_path.samefile(rename.image_path) is False
+        assert rename.image_path.exists() is True
+
+        # a hard link shares the inode with the original image.
+        rename = rename_class_mock(image_path=_temp_image_file, run=True, prefix="hardlink", link_mode="hardlink")
+        rename.rename()
+        assert rename.renamed_image_path.exists() is True
+        assert rename.renamed_image_path.samefile(rename.image_path) is True
+        assert rename.image_path.exists() is True
+
+        # a clone or a kernel copy.
+        rename = rename_class_mock(image_path=_temp_image_file, run=True, prefix="reflink", link_mode="reflink")
+        rename.rename()
+        assert rename.renamed_image_path.read_bytes() == rename.image_path.read_bytes()
+        assert rename.image_path.exists() is True
+
+    def test_directories(self, temp_image_file, rename_class_mock):
+        _temp_dir: pathlib.Path = rename_class_mock.dir_path
+        directories = DirectoryCache()
+        for index in range(3):
+            _temp_image_file: pathlib.Path = temp_image_file(image_path=f"dir/{index}.png", temp_dir_path=_temp_dir)
+            rename = rename_class_mock(image_path=_temp_image_file, run=True, directories=directories)
+            rename.rename()
+            assert rename.renamed_image_path.exists() is True
+        # the instances share the directory created once.
+        assert directories.created == {str(rename.renamed_relative_image_parent_path)}
+
     def test_make_comparison_files(self, temp_image_file, rename_class_mock):
         _count: int = 10
         for index in range(1, _count + 1):
@@ -685,3 +728,294 @@ class TestRename:
             # ensure that comparison log is initialized.
             assert type(rename_class_mock.comparison_log) is list
             assert len(rename_class_mock.comparison_log) == 0
+
+
+class TestMain:
+    def test_workers(self, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path):
+        """The output and the comparison file should be the same as the sequential run."""
+        _temp_dir: pathlib.Path = temp_dir_path()
+        for index in range(20):
+            temp_image_file(image_path=f"dir{index % 3}/image{index}.png", temp_dir_path=_temp_dir)
+
+        comparisons = []
+        for workers, in_flight, discovery_workers in [("1", "4", "1"), ("4", "16", "2"), ("4", "1", "1")]:
+            _dest: pathlib.Path = temp_dest_path(f"dest{workers}-{in_flight}")
+            monkeypatch.setattr(
+                sys,
+                "argv",
+                ["ic_rename", str(_temp_dir), "--dest", str(_dest), "--is_serial_number_added", "--run"]
+                + ["-w", workers, "--in_flight", in_flight, "--discovery_workers", discovery_workers],
+            )
+            main()
+            comparison_files = list(_dest.glob(f"*/{DefaultValues.COMPARISON_FILE_NAME.value}"))
+            assert len(comparison_files) == 1
+            assert len(list(_dest.glob("**/*.png"))) == 20
+            comparisons.append(comparison_files[0].read_text().replace(str(comparison_files[0].parent), ""))
+
+        assert comparisons[0].count("NAME: ") == 20
+        assert comparisons[0] == comparisons[1] == comparisons[2]
+
+    @pytest.mark.parametrize("verbosity, is_written", [("quiet", False), ("progress", False), ("normal", True)])
+    def test_verbosity(
+        self, verbosity, is_written, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path, capsys
+    ):
+        """The arguments and the beginning and the end of the task are written only with the normal verbosity."""
+        _temp_dir: pathlib.Path = temp_dir_path()
+        temp_image_file(image_path="image.png", temp_dir_path=_temp_dir)
+        _dest: pathlib.Path = temp_dest_path()
+        monkeypatch.setattr(
+            sys, "argv", ["ic_rename", str(_temp_dir), "--dest", str(_dest), "--verbosity", verbosity, "--run"]
+        )
+        main()
+        out = capsys.readouterr().out
+        for line in ["INPUT COMMANDS", "ARGUMENTS", "Rename task starts.", "Rename task ends."]:
+            assert (line in out) is is_written
+        if verbosity == "quiet":
+            assert out == ""
+
+    @pytest.mark.parametrize("discovery_workers", ["1", "2"])
+    def test_order(self, discovery_workers, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path):
+        """The serial numbers should follow the natural order of the paths on any filesystem."""
+        _temp_dir: pathlib.Path = temp_dir_path()
+        for index in [10, 2, 1, 11, 3]:
+            temp_image_file(image_path=f"dir{index % 2}/image{index}.png", temp_dir_path=_temp_dir)
+        _dest: pathlib.Path = temp_dest_path()
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ic_rename", str(_temp_dir), "--dest", str(_dest), "--is_serial_number_added", "--run"]
+            + ["--order", "natural", "--discovery_workers", discovery_workers],
+        )
+        main()
+        assert sorted(p.name for p in _dest.glob("**/*.png")) == sorted(
+            ["image2001.png", "image10002.png", "image1003.png", "image3004.png", "image11005.png"]
+        )
+
+    def test_one_timestamp(self, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path):
+        """All images are output to one directory even if the task crosses a second boundary."""
+        _temp_dir: pathlib.Path = temp_dir_path()
+        for index in range(5):
+            temp_image_file(image_path=f"dir{index % 2}/image{index}.png", temp_dir_path=_temp_dir)
+        _dest: pathlib.Path = temp_dest_path()
+        _now_strs = iter(f"2023-01-01_00-00-0{second}" for second in range(10))
+        monkeypatch.setattr("lib.rename.datetime2str", lambda: next(_now_strs))
+        monkeypatch.setattr(sys, "argv", ["ic_rename", str(_temp_dir), "--dest", str(_dest), "--run"])
+        main()
+        assert [p.name for p in _dest.iterdir()] == [f"{_temp_dir.name}_2023-01-01_00-00-00"]
+        assert len(list(_dest.glob("*/dir*/*.png"))) == 5
+
+    def test_incremental(self, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        for index in range(4):
+            temp_image_file(image_path=f"dir/image{index}.png", temp_dir_path=_temp_dir)
+        _dest: pathlib.Path = temp_dest_path()
+        _now_strs = iter(f"2023-01-01_00-00-0{second}" for second in range(10))
+        monkeypatch.setattr("lib.rename.datetime2str", lambda: next(_now_strs))
+        _args = ["ic_rename", str(_temp_dir), "--dest", str(_dest), "-add_serial", "--run", "--incremental"]
+        monkeypatch.setattr(sys, "argv", _args)
+        main()
+        assert len(list(_dest.glob("*_00-00-00/dir/*.png"))) == 4
+
+        # only the modified image is output.
+        temp_image_file(image_path="dir/image2.png", temp_dir_path=_temp_dir, rgb_color=(255, 0, 0))
+        main()
+        assert [p.name for p in _dest.glob("*_00-00-01/dir/*.png")] == ["image2003.png"]
+
+        # with other options, all images are output.
+        monkeypatch.setattr(sys, "argv", _args + ["--prefix", "new"])
+        main()
+        assert len(list(_dest.glob("*_00-00-02/dir/*.png"))) == 4
+
+    def test_manifest(self, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path, tmp_path):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        for index in range(4):
+            temp_image_file(image_path=f"dir/image{index}.png", temp_dir_path=_temp_dir)
+        _dest: pathlib.Path = temp_dest_path()
+        _manifest = tmp_path / "manifest.txt"
+        _manifest.write_text("dir/image3.png\ndir/image1.png\tnew.png\n")
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ic_rename", str(_temp_dir), "--dest", str(_dest), "-add_serial", "--manifest", str(_manifest), "--run"],
+        )
+        # the directory is not walked.
+        monkeypatch.setattr("lib.rename.get_image_paths_from_within", None)
+        main()
+        assert sorted(p.name for p in _dest.glob("*/dir/*.png")) == ["image3001.png", "new.png"]
+
+        # stdin, NUL-delimited
+        _dest = temp_dest_path("dest_stdin")
+        monkeypatch.setattr(sys, "stdin", io.StringIO("dir/image0.png\0dir/image2.png"))
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ic_rename", str(_temp_dir), "--dest", str(_dest), "--manifest", "-", "--manifest_delimiter", "nul", "-r"],
+        )
+        main()
+        assert sorted(p.name for p in _dest.glob("*/dir/*.png")) == ["image0.png", "image2.png"]
+
+    def test_replacement_rules(self, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path, tmp_path, capfd):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        for name in ["SKU001_front.png", "SKU002_back.png"]:
+            temp_image_file(image_path=name, temp_dir_path=_temp_dir)
+        _dest: pathlib.Path = temp_dest_path()
+        _rules = tmp_path / "rules.tsv"
+        _rules.write_text("SKU001\tcamera\nSKU002\tlens\n")
+        monkeypatch.setattr(
+            sys, "argv", ["ic_rename", str(_temp_dir), "--dest", str(_dest), "--replacement_rules", str(_rules), "-r"]
+        )
+        main()
+        assert sorted(p.name for p in _dest.glob("*/*.png")) == ["camera_front.png", "lens_back.png"]
+
+        # a broken rules file is reported before any image is renamed.
+        _rules.write_text("SKU001 camera\n")
+        _dest = temp_dest_path("dest_broken")
+        monkeypatch.setattr(
+            sys, "argv", ["ic_rename", str(_temp_dir), "--dest", str(_dest), "--replacement_rules", str(_rules), "-r"]
+        )
+        main()
+        assert f'Line 1 of "{_rules}" is not "<before>\\t<after>".' in capfd.readouterr().out
+        assert list(_dest.iterdir()) == []
+
+    def test_comparison_formats(self, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        for index in range(3):
+            temp_image_file(image_path=f"image{index}.png", temp_dir_path=_temp_dir)
+        _dest: pathlib.Path = temp_dest_path()
+        monkeypatch.setattr(
+            sys, "argv", ["ic_rename", str(_temp_dir), "--dest", str(_dest), "--run", "-cf", "txt", "csv", "jsonl"]
+        )
+        main()
+        for ext in ["txt", "csv", "jsonl"]:
+            assert len(list(_dest.glob(f"*/comparison.{ext}"))) == 1
+        assert len(list(_dest.glob("*/comparison.jsonl"))[0].read_text().splitlines()) == 3
+        assert len(list(_dest.glob("*/comparison.csv"))[0].read_text().splitlines()) == 4  # with the header
+
+    def test_resume(self, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        for index in range(6):
+            temp_image_file(image_path=f"image{index}.png", temp_dir_path=_temp_dir)
+        _dest: pathlib.Path = temp_dest_path()
+        _args = ["ic_rename", str(_temp_dir), "--dest", str(_dest), "--is_serial_number_added", "--run"]
+        monkeypatch.setattr(sys, "argv", _args)
+        main()
+        _dest_dir: pathlib.Path = list(_dest.iterdir())[0]
+        _comparison: str = (_dest_dir / DefaultValues.COMPARISON_FILE_NAME.value).read_text()
+        _outputs: List[pathlib.Path] = sorted(_dest_dir.glob("*.png"))
+        assert len(_outputs) == 6
+
+        # interrupted after 2 images are output.
+        _journal = Journal(dir_path=_dest_dir).load()
+        _done = [pathlib.Path(_journal.planned[serial][1]) for serial in [1, 2]]
+        _lines = _journal.path.read_text().splitlines()
+        _journal.path.write_text("\n".join(_lines[:8]) + "\n")
+        for _output in _outputs:
+            if _output not in _done:
+                _output.unlink()
+        for _output in _done:
+            _output.write_bytes(b"output before interrupted")
+
+        monkeypatch.setattr(sys, "argv", _args + ["--resume", str(_dest_dir), "-w", "2"])
+        main()
+        assert list(_dest.iterdir()) == [_dest_dir]
+        assert sorted(_dest_dir.glob("*.png")) == _outputs
+        assert (_dest_dir / DefaultValues.COMPARISON_FILE_NAME.value).read_text() == _comparison
+        assert Journal(dir_path=_dest_dir).load().completed == set(range(1, 7))
+        # the images already output are skipped.
+        assert [_output.read_bytes() for _output in _done] == [b"output before interrupted"] * 2
+
+    def test_resume_with_changed_options(self, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path):
+        """The comparison file of the interrupted task should be kept if the plan differs from the journal."""
+        _temp_dir: pathlib.Path = temp_dir_path()
+        for index in range(3):
+            temp_image_file(image_path=f"image{index}.png", temp_dir_path=_temp_dir)
+        _dest: pathlib.Path = temp_dest_path()
+        _args = ["ic_rename", str(_temp_dir), "--dest", str(_dest), "--run"]
+        monkeypatch.setattr(sys, "argv", _args + ["--is_serial_number_added"])
+        main()
+        _dest_dir: pathlib.Path = list(_dest.iterdir())[0]
+        _comparison: str = (_dest_dir / DefaultValues.COMPARISON_FILE_NAME.value).read_text()
+
+        monkeypatch.setattr(sys, "argv", _args + ["--resume", str(_dest_dir)])
+        main()
+        assert (_dest_dir / DefaultValues.COMPARISON_FILE_NAME.value).read_text() == _comparison
+        assert sorted(p.name for p in _dest_dir.iterdir() if not p.name.endswith(".png")) == [
+            DefaultValues.COMPARISON_FILE_NAME.value,
+            Journal.FILE_NAME,
+        ]
+
+    def test_save_plan(self, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path, tmp_path):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        for index in range(3):
+            temp_image_file(image_path=f"dir/image{index}.png", temp_dir_path=_temp_dir)
+        _dest: pathlib.Path = temp_dest_path()
+        _plan_path: pathlib.Path = tmp_path / "plan.jsonl"
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ic_rename", str(_temp_dir), "--dest", str(_dest), "-add_serial_number", "--save_plan", str(_plan_path)],
+        )
+        main()
+        # a dry run touches no file in the destination.
+        assert list(_dest.iterdir()) == []
+
+        plan = RenamePlan.load(_plan_path)
+        assert plan.dir_path == _temp_dir
+        assert plan.dest_dir_path.parent == _dest
+        assert [entry.serial for entry in plan] == [1, 2, 3]
+        assert sorted(entry.target[-7:] for entry in plan) == ["001.png", "002.png", "003.png"]
+
+    # the later image overwrites the earlier image by default.
+    @pytest.mark.parametrize("policy, count", [("error", 0), ("suffix", 3), ("skip", 1), ("overwrite", 1), (None, 1)])
+    def test_collision_policy(self, policy, count, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        for name in ["imageX.png", "imageY.png", "imageZ.png"]:
+            temp_image_file(image_path=name, temp_dir_path=_temp_dir)
+        _dest: pathlib.Path = temp_dest_path()
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["ic_rename", str(_temp_dir), "--dest", str(_dest), "-before", "X", "Y", "Z", "-after", "", "", ""]
+            + (["--collision_policy", policy] if policy else [])
+            + ["--run"],
+        )
+        main()
+        assert len(list(_dest.glob("*/*.png"))) == count
+
+    def test_overwrite_with_workers(self, monkeypatch, temp_image_file, temp_dir_path, temp_dest_path):
+        """The images output to the same path are output once, by the last image as the sequential run."""
+        _temp_dir: pathlib.Path = temp_dir_path()
+        for index in range(40):
+            temp_image_file(image_path=f"image{index:02d}.png", temp_dir_path=_temp_dir, rgb_color=(index, 0, 0))
+        _before = [f"image{index:02d}" for index in range(40)]
+        for workers in ["1", "8"]:
+            _dest: pathlib.Path = temp_dest_path(f"dest{workers}")
+            monkeypatch.setattr(
+                sys,
+                "argv",
+                ["ic_rename", str(_temp_dir), "--dest", str(_dest), "-before", *_before, "-after", *["same"] * 40]
+                + ["--order", "natural", "-w", workers, "--run"],
+            )
+            main()
+            _outputs = list(_dest.glob("*/*.png"))
+            assert [p.name for p in _outputs] == ["same.png"]
+            assert _outputs[0].read_bytes() == (_temp_dir / "image39.png").read_bytes()
+            _comparison = list(_dest.glob(f"*/{DefaultValues.COMPARISON_FILE_NAME.value}"))[0].read_text()
+            assert _comparison.count("NAME: ") == 1
+
+
+@pytest.mark.parametrize("command, module", [("ic_rename", "lib.rename"), ("ic_resize", "lib.resize")])
+def test_help_imports_no_heavy_dependencies(command, module):
+    """--help should not pay for the dependencies only some tasks use."""
+    code = (
+        f"import sys; sys.argv = ['{command}', '--help']\n"
+        f"from {module} import main\n"
+        "try:\n    main()\nexcept SystemExit:\n    pass\n"
+        "print(sorted(m for m in ['jaconv', 'dotenv', 'asyncio', 'sqlite3', 'PIL'] if m in sys.modules))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=pathlib.Path(__file__).parents[2], capture_output=True, text=True, check=True
+    )
+    # the help is written once, since the arguments are parsed once.
+    assert completed.stdout.count(f"usage: {command}") == 1
+    assert completed.stdout.splitlines()[-1] == "[]"
@@ -0,0 +1,257 @@
+# mypy: ignore-errors
+import argparse
+import pathlib
+import sys
+
+import pytest
+from PIL import Image, JpegImagePlugin
+
+from lib.resize import (
+    RenditionTask,
+    ResizeTask,
+    get_resized_size,
+    get_resized_stem,
+    main,
+    resize_image,
+    resize_renditions,
+)
+
+
+@pytest.fixture(scope="function")
+def jpeg_drafts(monkeypatch):
+    """The sizes the JPEG images are decoded at."""
+    drafts = []
+    _draft = JpegImagePlugin.JpegImageFile.draft
+
+    def draft(self, mode, size):
+        _result = _draft(self, mode, size)
+        drafts.append(self.size)
+        return _result
+
+    monkeypatch.setattr(JpegImagePlugin.JpegImageFile, "draft", draft)
+    yield drafts
+
+
+@pytest.mark.parametrize(
+    "original_size, width, height, is_aspect_ratio_kept, expected",
+    [
+        ((4000, 3000), 800, 0, True, (800, 600)),
+        ((4000, 3000), 800, 100, True, (800, 600)),
+        ((4000, 3000), 800, 0, False, (800, 3000)),
+        ((4000, 3000), 800, 100, False, (800, 100)),
+        # round half up
+        ((3, 5), 1, 0, True, (1, 2)),
+        ((1000, 1), 10, 0, True, (10, 1)),
+    ],
+)
+def test_get_resized_size(original_size, width, height, is_aspect_ratio_kept, expected):
+    assert get_resized_size(original_size, width=width, height=height, is_aspect_ratio_kept=is_aspect_ratio_kept) == (
+        expected
+    )
+
+
+class TestResizeImage:
+    def test_jpeg(self, temp_image_file, temp_dir_path, jpeg_drafts):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        _src: pathlib.Path = temp_image_file(image_path="image.jpg", temp_dir_path=_temp_dir, size=(1600, 1200))
+
+        result = resize_image(
+            ResizeTask(
+                serial=1, src=str(_src), dst=str(_temp_dir / "resized.jpg"), width=300, is_aspect_ratio_kept=True
+            )
+        )
+        assert result.error == ""
+        assert result.original_size == (1600, 1200)
+        assert result.resized_size == (300, 225)
+        # decoded at 1/2 scale, not below twice the new size.
+        assert jpeg_drafts == [(800, 600)]
+        with Image.open(_temp_dir / "resized.jpg") as image:
+            assert image.size == (300, 225)
+            assert image.format == "JPEG"
+
+    @pytest.mark.parametrize("quality, expected_draft", [("fast", (400, 300)), ("best", None)])
+    def test_quality(self, temp_image_file, temp_dir_path, jpeg_drafts, quality, expected_draft):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        _src: pathlib.Path = temp_image_file(image_path="image.jpg", temp_dir_path=_temp_dir, size=(1600, 1200))
+        result = resize_image(
+            ResizeTask(
+                serial=1, src=str(_src), dst=str(_temp_dir / "resized.jpg"), width=300, height=225, quality=quality
+            )
+        )
+        assert result.resized_size == (300, 225)
+        assert jpeg_drafts == ([expected_draft] if expected_draft else [])
+
+    def test_jpeg_keeps_quality_and_exif(self, temp_dir_path):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        _src = _temp_dir / "image.jpg"
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees clockwise
+        Image.new("RGB", (640, 480), (0, 128, 255)).save(_src, quality=95, subsampling=0, exif=exif)
+
+        result = resize_image(ResizeTask(serial=1, src=str(_src), dst=str(_temp_dir / "resized.jpg"), width=320))
+        assert result.error == ""
+        with Image.open(_src) as original, Image.open(_temp_dir / "resized.jpg") as image:
+            assert image.quantization == original.quantization
+            assert JpegImagePlugin.get_sampling(image) == 0
+            assert image.getexif()[0x0112] == 6
+
+    def test_decompression_bomb(self, temp_image_file, temp_dir_path, monkeypatch):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        _src: pathlib.Path = temp_image_file(image_path="image.png", temp_dir_path=_temp_dir)
+        monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+        result = resize_image(ResizeTask(serial=1, src=str(_src), dst=str(_temp_dir / "resized.png"), width=100))
+        assert "decompression bomb" in result.error
+        assert (_temp_dir / "resized.png").exists() is False
+
+    def test_png(self, temp_image_file, temp_dir_path):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        _src: pathlib.Path = temp_image_file(image_path="image.png", temp_dir_path=_temp_dir)
+        result = resize_image(
+            ResizeTask(serial=1, src=str(_src), dst=str(_temp_dir / "resized.png"), width=100, height=50)
+        )
+        assert result.resized_size == (100, 50)
+        with Image.open(_temp_dir / "resized.png") as image:
+            assert image.size == (100, 50)
+            assert image.format == "PNG"
+
+    def test_broken_image(self, temp_dir_path):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        _src = _temp_dir / "broken.png"
+        _src.write_bytes(b"not an image")
+        result = resize_image(ResizeTask(serial=1, src=str(_src), dst=str(_temp_dir / "resized.png"), width=100))
+        assert result.error != ""
+        assert (_temp_dir / "resized.png").exists() is False
+
+
+class TestResizeRenditions:
+    def test_renditions(self, temp_image_file, temp_dir_path, jpeg_drafts, monkeypatch):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        _src: pathlib.Path = temp_image_file(image_path="image.jpg", temp_dir_path=_temp_dir, size=(1600, 1200))
+        opened = []
+        _open = Image.open
+        monkeypatch.setattr(Image, "open", lambda *args, **kwargs: opened.append(args) or _open(*args, **kwargs))
+
+        results = resize_renditions(
+            RenditionTask(
+                serial=1,
+                src=str(_src),
+                renditions=tuple((width, str(_temp_dir / f"image_{width}.jpg")) for width in [160, 640, 320]),
+            )
+        )
+        # decoded once, at the scale for the largest rendition.
+        assert len(opened) == 1
+        assert jpeg_drafts == [(1600, 1200)]
+        # from the largest to the smallest.
+        assert [result.resized_size for result in results] == [(640, 480), (320, 240), (160, 120)]
+        for width in [160, 320, 640]:
+            with _open(_temp_dir / f"image_{width}.jpg") as image:
+                assert image.size == (width, width * 3 // 4)
+
+    def test_broken_image(self, temp_dir_path):
+        _temp_dir: pathlib.Path = temp_dir_path()
+        _src = _temp_dir / "broken.png"
+        _src.write_bytes(b"not an image")
+        results = resize_renditions(
+            RenditionTask(
+                serial=1, src=str(_src), renditions=((100, str(_temp_dir / "a.png")), (50, str(_temp_dir / "b.png")))
+            )
+        )
+        assert [result.dst for result in results] == [str(_temp_dir / "a.png"), str(_temp_dir / "b.png")]
+        assert all(result.error for result in results)
+
+
+@pytest.mark.parametrize(
+    "options, width, expected",
+    [
+        ({}, None, "image"),
+        ({"is_prefix_added": True}, None, "resize_image"),
+        ({"is_prefix_added": True, "suffix": "s", "is_serial_number_added": True}, 640, "resize_image_s001_640"),
+        ({"separator": "-"}, 320, "image-320"),
+    ],
+)
+def test_get_resized_stem(options, width, expected):
+    args = argparse.Namespace(
+        **{
+            "is_prefix_added": False,
+            "prefix": "resize",
+            "suffix": "",
+            "separator": "_",
+            "is_serial_number_added": False,
+            **options,
+        }
+    )
+    assert get_resized_stem(args, "image", serial=1, width=width) == expected
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_main(monkeypatch, temp_image_file, temp_dir_path, temp_dest_path, workers):
+    _temp_dir: pathlib.Path = temp_dir_path()
+    for index in range(6):
+        temp_image_file(image_path=f"dir{index % 2}/image{index}.jpg", temp_dir_path=_temp_dir)
+    (_temp_dir / "dir0" / "broken.jpg").write_bytes(b"not an image")
+    _dest: pathlib.Path = temp_dest_path()
+
+    monkeypatch.setattr(
+        sys, "argv", ["ic_resize", str(_temp_dir), "160", "--dest", str(_dest), "-ka", "-add_prefix", "-w", workers]
+    )
+    main()
+    # nothing is output without --run.
+    assert list(_dest.iterdir()) == []
+
+    monkeypatch.setattr(sys, "argv", sys.argv + ["--run"])
+    main()
+    resized_images = sorted(_dest.glob("*/dir*/*.jpg"))
+    assert [p.relative_to(p.parents[1]).as_posix() for p in resized_images] == [
+        f"dir{index % 2}/resize_image{index}.jpg" for index in [0, 2, 4, 1, 3, 5]
+    ]
+    for resized_image in resized_images:
+        with Image.open(resized_image) as image:
+            assert image.size == (160, 120)
+
+
+def test_main_invalid_width(monkeypatch, temp_dir_path, temp_dest_path, capsys):
+    _dest: pathlib.Path = temp_dest_path()
+    monkeypatch.setattr(sys, "argv", ["ic_resize", str(temp_dir_path()), "0", "--dest", str(_dest), "--run"])
+    main()
+    assert 'width "0" should be 1 or more.' in capsys.readouterr().out
+    assert list(_dest.iterdir()) == []
+
+
+def test_main_sizes(monkeypatch, temp_image_file, temp_dir_path, temp_dest_path):
+    _temp_dir: pathlib.Path = temp_dir_path()
+    temp_image_file(image_path="image.vol1.jpg", temp_dir_path=_temp_dir, size=(1280, 960))
+    temp_image_file(image_path="dir/image.png", temp_dir_path=_temp_dir, size=(1280, 960))
+    _dest: pathlib.Path = temp_dest_path()
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["ic_resize", str(_temp_dir), "--sizes", "640", "320", "--dest", str(_dest), "-add_serial", "--run"],
+    )
+    main()
+    _out: pathlib.Path = next(_dest.iterdir())
+    assert sorted(p.relative_to(_out).as_posix() for p in _out.glob("**/*") if p.is_file()) == [
+        "dir/image002_320.png",
+        "dir/image002_640.png",
+        "image.vol1001_320.jpg",
+        "image.vol1001_640.jpg",
+    ]
+
+
+def test_main_incremental(monkeypatch, temp_image_file, temp_dir_path, temp_dest_path):
+    _temp_dir: pathlib.Path = temp_dir_path()
+    for index in range(3):
+        temp_image_file(image_path=f"image{index}.jpg", temp_dir_path=_temp_dir)
+    _dest: pathlib.Path = temp_dest_path()
+    _now_strs = iter(f"2023-01-01_00-00-0{second}" for second in range(10))
+    monkeypatch.setattr("lib.resize.datetime2str", lambda: next(_now_strs))
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["ic_resize", str(_temp_dir), "--sizes", "80", "40", "--dest", str(_dest), "--incremental", "--run"],
+    )
+    main()
+    assert len(list(_dest.glob("*_00-00-00/*.jpg"))) == 6
+
+    temp_image_file(image_path="image1.jpg", temp_dir_path=_temp_dir, rgb_color=(255, 0, 0))
+    main()
+    assert sorted(p.name for p in _dest.glob("*_00-00-01/*.jpg")) == ["image1_40.jpg", "image1_80.jpg"]
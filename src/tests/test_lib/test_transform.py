@@ -0,0 +1,126 @@
+# mypy: ignore-errors
+import pathlib
+import sys
+
+import pytest
+from jaconv import jaconv
+
+from lib.rename import Rename
+from lib.transform import NameTransformer, zen2han
+
+DIR_PATH = pathlib.Path("/images")
+
+IMAGE_PATHS = [
+    DIR_PATH / "image.png",
+    DIR_PATH / "ｆｕｌｌ　ｗｉｄｔｈ－ｎａｍｅ０１.png",
+    DIR_PATH / "dir1" / "a b\tc-d.e.JPG",
+    DIR_PATH / "dir1" / "dir2" / 'un:available*chars?"<>|¥.gif',
+    DIR_PATH / "dir1" / "url%20encoded(chars)!.webp",
+    DIR_PATH / "日本語 の 画像.vol1.png",
+    DIR_PATH / "no_extension",
+]
+
+OPTIONS = [
+    {},
+    {"chars_before_replacement": ["image", "a"], "chars_after_replacement": ["photo", "image"]},
+    {
+        "chars_before_replacement": ["image", "a", "im", "ｗｉｄｔｈ", "d"],
+        "chars_after_replacement": ["photo", "image", "X", "", "D"],
+        "replacement_mode": "simultaneous",
+    },
+    {"is_all_replaced_with_new_name": True, "new_name": "new name"},
+    {"prefix": "pre", "suffix": "suf", "separator": "-"},
+    {"is_separator_and_delimiter_replaced": True},
+    {"is_separator_and_delimiter_replaced": True, "separator": "%"},
+    {"is_url_encoded_char_replaced": True, "alternative_url_encoded_char": "x"},
+    {"alternative_unavailable_char_in_windows": "_"},
+    {"is_serial_number_added": True, "zero_padding_digit": 5},
+    {"is_output_to_same_dir": True},
+    {
+        "chars_before_replacement": ["ｆｕｌｌ"],
+        "chars_after_replacement": ["full"],
+        "prefix": "ｐｒｅ",
+        "is_separator_and_delimiter_replaced": True,
+        "is_url_encoded_char_replaced": True,
+        "is_serial_number_added": True,
+        "is_output_to_same_dir": True,
+    },
+]
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_transform_batch_is_the_same_as_rename(options):
+    expected = []
+    for serial, image_path in enumerate(IMAGE_PATHS, start=1):
+        rename = Rename(image_path=image_path, now_str="", dir_path=DIR_PATH, loop_count=serial, **options)
+        rename.convert()
+        expected.append(rename.renamed_image_stem)
+
+    relative_image_paths = [p.relative_to(DIR_PATH) for p in IMAGE_PATHS]
+    transformer = NameTransformer(**options)
+    stems = [Rename(image_path=p, now_str="", dir_path=DIR_PATH).original_image_stem for p in IMAGE_PATHS]
+    assert (
+        transformer.transform_batch(
+            stems,
+            serials=range(1, len(stems) + 1),
+            relative_parent_parts=[p.parent.parts for p in relative_image_paths],
+        )
+        == expected
+    )
+    # the conversion of a name does not depend on the other names of the batch.
+    assert [
+        transformer.transform(stem, serial=serial, relative_parent_parts=p.parent.parts)
+        for serial, (stem, p) in enumerate(zip(stems, relative_image_paths), start=1)
+    ] == expected
+
+
+@pytest.mark.parametrize("mode", ["successive", "simultaneous"])
+def test_replacement_rules(mode, tmp_path):
+    (tmp_path / "rules.tsv").write_text("ｆｕｌｌ\tfull\nfull\tFULL\n.vol1\t\n")
+    options = {
+        "chars_before_replacement": ["image"],
+        "chars_after_replacement": ["photo"],
+        "replacement_rules": str(tmp_path / "rules.tsv"),
+        "replacement_mode": mode,
+    }
+    expected = []
+    for image_path in IMAGE_PATHS:
+        rename = Rename(image_path=image_path, now_str="", dir_path=DIR_PATH, loop_count=1, **options)
+        rename.convert()
+        expected.append(rename.renamed_image_stem)
+    stems = [Rename(image_path=p, now_str="", dir_path=DIR_PATH).original_image_stem for p in IMAGE_PATHS]
+    assert NameTransformer(**options).transform_batch(stems) == expected
+    assert expected[:2] == ["photo", "FULL width-name01" if mode == "successive" else "full width-name01"]
+    assert expected[5] == "日本語 の 画像"
+
+
+def test_transform_batch_empty():
+    assert NameTransformer().transform_batch([]) == []
+
+
+def test_transform_batch_without_serials():
+    transformer = NameTransformer(is_serial_number_added=True)
+    with pytest.raises(ValueError) as excinfo:
+        transformer.transform_batch(["image"])
+    assert excinfo.value.args[0] == "'loop_count' should be start from 1."
+
+
+def test_new_name_is_required():
+    with pytest.raises(ValueError) as excinfo:
+        NameTransformer(is_all_replaced_with_new_name=True)
+    assert excinfo.value.args[0] == "Specify a new name of the image. (e.g. --new_name newname)"
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["", "DSC_01234", "ＤＳＣ＿０１２３４", "ｆｕｌｌ　ｗｉｄｔｈ－ｎａｍｅ～０１", "日本語の画像ファイル名：００１？", "ﾊﾝｶｸｶﾅ and カタカナ"],
+)
+def test_zen2han(text):
+    assert zen2han(text).encode("utf-8") == jaconv.z2h(text, kana=False, ascii=True, digit=True).encode("utf-8")
+
+
+def test_zen2han_all_characters():
+    """Every code point is converted as jaconv converts it."""
+    text = "".join(chr(code) for code in range(sys.maxunicode + 1))
+    expected = jaconv.z2h(text, kana=False, ascii=True, digit=True)
+    assert zen2han(text).encode("utf-8", "surrogatepass") == expected.encode("utf-8", "surrogatepass")
@@ -0,0 +1,70 @@
+# mypy: ignore-errors
+import os
+import pathlib
+
+from utils.cache import ProcessingCache, content_hash_of
+
+
+def _touch(path: pathlib.Path) -> None:
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestProcessingCache:
+    def test_lookup(self, tmp_path):
+        source = tmp_path / "a.png"
+        source.write_bytes(b"image")
+        output = tmp_path / "dest" / "images_2023-01-01_00-00-00" / "a001.png"
+        output.parent.mkdir(parents=True)
+        output.write_bytes(b"image")
+
+        with ProcessingCache(dest_path=tmp_path / "dest", task_name="rename", options={"prefix": ""}) as cache:
+            assert cache.lookup(source, "a001.png") is None
+            cache.record(source=source, target="a001.png", output=output)
+            assert cache.lookup(source, "a001.png") == str(output)
+            # output to another target.
+            assert cache.lookup(source, "a002.png") is None
+        assert (tmp_path / "dest" / ProcessingCache.FILE_NAME).is_file()
+
+        # the records are kept for the next task.
+        with ProcessingCache(dest_path=tmp_path / "dest", task_name="rename", options={"prefix": ""}) as cache:
+            assert cache.lookup(source, "a001.png") == str(output)
+        # other options or another task.
+        with ProcessingCache(dest_path=tmp_path / "dest", task_name="rename", options={"prefix": "p"}) as cache:
+            assert cache.lookup(source, "a001.png") is None
+        with ProcessingCache(dest_path=tmp_path / "dest", task_name="resize", options={"prefix": ""}) as cache:
+            assert cache.lookup(source, "a001.png") is None
+
+        with ProcessingCache(dest_path=tmp_path / "dest", task_name="rename", options={"prefix": ""}) as cache:
+            # modified.
+            _touch(source)
+            assert cache.lookup(source, "a001.png") is None
+            cache.record(source=source, target="a001.png", output=output)
+            # the output is deleted.
+            output.unlink()
+            assert cache.lookup(source, "a001.png") is None
+
+    def test_content_hash(self, tmp_path):
+        source = tmp_path / "a.png"
+        source.write_bytes(b"image")
+        output = tmp_path / "a001.png"
+        output.write_bytes(b"image")
+
+        with ProcessingCache(dest_path=tmp_path, task_name="rename", options={}, use_content_hash=True) as cache:
+            cache.record(source=source, target="a001.png", output=output)
+            # touched, but the content is the same.
+            _touch(source)
+            assert cache.lookup(source, "a001.png") == str(output)
+            # the modification time is updated.
+            assert cache.lookup(source, "a001.png") == str(output)
+
+            source.write_bytes(b"IMAGE")
+            _touch(source)
+            assert cache.lookup(source, "a001.png") is None
+
+    def test_content_hash_of(self, tmp_path):
+        (tmp_path / "a").write_bytes(b"image")
+        (tmp_path / "b").write_bytes(b"image")
+        (tmp_path / "c").write_bytes(b"other")
+        assert content_hash_of(tmp_path / "a") == content_hash_of(tmp_path / "b")
+        assert content_hash_of(tmp_path / "a") != content_hash_of(tmp_path / "c")
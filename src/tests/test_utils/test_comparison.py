@@ -0,0 +1,68 @@
+# mypy: ignore-errors
+import csv
+import json
+import pathlib
+
+from utils.comparison import ComparisonFormat, ComparisonWriter
+
+
+def test_comparison_writer(temp_dest_path):
+    _dest: pathlib.Path = temp_dest_path()
+    comparisons = [f"\nNAME: {i}.png => new{i}.png\nPATH: /src/{i}.png => /dest/new{i}.png\n" for i in range(5)]
+
+    writer = ComparisonWriter(dest_dir_path=_dest / "dest_dir", formats=ComparisonFormat.values())
+    with writer:
+        for i, comparison in enumerate(comparisons):
+            writer.write(original_path=f"/src/{i}.png", renamed_path=f"/dest/new{i}.png", comparison=comparison)
+        # the record written so far can be read before the writer is closed.
+        writer.flush()
+        assert writer.file_path(ComparisonFormat.TEXT).read_text() == "\n\n".join(comparisons)
+    assert writer.files == {}
+
+    assert (_dest / "dest_dir" / "comparison.txt").read_text() == "\n\n".join(comparisons)
+
+    with open(writer.file_path(ComparisonFormat.CSV), newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 5
+    assert rows[1] == {
+        "original_name": "1.png",
+        "renamed_name": "new1.png",
+        "original_path": "/src/1.png",
+        "renamed_path": "/dest/new1.png",
+    }
+
+    lines = writer.file_path(ComparisonFormat.JSONL).read_text().splitlines()
+    assert [json.loads(line) for line in lines] == rows
+
+
+def test_comparison_writer_flush_interval(temp_dest_path, monkeypatch):
+    _dest: pathlib.Path = temp_dest_path()
+    monkeypatch.setattr(ComparisonWriter, "FLUSH_INTERVAL", 2)
+    with ComparisonWriter(dest_dir_path=_dest) as writer:
+        writer.write(original_path="a.png", renamed_path="b.png", comparison="1")
+        writer.write(original_path="a.png", renamed_path="b.png", comparison="2")
+        assert writer.file_path(ComparisonFormat.TEXT).read_text() == "1\n\n2"
+        writer.write(original_path="a.png", renamed_path="b.png", comparison="3")
+    assert writer.file_path(ComparisonFormat.TEXT).read_text() == "1\n\n2\n\n3"
+
+
+def test_comparison_writer_replace(temp_dest_path):
+    _dest: pathlib.Path = temp_dest_path()
+    with ComparisonWriter(dest_dir_path=_dest) as writer:
+        writer.write(original_path="a.png", renamed_path="b.png", comparison="old")
+
+    try:
+        with ComparisonWriter(dest_dir_path=_dest, replace=True) as writer:
+            writer.write(original_path="a.png", renamed_path="c.png", comparison="failed")
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    # the files are kept if the writer fails.
+    assert [p.name for p in _dest.iterdir()] == ["comparison.txt"]
+    assert writer.file_path(ComparisonFormat.TEXT).read_text() == "old"
+
+    with ComparisonWriter(dest_dir_path=_dest, replace=True) as writer:
+        writer.write(original_path="a.png", renamed_path="c.png", comparison="new")
+        assert writer.file_path(ComparisonFormat.TEXT).read_text() == "old"
+    assert [p.name for p in _dest.iterdir()] == ["comparison.txt"]
+    assert writer.file_path(ComparisonFormat.TEXT).read_text() == "new"
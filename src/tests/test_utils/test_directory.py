@@ -0,0 +1,50 @@
+# mypy: ignore-errors
+import os
+import pathlib
+
+from utils.directory import DirectoryCache
+
+
+class TestDirectoryCache:
+    def test_make(self, tmp_path, monkeypatch):
+        directories = DirectoryCache()
+        directories.make(tmp_path / "dir1" / "dir2")
+        assert (tmp_path / "dir1" / "dir2").is_dir()
+        assert len(directories) == 1
+
+        # no syscall for the directory already created.
+        calls = []
+        monkeypatch.setattr("os.makedirs", lambda *args, **kwargs: calls.append(args))
+        directories.make(tmp_path / "dir1" / "dir2")
+        directories.make(str(tmp_path / "dir1" / "dir2"))
+        assert calls == []
+        assert len(directories) == 1
+
+    def test_existing_directory(self, tmp_path):
+        directories = DirectoryCache()
+        directories.make(pathlib.Path(tmp_path))
+        assert str(tmp_path) in directories.created
+
+    def test_make_skeleton(self, tmp_path, monkeypatch):
+        directories = DirectoryCache()
+        made = []
+        _mkdir = os.mkdir
+
+        def mkdir(path, *args, **kwargs):
+            made.append(pathlib.Path(path).relative_to(tmp_path / "dest").as_posix())
+            _mkdir(path, *args, **kwargs)
+
+        monkeypatch.setattr("os.mkdir", mkdir)
+        (tmp_path / "dest" / "b").mkdir(parents=True)
+        made.clear()
+        directories.make_skeleton(tmp_path / "dest", ["a/b/c", "", "a/b/c", "b/d", "a"])
+        # the root, then parent-first, once for each directory.
+        assert made == [".", "a", "b", "a/b", "b/d", "a/b/c"]
+        assert (tmp_path / "dest" / "a" / "b" / "c").is_dir()
+        assert (tmp_path / "dest" / "b" / "d").is_dir()
+        assert str(tmp_path / "dest" / "a" / "b" / "c") in directories.created
+
+        made.clear()
+        directories.make(tmp_path / "dest" / "a" / "b" / "c")
+        directories.make_skeleton(tmp_path / "dest", ["a/b/c"])
+        assert made == []
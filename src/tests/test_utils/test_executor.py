@@ -0,0 +1,104 @@
+# mypy: ignore-errors
+import threading
+import time
+
+import pytest
+
+from utils.executor import IN_FLIGHT_PER_WORKER, execute, execute_in_processes
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_execute(workers):
+    done = []
+    thread_ids = set()
+
+    def _func(item: int) -> None:
+        # the later items finish earlier.
+        time.sleep((10 - item) / 1000)
+        thread_ids.add(threading.get_ident())
+        done.append(item)
+
+    assert list(execute(func=_func, items=range(10), workers=workers)) == list(range(10))
+    assert sorted(done) == list(range(10))
+    assert len(thread_ids) <= workers
+
+
+def test_execute_is_lazy():
+    consumed = []
+
+    def _items():
+        for item in range(100):
+            consumed.append(item)
+            yield item
+
+    results = execute(func=abs, items=_items(), workers=2)
+    assert next(results) == 0
+    assert len(consumed) == 2 * IN_FLIGHT_PER_WORKER
+    assert list(results) == list(range(1, 100))
+
+
+def test_execute_overlaps_latency():
+    # 20 operations of 50ms round trips take 1s one after another.
+    start = time.monotonic()
+    assert list(execute(func=lambda _: time.sleep(0.05), items=range(20), workers=10)) == list(range(20))
+    assert time.monotonic() - start < 0.5
+
+
+def test_execute_in_flight():
+    consumed = []
+
+    def _items():
+        for item in range(100):
+            consumed.append(item)
+            yield item
+
+    results = execute(func=abs, items=_items(), workers=2, in_flight=3)
+    assert next(results) == 0
+    assert len(consumed) == 3
+    assert list(results) == list(range(1, 100))
+
+
+def test_execute_raises():
+    def _func(item: int) -> None:
+        if item == 3:
+            raise OSError("network is unreachable")
+
+    results = execute(func=_func, items=range(10), workers=2)
+    with pytest.raises(OSError):
+        list(results)
+
+
+@pytest.mark.parametrize(
+    "workers, in_flight, message",
+    [(0, None, "'workers' should be 1 or more. 0 is passed."), (1, 0, "'in_flight' should be 1 or more. 0 is passed.")],
+)
+def test_execute_invalid(workers, in_flight, message):
+    with pytest.raises(ValueError) as excinfo:
+        list(execute(func=print, items=[], workers=workers, in_flight=in_flight))
+    assert excinfo.value.args[0] == message
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_execute_in_processes(workers):
+    assert list(execute_in_processes(func=abs, items=range(0, -50, -1), workers=workers)) == list(range(50))
+
+
+def test_execute_in_processes_is_lazy():
+    consumed = []
+
+    def _items():
+        for item in range(100):
+            consumed.append(item)
+            yield item
+
+    results = execute_in_processes(func=abs, items=_items(), workers=2)
+    assert next(results) == 0
+    # the items are not consumed all at once.
+    assert len(consumed) == 2 * IN_FLIGHT_PER_WORKER
+    assert list(results) == list(range(1, 100))
+
+
+def test_execute_in_processes_invalid_workers():
+    with pytest.raises(ValueError) as excinfo:
+        list(execute_in_processes(func=abs, items=[], workers=0))
+    assert excinfo.value.args[0] == "'workers' should be 1 or more. 0 is passed."
@@ -0,0 +1,39 @@
+# mypy: ignore-errors
+import pytest
+
+from utils import VALID_EXTENSIONS
+from utils.extension import ExtensionIndex
+
+
+@pytest.mark.parametrize(
+    "name, extension",
+    [
+        ("image.png", ".png"),
+        ("image.vol1.png", ".png"),
+        ("image.png.txt", ""),
+        ("IMAGE.PNG", ".PNG"),
+        ("image.Jpeg", ".Jpeg"),
+        ("imagepng", ""),
+        ("image.svgz", ".svgz"),
+        ("image.svg.gz", ""),
+        (".png", ""),
+        ("image", ""),
+    ],
+)
+def test_extension_of(name, extension):
+    index = ExtensionIndex(VALID_EXTENSIONS)
+    assert index.extension_of(name) == extension
+    assert index.match(name) is bool(extension)
+
+
+def test_extension_of_multiple_suffixes():
+    index = ExtensionIndex([".gz", ".tar.gz", ".png"])
+    assert index.max_dot_count == 2
+    assert index.extension_of("archive.tar.gz") == ".tar.gz"
+    assert index.extension_of("archive.vol1.gz") == ".gz"
+    assert index.extension_of(".tar.gz") == ".gz"
+
+
+def test_of():
+    assert ExtensionIndex.of(VALID_EXTENSIONS) is ExtensionIndex.of(list(VALID_EXTENSIONS))
+    assert ExtensionIndex.of([".png"]) is not ExtensionIndex.of(VALID_EXTENSIONS)
@@ -0,0 +1,43 @@
+# mypy: ignore-errors
+import pathlib
+
+import pytest
+
+from utils.journal import Journal
+
+
+def test_journal(temp_dest_path):
+    _dest: pathlib.Path = temp_dest_path()
+    with Journal(dir_path=_dest) as journal:
+        for serial in range(1, 4):
+            journal.plan(serial=serial, src=f"/src/{serial}.png", dst=f"/dest/{serial}.png")
+        journal.sync()
+        journal.complete(1)
+        journal.complete(2)
+
+    # interrupted while writing a record.
+    with open(journal.path, "a") as f:
+        f.write('{"op": "do')
+
+    journal = Journal(dir_path=_dest).load()
+    assert journal.planned == {serial: (f"/src/{serial}.png", f"/dest/{serial}.png") for serial in range(1, 4)}
+    assert journal.completed == {1, 2}
+    assert journal.is_completed(3) is False
+
+    with journal:
+        # the same plan is not written again.
+        journal.plan(serial=3, src="/src/3.png", dst="/dest/3.png")
+        with pytest.raises(ValueError) as excinfo:
+            journal.plan(serial=2, src="/src/changed.png", dst="/dest/2.png")
+        assert "differs from" in excinfo.value.args[0]
+        journal.complete(3)
+
+    journal = Journal(dir_path=_dest).load()
+    assert journal.completed == {1, 2, 3}
+    assert len(journal.path.read_text().splitlines()) == 7
+
+
+def test_journal_not_found(temp_dest_path):
+    with pytest.raises(ValueError) as excinfo:
+        Journal(dir_path=temp_dest_path()).load()
+    assert excinfo.value.args[0].startswith("No journal in")
@@ -0,0 +1,80 @@
+# mypy: ignore-errors
+import io
+import pathlib
+import sys
+
+import pytest
+
+from utils import manifest
+from utils.manifest import (
+    ManifestEntry,
+    manifest_entries_from,
+    parse_record,
+    read_records,
+)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+@pytest.mark.parametrize("delimiter", ["\n", "\0"])
+def test_read_records(monkeypatch, chunk_size, delimiter):
+    monkeypatch.setattr(manifest, "READ_CHUNK_SIZE", chunk_size)
+    records = ["a.png", "dir/b c.png", "dir/d.png\tnew.png"]
+    assert list(read_records(io.StringIO(delimiter.join(records)), delimiter=delimiter)) == records
+    # with the delimiter at the end.
+    assert list(read_records(io.StringIO(delimiter.join(records) + delimiter), delimiter=delimiter)) == records
+
+
+def test_parse_record():
+    assert parse_record("dir/a.png") == ManifestEntry(path=pathlib.Path("dir/a.png"))
+    assert parse_record("dir/a.png\tnew.png") == ManifestEntry(path=pathlib.Path("dir/a.png"), new_name="new.png")
+    assert parse_record("a.png\r") == ManifestEntry(path=pathlib.Path("a.png"))
+    assert parse_record("a\n.png\r", delimiter="\0") == ManifestEntry(path=pathlib.Path("a\n.png\r"))
+    assert parse_record("  ") is None
+
+
+def test_manifest_entries_from(tmp_path, temp_image_file, monkeypatch, capsys):
+    _dir = tmp_path / "images"
+    _a = temp_image_file(image_path="a.png", temp_dir_path=_dir)
+    temp_image_file(image_path="dir/b.png", temp_dir_path=_dir)
+    temp_image_file(image_path="outside.png", temp_dir_path=tmp_path)
+    (_dir / "c.txt").write_text("text")
+    _manifest = tmp_path / "manifest.txt"
+    _manifest.write_text(
+        "\n".join(
+            [
+                str(_a),
+                "dir/b.png\tnew.png",
+                "",
+                "../outside.png",
+                str(tmp_path / "outside.png"),
+                "missing.png",
+                "c.txt",
+                "dir/b.png\tdir/new.png",
+            ]
+        )
+    )
+    assert list(manifest_entries_from(_manifest, dir_path=_dir, valid_extensions=[".png"])) == [
+        ManifestEntry(path=_dir / "a.png"),
+        ManifestEntry(path=_dir / "dir" / "b.png", new_name="new.png"),
+    ]
+    out = capsys.readouterr().out
+    assert "is not in" in out
+    assert "does not exist" in out
+    assert "is invalid extension" in out
+    assert "is not a file name" in out
+
+    # dir_path itself is not an image in it, even if its name has a valid extension.
+    _album = tmp_path / "album.png"
+    temp_image_file(image_path="a.png", temp_dir_path=_album)
+    _manifest.write_text("\n".join([".", str(_album), "a.png/..", "a.png"]))
+    assert list(manifest_entries_from(_manifest, dir_path=_album, valid_extensions=[".png"])) == [
+        ManifestEntry(path=_album / "a.png")
+    ]
+    assert capsys.readouterr().out.count("is not in") == 3
+
+    # stdin, NUL-delimited
+    monkeypatch.setattr(sys, "stdin", io.StringIO("a.png\0dir/b.png\0"))
+    assert list(manifest_entries_from("-", dir_path=_dir, valid_extensions=[".png"], delimiter="nul")) == [
+        ManifestEntry(path=_dir / "a.png"),
+        ManifestEntry(path=_dir / "dir" / "b.png"),
+    ]
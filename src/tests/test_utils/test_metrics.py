@@ -0,0 +1,27 @@
+# mypy: ignore-errors
+import pytest
+
+from utils.executor import execute
+from utils.metrics import OperationMetrics
+
+
+def test_operation_metrics():
+    metrics = OperationMetrics()
+    assert metrics.summary() == []
+
+    def _func(_: int) -> None:
+        with metrics.measure("transfer"):
+            pass
+
+    list(execute(func=_func, items=range(100), workers=4))
+    metrics.add("mkdir", count=3, seconds=0.03)
+    assert metrics.counts == {"transfer": 100, "mkdir": 3}
+    assert 1 <= metrics.max_in_flight <= 4
+    assert metrics.in_flight == 0
+    assert metrics.mean_latency("mkdir") == pytest.approx(0.01)
+    assert metrics.mean_latency("stat") == 0.0
+    assert metrics.rate("transfer") > 0
+    summary = metrics.summary()
+    assert summary[0].startswith("transfer: 100 ops ")
+    assert summary[1].startswith("mkdir: 3 ops ") and summary[1].endswith("mean latency 10.0ms")
+    assert summary[2] == f"max in flight: {metrics.max_in_flight}"
@@ -0,0 +1,112 @@
+# mypy: ignore-errors
+import os
+import pathlib
+import random
+import time
+
+import pytest
+from PIL import Image
+
+from utils.manifest import ManifestEntry
+from utils.ordering import ImageOrder, capture_time_of, natural_key, sort_images
+
+
+def test_natural_key():
+    names = ["img10.png", "img2.png", "IMG1.png", "img1.png", "img.png", "10.png", "a1b10.png", "a1b2.png"]
+    assert sorted(names, key=natural_key) == [
+        "10.png",
+        "a1b2.png",
+        "a1b10.png",
+        "IMG1.png",
+        "img1.png",
+        "img2.png",
+        "img10.png",
+        "img.png",
+    ]
+
+
+def test_sort_images_none_keeps_order():
+    paths = [pathlib.Path("b.png"), pathlib.Path("a.png")]
+    assert list(sort_images(iter(paths))) == paths
+
+
+def test_sort_images_natural():
+    paths = [pathlib.Path(f"dir{index % 3}/image{index}.png") for index in range(30)]
+    random.Random(0).shuffle(paths)
+    expected = [
+        pathlib.Path(f"dir{index % 3}/image{index}.png") for index in sorted(range(30), key=lambda i: (i % 3, i))
+    ]
+    assert list(sort_images(paths, order=ImageOrder.NATURAL.value)) == expected
+
+
+@pytest.mark.parametrize("order", ImageOrder.values()[1:])
+def test_sort_images_external_sort(order, tmp_path):
+    """The sorted chunks merged from the temporary files should be the same as sorting in memory."""
+    paths = []
+    for index in range(50):
+        path = tmp_path / f"image{index}.png"
+        path.write_bytes(b"0" * (index % 7))
+        # some images have the same key, so the stability of the merge is checked.
+        os.utime(path, ns=(0, (index % 5) * 1_000_000_000))
+        paths.append(path)
+    random.Random(1).shuffle(paths)
+
+    in_memory = list(sort_images(paths, order=order))
+    assert sorted(in_memory) == sorted(paths)
+    for chunk_size in [1, 3, 50, 51]:
+        assert list(sort_images(iter(paths), order=order, chunk_size=chunk_size)) == in_memory
+
+
+def test_sort_images_mtime_and_size(tmp_path):
+    for name, size, mtime in [("a.png", 3, 30), ("b.png", 1, 10), ("c.png", 2, 20), ("d.png", 2, 10)]:
+        (tmp_path / name).write_bytes(b"0" * size)
+        os.utime(tmp_path / name, (mtime, mtime))
+    paths = sorted(tmp_path.iterdir())
+
+    by_mtime = list(sort_images(paths, order=ImageOrder.MTIME.value, chunk_size=2))
+    by_size = list(sort_images(paths, order=ImageOrder.SIZE.value, chunk_size=2))
+    # the images with the same key are in the natural order.
+    assert [p.name for p in by_mtime] == ["b.png", "d.png", "c.png", "a.png"]
+    assert [p.name for p in by_size] == ["b.png", "c.png", "d.png", "a.png"]
+
+
+def test_sort_images_manifest_entries(tmp_path):
+    entries = [
+        ManifestEntry(path=tmp_path / "image10.png", new_name="first"),
+        ManifestEntry(path=tmp_path / "image2.png", new_name=None),
+    ]
+    for chunk_size in [1, 10]:
+        assert list(sort_images(entries, order=ImageOrder.NATURAL.value, chunk_size=chunk_size)) == [
+            pathlib.Path(tmp_path / "image2.png"),
+            ManifestEntry(path=tmp_path / "image10.png", new_name="first"),
+        ]
+
+
+def test_capture_time_of(tmp_path):
+    exif = Image.Exif()
+    exif[306] = "2021:06:01 10:00:00"
+    Image.new("RGB", (8, 8)).save(tmp_path / "with_exif.jpg", exif=exif)
+    Image.new("RGB", (8, 8)).save(tmp_path / "without_exif.jpg")
+    (tmp_path / "broken.jpg").write_bytes(b"not an image")
+    os.utime(tmp_path / "without_exif.jpg", (0, 0))
+
+    assert capture_time_of(str(tmp_path / "with_exif.jpg")) == "2021:06:01 10:00:00"
+    # the images without the capture time fall back to the modification time.
+    epoch = time.strftime("%Y:%m:%d %H:%M:%S", time.localtime(0))
+    assert capture_time_of(str(tmp_path / "without_exif.jpg")) == epoch
+    assert capture_time_of(str(tmp_path / "broken.jpg")) > epoch
+
+    paths = [tmp_path / "broken.jpg", tmp_path / "with_exif.jpg", tmp_path / "without_exif.jpg"]
+    assert [p.name for p in sort_images(paths, order=ImageOrder.EXIF.value)] == [
+        "without_exif.jpg",
+        "with_exif.jpg",
+        "broken.jpg",
+    ]
+
+
+def test_capture_time_of_any_error(tmp_path, monkeypatch):
+    """An image which Pillow cannot read falls back to the modification time whatever the error is."""
+    Image.new("RGB", (8, 8)).save(tmp_path / "large.jpg")
+    os.utime(tmp_path / "large.jpg", (0, 0))
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 10)
+    assert capture_time_of(str(tmp_path / "large.jpg")) == time.strftime("%Y:%m:%d %H:%M:%S", time.localtime(0))
@@ -0,0 +1,102 @@
+# mypy: ignore-errors
+import os
+import random
+
+import pytest
+
+from utils import replacer
+from utils.replacer import MultiReplacer, RuleGroup, read_rules, rules_of, trie_pattern
+
+
+def test_read_rules(tmp_path):
+    (tmp_path / "rules.tsv").write_text("SKU0001\tcamera\n\nSKU0002\tlens\r\n.vol1\t\n", encoding="utf-8")
+    assert read_rules(tmp_path / "rules.tsv") == [("SKU0001", "camera"), ("SKU0002", "lens"), (".vol1", "")]
+    assert rules_of(["a", "b"], ["A"], tmp_path / "rules.tsv")[:2] == (("a", "A"), ("SKU0001", "camera"))
+
+
+@pytest.mark.parametrize("line", ["no separator", "\tno before", "too\tmany\tseparators"])
+def test_read_rules_invalid(line, tmp_path):
+    (tmp_path / "rules.tsv").write_text(f"a\tb\n{line}\n", encoding="utf-8")
+    with pytest.raises(ValueError) as excinfo:
+        read_rules(tmp_path / "rules.tsv")
+    assert excinfo.value.args[0] == f'Line 2 of "{tmp_path / "rules.tsv"}" is not "<before>\\t<after>".'
+
+
+@pytest.mark.parametrize("line", ["x\ta\0b", "a\0b\tx", "x\tdir/name", f"dir{os.sep}name\tx"])
+def test_read_rules_forbidden_chars(line, tmp_path):
+    """NUL separates the names replaced at once, so a rule with it would shift the names onto other images."""
+    (tmp_path / "rules.tsv").write_text(f"{line}\n", encoding="utf-8")
+    with pytest.raises(ValueError) as excinfo:
+        read_rules(tmp_path / "rules.tsv")
+    assert (
+        excinfo.value.args[0] == f'Line 1 of "{tmp_path / "rules.tsv"}" contains a NUL character or a path separator.'
+    )
+
+
+def test_rules_of_reads_file_once(tmp_path, monkeypatch):
+    (tmp_path / "rules.tsv").write_text("a\tb\n", encoding="utf-8")
+    calls = []
+    monkeypatch.setattr(replacer, "read_rules", lambda path: calls.append(path) or [("a", "b")])
+    for _ in range(3):
+        assert rules_of(["x"], ["y"], tmp_path / "rules.tsv") == (("x", "y"), ("a", "b"))
+    assert calls == [str(tmp_path / "rules.tsv")]
+
+
+@pytest.mark.parametrize(
+    "word, other, expected",
+    [
+        ("ab", "bc", True),
+        ("bc", "ab", True),
+        ("abc", "b", True),
+        ("b", "abc", True),
+        ("ab", "cd", False),
+        ("a", "", True),
+    ],
+)
+def test_rule_group_can_overlap(word, other, expected):
+    group = RuleGroup()
+    group.add(other, "Z")
+    assert group.can_overlap(word) is expected
+
+
+def test_trie_pattern():
+    assert trie_pattern(["cat", "car", "cart"]) == "ca(?:r(?:t)?|t)"
+    assert trie_pattern(["a.b", "a*"]) == r"a(?:\*|\.b)"
+
+
+def test_successive_is_the_same_as_str_replace():
+    """The rules which can affect each other are applied one after another."""
+    sequence = random.Random(0)
+    for _ in range(2000):
+        rules = [
+            (
+                "".join(sequence.choices("abc", k=sequence.randint(0, 3))),
+                "".join(sequence.choices("abcd", k=sequence.randint(0, 3))),
+            )
+            for _ in range(sequence.randint(1, 6))
+        ]
+        text = "".join(sequence.choices("abcd\0", k=sequence.randint(0, 20)))
+        expected = text
+        for before, after in rules:
+            expected = expected.replace(before, after)
+        assert MultiReplacer(rules).replace(text) == expected, (rules, text)
+
+
+def test_catalog_rules_are_applied_in_one_pass():
+    rules = [(f"SKU{number:05d}", f"product-{number}") for number in range(200)]
+    replacer = MultiReplacer(rules)
+    assert len(replacer) == 1
+    assert replacer.replace("SKU00007_SKU00199_front") == "product-7_product-199_front"
+
+
+def test_simultaneous():
+    replacer = MultiReplacer([("a", "b"), ("b", "c"), ("ab", "X"), ("a", "Y"), ("", "Z")], mode="simultaneous")
+    assert len(replacer) == 1
+    # the longest word wins at a position, and the first rule of the same word wins.
+    assert replacer.replace("abab_a_b") == "XX_b_c"
+
+
+def test_of_is_cached():
+    rules = (("a", "b"),)
+    assert MultiReplacer.of(rules) is MultiReplacer.of(rules)
+    assert MultiReplacer.of(rules) is not MultiReplacer.of(rules, mode="simultaneous")
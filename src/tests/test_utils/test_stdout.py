@@ -1,4 +1,12 @@
-from utils.stdout import Bcolors, stdout_exception_message
+import io
+
+from utils.stdout import (
+    Bcolors,
+    Reporter,
+    Verbosity,
+    reporter,
+    stdout_exception_message,
+)
 from utils.tests import get_styled_stdout_string
 from utils.with_statements import stdout_to_text
 
@@ -11,4 +19,61 @@ def test_stdout_exception_message(temp_dir_path, temp_text_file):
     except ValueError as e:
         with stdout_to_text(text_file_path=_temp_text):
             stdout_exception_message(e)
-        assert _temp_text.read_text() == get_styled_stdout_string(style=Bcolors.FAIL.value, sentence=exception_message)
+        # no colors in a file.
+        assert _temp_text.read_text() == f"{exception_message}\n"
+
+
+def test_stdout_exception_message_colored(monkeypatch, capsys):
+    monkeypatch.setattr(reporter, "color", True)
+    monkeypatch.setattr(reporter, "verbosity", Verbosity.QUIET)
+    stdout_exception_message(ValueError("raise!!"))
+    assert capsys.readouterr().out == get_styled_stdout_string(style=Bcolors.FAIL.value, sentence="raise!!")
+
+
+def test_reporter_buffer():
+    stream = io.StringIO()
+    reporter = Reporter(buffer_lines=3, stream=stream)
+    reporter.report(Bcolors.OKGREEN.value, "1")
+    reporter.report(Bcolors.OKGREEN.value, "2")
+    assert stream.getvalue() == ""
+    reporter.report(Bcolors.OKGREEN.value, "3")
+    assert stream.getvalue() == "1\n2\n3\n"
+    reporter.report(Bcolors.OKGREEN.value, "4")
+    reporter.flush()
+    assert stream.getvalue() == "1\n2\n3\n4\n"
+
+
+def test_reporter_color():
+    # colors are disabled because StringIO is not a terminal.
+    stream = io.StringIO()
+    reporter = Reporter(stream=stream)
+    assert reporter.is_colored is False
+    reporter.warning("warning")
+    assert stream.getvalue() == "warning\n"
+
+    reporter.configure(color=True)
+    reporter.warning("warning")
+    assert stream.getvalue() == "warning\n" + get_styled_stdout_string(style=Bcolors.WARNING.value, sentence="warning")
+    assert reporter.warnings == 2
+
+
+def test_reporter_verbosity():
+    stream = io.StringIO()
+    reporter = Reporter(verbosity=Verbosity.QUIET, stream=stream)
+    reporter.report(Bcolors.OKGREEN.value, "normal")
+    reporter.report(Bcolors.OKGREEN.value, "progress", verbosity=Verbosity.PROGRESS)
+    reporter.error("error")
+    assert stream.getvalue() == "error\n"
+
+    stream = io.StringIO()
+    reporter = Reporter(verbosity=Verbosity.PROGRESS, stream=stream)
+    reporter.start(total=2)
+    reporter.report(Bcolors.OKGREEN.value, "normal")
+    reporter.advance()
+    reporter.advance()
+    reporter.summary(task_name="Task")
+    lines = stream.getvalue().splitlines()
+    assert "normal" not in lines
+    assert lines[0].startswith("1/2 files")
+    assert lines[-2].startswith("2/2 files")
+    assert lines[-1].startswith("Task: 2 files in ")
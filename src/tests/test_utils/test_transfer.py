@@ -0,0 +1,47 @@
+# mypy: ignore-errors
+import os
+import pathlib
+
+import pytest
+
+from utils import transfer as transfer_module
+from utils.transfer import LinkMode, transfer
+
+
+@pytest.mark.parametrize("mode", LinkMode.values())
+def test_transfer(mode, temp_dir_path, temp_image_file, temp_dest_path):
+    _src: pathlib.Path = temp_image_file(image_path="src.png", temp_dir_path=temp_dir_path())
+    _dst: pathlib.Path = temp_dest_path() / "dst.png"
+
+    used_mode = transfer(src=_src, dst=_dst, mode=mode)
+
+    # the original image is kept.
+    assert _src.exists() is True
+    assert _dst.read_bytes() == _src.read_bytes()
+    assert os.stat(_dst).st_mtime_ns == os.stat(_src).st_mtime_ns
+    if used_mode is LinkMode.HARDLINK:
+        assert _dst.samefile(_src) is True
+    else:
+        assert _dst.samefile(_src) is False
+    assert LinkMode.values().index(used_mode.value) >= LinkMode.values().index(mode)
+
+
+def test_transfer_overwrites_existing_file(temp_dir_path, temp_image_file, temp_text_file, temp_dest_path):
+    _src: pathlib.Path = temp_image_file(image_path="src.png", temp_dir_path=temp_dir_path())
+    _dst: pathlib.Path = temp_text_file(temp_dest_path(), text_name="dst.png")
+
+    for mode in LinkMode.values():
+        transfer(src=_src, dst=_dst, mode=mode)
+        assert _dst.read_bytes() == _src.read_bytes()
+
+
+def test_transfer_short_copy_falls_back(temp_dir_path, temp_image_file, temp_dest_path, monkeypatch):
+    """A clone truncated by copy_file_range is not reported as a reflink."""
+    _src: pathlib.Path = temp_image_file(image_path="src.png", temp_dir_path=temp_dir_path())
+    _dst: pathlib.Path = temp_dest_path() / "dst.png"
+    monkeypatch.setattr(transfer_module, "fcntl", None)
+    _sent = iter([10])
+    monkeypatch.setattr(os, "copy_file_range", lambda *args: next(_sent, 0), raising=False)
+
+    assert transfer(src=_src, dst=_dst, mode=LinkMode.REFLINK) is LinkMode.COPY
+    assert _dst.read_bytes() == _src.read_bytes()
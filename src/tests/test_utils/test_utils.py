@@ -1,4 +1,5 @@
 # mypy: ignore-errors
+import os
 import pathlib
 from re import Pattern
 
@@ -8,7 +9,11 @@ from utils import (
     VALID_EXTENSIONS,
     compile_extension_pattern_from,
     get_image_paths_from_within,
+    scan_file_paths_sharded,
+    scan_files_within,
+    shards_of,
 )
+from utils.stdout import Verbosity, reporter
 
 
 def test_create_valid_extension_pattern_from():
@@ -48,3 +53,93 @@ def test_get_image_paths_from_within(
     with pytest.raises(ValueError) as excinfo:
         get_image_paths_from_within(dir_path=valid_ext_image_png, valid_extensions=VALID_EXTENSIONS)
     assert f'"{valid_ext_image_png}" is not a directory. Please specify a directory path.' == excinfo.value.args[0]
+
+
+def test_scan_files_within(temp_dir_path, temp_image_file, temp_text_file):
+    _temp_dir_path: pathlib.Path = temp_dir_path()
+    for image_path in ["b.png", "a.png", "dir1/c.png", "dir1/dir2/d.png", "dir1/dir2/e.png", "dir3/f.png"]:
+        temp_image_file(image_path=image_path, temp_dir_path=_temp_dir_path)
+    temp_text_file(_temp_dir_path / "dir1")
+    (_temp_dir_path / "empty").mkdir()
+
+    # the same files in the same order as Path.glob
+    expected = [str(p) for p in _temp_dir_path.glob("**/*") if not p.is_dir()]
+    assert [entry.path for entry in scan_files_within(dir_path=_temp_dir_path)] == expected
+    assert len(expected) == 7
+
+    paths = get_image_paths_from_within(dir_path=str(_temp_dir_path), valid_extensions=VALID_EXTENSIONS)
+    assert [str(p) for p in paths] == [p for p in expected if p.endswith(".png")]
+
+
+@pytest.mark.parametrize("depth", [1, 2, 3])
+def test_scan_file_paths_sharded(depth, temp_dir_path, temp_image_file, temp_text_file):
+    _temp_dir_path: pathlib.Path = temp_dir_path()
+    for index in range(30):
+        temp_image_file(image_path=f"dir{index % 4}/sub{index % 3}/image{index}.png", temp_dir_path=_temp_dir_path)
+    for image_path in ["root.png", "dir1/direct.png", "dir2/sub0/deep/deeper/deepest.png"]:
+        temp_image_file(image_path=image_path, temp_dir_path=_temp_dir_path)
+    temp_text_file(_temp_dir_path / "dir3")
+    (_temp_dir_path / "empty").mkdir()
+
+    # the shards are merged in the order of the sequential walk.
+    expected = [entry.path for entry in scan_files_within(dir_path=_temp_dir_path)]
+    assert list(scan_file_paths_sharded(dir_path=_temp_dir_path, workers=2, depth=depth)) == expected
+    assert len(expected) == 34
+
+    shards = list(shards_of(str(_temp_dir_path), depth=depth))
+    assert shards[0] == (None, [str(_temp_dir_path / "root.png")])
+    assert len([dir_path for dir_path, _ in shards if dir_path is not None]) == {1: 5, 2: 12, 3: 1}[depth]
+
+    paths = get_image_paths_from_within(dir_path=str(_temp_dir_path), valid_extensions=VALID_EXTENSIONS, workers=2)
+    assert [str(p) for p in paths] == [p for p in expected if p.endswith(".png")]
+
+
+def test_shards_of_single_folder(temp_dir_path, temp_image_file):
+    """A tree with all the images in a single folder is split deeper until there are enough shards."""
+    _temp_dir_path: pathlib.Path = temp_dir_path()
+    for index in range(30):
+        temp_image_file(image_path=f"photos/2023/month{index % 10}/image{index}.png", temp_dir_path=_temp_dir_path)
+    temp_image_file(image_path="photos/cover.png", temp_dir_path=_temp_dir_path)
+
+    assert list(shards_of(str(_temp_dir_path))) == [(str(_temp_dir_path / "photos"), [])]
+    shards = list(shards_of(str(_temp_dir_path), min_shards=8))
+    assert shards[0] == (None, [str(_temp_dir_path / "photos" / "cover.png")])
+    assert sorted(dir_path for dir_path, _ in shards[1:]) == [
+        str(_temp_dir_path / "photos" / "2023" / f"month{index}") for index in range(10)
+    ]
+    # a tree with fewer directories than min_shards is listed entirely.
+    shards = list(shards_of(str(_temp_dir_path), min_shards=100))
+    assert len(shards) == 11
+    assert all(dir_path is None for dir_path, _ in shards)
+
+    expected = [entry.path for entry in scan_files_within(dir_path=_temp_dir_path)]
+    assert list(scan_file_paths_sharded(dir_path=_temp_dir_path, workers=2)) == expected
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("unreadable", ["dir0", "dir1/sub"])
+def test_scan_unreadable_directories(workers, unreadable, temp_dir_path, temp_image_file, monkeypatch, capsys):
+    """The directories which cannot be read are skipped with a warning as Path.glob skips them."""
+    _temp_dir_path: pathlib.Path = temp_dir_path()
+    for image_path in ["root.png", "dir0/a.png", "dir1/b.png", "dir1/sub/c.png", "dir2/d.png"]:
+        temp_image_file(image_path=image_path, temp_dir_path=_temp_dir_path)
+    _scandir = os.scandir
+
+    def scandir(path):
+        if path == str(_temp_dir_path / unreadable):
+            raise PermissionError(13, "Permission denied", path)
+        return _scandir(path)
+
+    monkeypatch.setattr(os, "scandir", scandir)
+    monkeypatch.setattr(reporter, "verbosity", Verbosity.NORMAL)
+    warnings = reporter.warnings
+
+    paths = get_image_paths_from_within(
+        dir_path=str(_temp_dir_path), valid_extensions=VALID_EXTENSIONS, workers=workers
+    )
+    assert [p.relative_to(_temp_dir_path).as_posix() for p in paths] == [
+        p for p in ["root.png", "dir0/a.png", "dir1/b.png", "dir1/sub/c.png", "dir2/d.png"] if unreadable not in p
+    ]
+    assert reporter.warnings == warnings + 1
+    reporter.flush()
+    assert f"'{_temp_dir_path / unreadable}' cannot be read and is skipped." in capsys.readouterr().out
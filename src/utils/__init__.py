@@ -1,19 +1,45 @@
 import datetime
+import itertools
 import os
 import pathlib
 import platform
 import re
-import tempfile
-from typing import Iterator, List, Optional, Pattern, Union
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from utils.constants import VALID_EXTENSIONS
-from utils.stdout import Bcolors, styled_stdout
+from utils.executor import execute_in_processes
+from utils.extension import ExtensionIndex
+from utils.stdout import Bcolors, reporter, styled_stdout
 
+T = TypeVar("T")
 
-def get_image_paths_from_within(dir_path: str, valid_extensions: List[str]) -> Iterator[pathlib.Path]:
+# The directories down to this depth are listed while the shards are made,
+# and the directories below are walked by the workers.
+SHARD_DEPTH = 1
+
+# The directories are split deeper until there are this many shards for each worker,
+# so the workers are kept busy when most of the images are in a few folders.
+SHARDS_PER_WORKER = 4
+
+# A directory to walk, or None, and the files listed while making the shards.
+Shard = Tuple[Optional[str], List[str]]
+
+
+def get_image_paths_from_within(dir_path: str, valid_extensions: List[str], workers: int = 1) -> Iterator[pathlib.Path]:
     """
     >>> get_image_paths_from_within(dir_path='/Users/macbook')
     ['/User/macbook/a.jpg', '/User/macbook/b.jpg', '/User/macbook/c.jpg']
+    :param workers: the number of processes walking the subdirectories. see scan_file_paths_sharded
     :return: list
     """
 
@@ -23,33 +49,165 @@ def get_image_paths_from_within(dir_path: str, valid_extensions: List[str]) -> I
 
     if not dir_p.is_dir():
         raise ValueError(f'"{dir_path}" is not a directory. Please specify a directory path.')
-    ext_pattern: Pattern = compile_extension_pattern_from(valid_extensions=valid_extensions)
-    g = image_paths_of_valid_extension_generator(dir_path=dir_p, pattern=ext_pattern)
+    extension_index = ExtensionIndex.of(valid_extensions)
+    g = image_paths_of_valid_extension_generator(dir_path=dir_p, extension_index=extension_index, workers=workers)
 
+    # The directory is walked only once.
+    # The first image taken to check that the directory is not empty is put back to the stream.
     try:
-        g.__next__()
+        first_image_path = g.__next__()
     except StopIteration:
         raise ValueError(f'No images within "{dir_path}".')
 
-    return image_paths_of_valid_extension_generator(dir_path=dir_p, pattern=ext_pattern)
+    return itertools.chain([first_image_path], g)
 
 
 def compile_extension_pattern_from(valid_extensions: List[str] = VALID_EXTENSIONS) -> Pattern:
+    """Use ExtensionIndex to find images. This pattern is kept for compatibility,
+    but it is slow for long paths and the unescaped dots match any character.
+    """
     return re.compile(r".*(" + "|".join(valid_extensions) + ")$")  # => /*(.jpg|.jpeg|.png)$
 
 
+def unreadable_message_of(error: OSError) -> str:
+    return f"'{error.filename}' cannot be read and is skipped. {error.strerror}"
+
+
+def warn_unreadable(error: OSError) -> None:
+    reporter.warning(unreadable_message_of(error))
+
+
+def scan_files_within(
+    dir_path: Union[str, pathlib.Path], on_error: Callable[[OSError], None] = warn_unreadable
+) -> Iterator[os.DirEntry]:
+    """Walk the directory recursively with os.scandir and yield the files.
+    The file type of the DirEntry is cached from the directory listing,
+    so no extra stat is needed for each entry.
+    The order is the same as pathlib.Path.glob("**/*"),
+    the files in a directory come first and then the subdirectories are walked depth-first.
+    Symbolic links to directories are not followed.
+    The directories which cannot be read or have vanished are skipped and passed to on_error, as glob skips them.
+    """
+    dir_paths: List[str] = [str(dir_path)]
+    while dir_paths:
+        sub_dir_paths: List[str] = []
+        try:
+            with os.scandir(dir_paths.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            sub_dir_paths.append(entry.path)
+                        continue
+                    yield entry
+        except OSError as error:
+            on_error(error)
+        dir_paths.extend(reversed(sub_dir_paths))
+
+
+def list_directory(dir_path: str) -> Tuple[List[str], List[str]]:
+    """The paths of the files and the subdirectories directly in the directory."""
+    file_paths: List[str] = []
+    sub_dir_paths: List[str] = []
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        sub_dir_paths.append(entry.path)
+                    continue
+                file_paths.append(entry.path)
+    except OSError as error:
+        warn_unreadable(error)
+    return file_paths, sub_dir_paths
+
+
+def shards_of(dir_path: str, depth: int = SHARD_DEPTH, min_shards: int = 1) -> Iterator[Shard]:
+    """Split the tree into the subdirectories at the depth, in the order scan_files_within walks them.
+    The files of the directories above the depth are listed here.
+    While there are fewer than min_shards subdirectories, they are split a level deeper,
+    so a tree with all the images in a single folder is still split among the workers.
+    """
+    shards: List[Shard] = [(dir_path, [])]
+    level = 0
+    while True:
+        dir_count = sum(1 for shard_dir_path, _ in shards if shard_dir_path is not None)
+        if dir_count == 0 or (level >= depth and dir_count >= min_shards):
+            break
+        split: List[Shard] = []
+        for shard_dir_path, file_paths in shards:
+            if shard_dir_path is None:
+                split.append((None, file_paths))
+                continue
+            listed_file_paths, sub_dir_paths = list_directory(shard_dir_path)
+            if listed_file_paths:
+                split.append((None, listed_file_paths))
+            split.extend((sub_dir_path, []) for sub_dir_path in sub_dir_paths)
+        shards = split
+        level += 1
+    yield from shards
+
+
+def scan_shard(shard: Shard) -> Tuple[List[str], List[str]]:
+    """The paths of the files of the shard and the warnings of the directories not read.
+    It is called in a worker process, so the warnings are reported by the main process.
+    """
+    dir_path, file_paths = shard
+    warnings: List[str] = []
+    if dir_path is not None:
+        file_paths = file_paths + [
+            entry.path
+            for entry in scan_files_within(
+                dir_path, on_error=lambda error: warnings.append(unreadable_message_of(error))
+            )
+        ]
+    return file_paths, warnings
+
+
+def scan_file_paths_sharded(
+    dir_path: Union[str, pathlib.Path], workers: int = 1, depth: int = SHARD_DEPTH
+) -> Iterator[str]:
+    """Walk the subdirectories of the tree concurrently in worker processes and yield the paths of the files.
+    A single walker cannot saturate the metadata throughput of a parallel filesystem,
+    so the subdirectories at the depth, or deeper until there are SHARDS_PER_WORKER shards for each worker,
+    are walked as shards by the workers.
+    The shards are merged in the order of the tree, so the paths are yielded in the same order
+    as scan_files_within and the serial numbers of the images do not depend on the number of workers.
+    """
+    for file_paths, warnings in execute_in_processes(
+        func=scan_shard,
+        items=shards_of(str(dir_path), depth=depth, min_shards=workers * SHARDS_PER_WORKER),
+        workers=workers,
+    ):
+        for warning in warnings:
+            reporter.warning(warning)
+        yield from file_paths
+
+
 def image_paths_of_valid_extension_generator(
-    dir_path: Union[str, pathlib.Path], pattern: Pattern
+    dir_path: Union[str, pathlib.Path], extension_index: ExtensionIndex, workers: int = 1
 ) -> Iterator[pathlib.Path]:
-    if type(dir_path) is str:
-        dir_path: pathlib.Path = pathlib.Path(dir_path)  # type: ignore
-
-    for p in dir_path.glob("**/*"):  # type:ignore
-        p_string = str(p)
-        if not pattern.search(p_string) and not p.is_dir():
-            styled_stdout(Bcolors.WARNING.value, f"'{p_string}' is invalid extension.")  # type: ignore
+    if workers > 1:
+        file_paths: Iterator[str] = scan_file_paths_sharded(dir_path=dir_path, workers=workers)
+    else:
+        file_paths = (entry.path for entry in scan_files_within(dir_path=dir_path))
+    for file_path in file_paths:
+        if not extension_index.match(os.path.basename(file_path)):
+            reporter.warning(f"'{file_path}' is invalid extension.")
             continue
-        yield p
+        yield pathlib.Path(file_path)
+
+
+def iter_batches(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    >>> list(iter_batches(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
 
 
 def datetime2str(dt: Optional[datetime.datetime] = None):
@@ -65,6 +223,18 @@ def get_dest_dir_name(dir_path: pathlib.Path, now_str: str) -> str:
     return f"{dir_path.parts[-1]}_{now_str}"
 
 
+def get_now_str_from(dest_dir_name: str, dir_path: pathlib.Path) -> str:
+    """Get the datetime string from the name of the directory where the converted images were output.
+    >>> get_now_str_from("images_2023-01-01_00-00-00", pathlib.Path("/Users/macbook/images"))
+    '2023-01-01_00-00-00'
+    """
+    prefix = get_dest_dir_name(dir_path=dir_path, now_str="")
+    now_str = dest_dir_name[len(prefix) :]
+    if not dest_dir_name.startswith(prefix) or not now_str:
+        raise ValueError(f'"{dest_dir_name}" is not a directory where the images in "{dir_path}" were output.')
+    return now_str
+
+
 def get_user() -> str:
     """Return the current user name, or default value if getuser() does not work
     in the current environment (see #1010)."""
@@ -78,6 +248,8 @@ def get_user() -> str:
 
 
 def get_temp_root_path() -> pathlib.Path:
+    import tempfile
+
     from_env = os.environ.get("PYTEST_DEBUG_TEMPROOT")
     temp_root = pathlib.Path(from_env or tempfile.gettempdir()).resolve()
     user = get_user()
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import pathlib
+from typing import TYPE_CHECKING, Optional, Union
+
+if TYPE_CHECKING:
+    import sqlite3
+
+# The size of the chunks read to compute the content hash.
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash_of(path: Union[str, pathlib.Path]) -> str:
+    """A fast hash of the content of the file."""
+    file_hash = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+class ProcessingCache:
+    """An on-disk cache of the images output by the previous tasks, shared by the tasks outputting to a directory.
+
+    A source image is unchanged if its size and mtime_ns are the same as when it was output,
+    or, with content hashes, if its content is the same,
+    and it was output to the same target with the same options.
+    The unchanged images are not output again, so rerunning a task over a large library only touches
+    the new or modified images.
+
+    .ic_cache.sqlite3 in the destination root
+    task | options | source | size | mtime_ns | content_hash | target | output
+    """
+
+    FILE_NAME = ".ic_cache.sqlite3"
+
+    # The records are committed every this number of records.
+    COMMIT_INTERVAL = 1000
+
+    def __init__(
+        self,
+        dest_path: Union[str, pathlib.Path],
+        task_name: str,
+        options: dict,
+        use_content_hash: bool = False,
+    ):
+        """
+        :param dest_path: the directory containing the timestamped destination directories.
+        :param options: the options changing the output. An image output with other options is output again.
+        """
+        self.dest_path = pathlib.Path(dest_path)
+        self.task_name = task_name
+        self.options_key = hashlib.sha1(json.dumps(options, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        self.use_content_hash = use_content_hash
+        self.connection: Optional["sqlite3.Connection"] = None
+        self.uncommitted = 0
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self.dest_path / self.FILE_NAME
+
+    def open(self) -> "ProcessingCache":
+        # sqlite3 is imported only with --incremental, since it takes a large part of the startup time.
+        import sqlite3
+
+        self.dest_path.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS outputs ("
+            "task TEXT, options TEXT, source TEXT, size INTEGER, mtime_ns INTEGER, content_hash TEXT, "
+            "target TEXT, output TEXT, PRIMARY KEY (task, options, source))"
+        )
+        return self
+
+    def lookup(self, source: Union[str, pathlib.Path], target: str) -> Optional[str]:
+        """Return the path of the output if the source is unchanged since it was output to the target.
+        :param target: the path of the output relative to the timestamped destination directory.
+        """
+        source = str(source)
+        row = self.connection.execute(  # type: ignore
+            "SELECT size, mtime_ns, content_hash, target, output FROM outputs "
+            "WHERE task = ? AND options = ? AND source = ?",
+            (self.task_name, self.options_key, source),
+        ).fetchone()
+        if row is None:
+            return None
+        size, mtime_ns, content_hash, cached_target, output = row
+        if cached_target != target or not os.path.exists(output):
+            return None
+
+        stat = os.stat(source)
+        if (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns):
+            return output
+        if self.use_content_hash and content_hash and stat.st_size == size:
+            if content_hash_of(source) == content_hash:
+                # touched or copied, but not modified.
+                self._execute(
+                    "UPDATE outputs SET mtime_ns = ? WHERE task = ? AND options = ? AND source = ?",
+                    (stat.st_mtime_ns, self.task_name, self.options_key, source),
+                )
+                return output
+        return None
+
+    def record(self, source: Union[str, pathlib.Path], target: str, output: Union[str, pathlib.Path]) -> None:
+        source = str(source)
+        stat = os.stat(source)
+        content_hash = content_hash_of(source) if self.use_content_hash else None
+        self._execute(
+            "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.task_name,
+                self.options_key,
+                source,
+                stat.st_size,
+                stat.st_mtime_ns,
+                content_hash,
+                target,
+                str(output),
+            ),
+        )
+
+    def _execute(self, sql: str, parameters: tuple) -> None:
+        self.connection.execute(sql, parameters)  # type: ignore
+        self.uncommitted += 1
+        if self.uncommitted >= self.COMMIT_INTERVAL:
+            self.commit()
+
+    def commit(self) -> None:
+        self.connection.commit()  # type: ignore
+        self.uncommitted = 0
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.commit()
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self) -> "ProcessingCache":
+        return self.open()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
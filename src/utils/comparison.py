@@ -0,0 +1,122 @@
+import csv
+import enum
+import json
+import os
+import pathlib
+from typing import IO, Dict, List, Optional, Sequence, Union
+
+
+class ComparisonFormat(enum.Enum):
+    TEXT = "txt"
+    CSV = "csv"
+    JSONL = "jsonl"
+
+    @classmethod
+    def values(cls) -> List[str]:
+        return [var.value for var in cls]
+
+
+class ComparisonWriter:
+    """Write the record of the names before and after the conversion to files in the destination directory
+    each time an image is output, so the memory stays constant
+    and the record written so far is left even if the task is interrupted.
+
+    >>> with ComparisonWriter(dest_dir_path, formats=["txt", "csv"]) as writer:
+    ...     writer.write(original_path, renamed_path, comparison)
+    """
+
+    FILE_STEM = "comparison"
+    TEMP_SUFFIX = ".tmp"
+    CSV_FIELDS = ["original_name", "renamed_name", "original_path", "renamed_path"]
+
+    # The files are flushed every this number of records.
+    FLUSH_INTERVAL = 100
+
+    def __init__(
+        self,
+        dest_dir_path: Union[str, pathlib.Path],
+        formats: Sequence[str] = (ComparisonFormat.TEXT.value,),
+        file_stem: str = FILE_STEM,
+        replace: bool = False,
+    ):
+        """
+        :param replace: the records are written to temporary files, which replace the files when the writer is closed
+            without an error. The files of the interrupted task are kept if the resumed task fails.
+        """
+        self.dest_dir_path = pathlib.Path(dest_dir_path)
+        self.formats = [ComparisonFormat(f) for f in dict.fromkeys(formats)]
+        self.file_stem = file_stem
+        self.replace = replace
+        self.files: Dict[ComparisonFormat, IO[str]] = {}
+        self.csv_writer: Optional["csv.DictWriter[str]"] = None
+        self.count = 0
+
+    def file_path(self, comparison_format: ComparisonFormat) -> pathlib.Path:
+        return self.dest_dir_path / f"{self.file_stem}.{comparison_format.value}"
+
+    def writing_path(self, comparison_format: ComparisonFormat) -> pathlib.Path:
+        file_path = self.file_path(comparison_format)
+        return file_path.with_name(file_path.name + self.TEMP_SUFFIX) if self.replace else file_path
+
+    def open(self) -> "ComparisonWriter":
+        self.dest_dir_path.mkdir(exist_ok=True)
+        for comparison_format in self.formats:
+            # newline="" is required by the csv module.
+            newline = "" if comparison_format is ComparisonFormat.CSV else None
+            self.files[comparison_format] = open(
+                self.writing_path(comparison_format), "w", encoding="utf-8", newline=newline
+            )
+        if ComparisonFormat.CSV in self.files:
+            self.csv_writer = csv.DictWriter(self.files[ComparisonFormat.CSV], fieldnames=self.CSV_FIELDS)
+            self.csv_writer.writeheader()
+        return self
+
+    def write(
+        self, original_path: Union[str, pathlib.Path], renamed_path: Union[str, pathlib.Path], comparison: str
+    ) -> None:
+        """
+        :param comparison: the text written to comparison.txt
+        """
+        text_file = self.files.get(ComparisonFormat.TEXT)
+        if text_file is not None:
+            # the same text as "\n\n".join(comparisons)
+            text_file.write(f"\n\n{comparison}" if self.count else comparison)
+
+        if self.csv_writer is not None or ComparisonFormat.JSONL in self.files:
+            record = {
+                "original_name": os.path.basename(original_path),
+                "renamed_name": os.path.basename(renamed_path),
+                "original_path": str(original_path),
+                "renamed_path": str(renamed_path),
+            }
+            if self.csv_writer is not None:
+                self.csv_writer.writerow(record)
+            jsonl_file = self.files.get(ComparisonFormat.JSONL)
+            if jsonl_file is not None:
+                jsonl_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        self.count += 1
+        if self.count % self.FLUSH_INTERVAL == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        for f in self.files.values():
+            f.flush()
+
+    def close(self, completed: bool = True) -> None:
+        for comparison_format, f in self.files.items():
+            f.close()
+            if not self.replace:
+                continue
+            if completed:
+                os.replace(self.writing_path(comparison_format), self.file_path(comparison_format))
+            else:
+                os.remove(self.writing_path(comparison_format))
+        self.files = {}
+        self.csv_writer = None
+
+    def __enter__(self) -> "ComparisonWriter":
+        return self.open()
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        self.close(completed=exc_type is None)
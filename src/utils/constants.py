@@ -1,10 +1,5 @@
 import re
 
-from dotenv import load_dotenv
-
-# load env variables to os.environ from env
-load_dotenv()
-
 ANY_EXTENSION_PATTERN = re.compile(r"[\..+$]")
 VALID_EXTENSIONS = [
     ".jpg",
@@ -23,3 +18,22 @@ VALID_EXTENSIONS = [
     ".svg",
     ".svgz",
 ]
+
+REPLACEMENT_WITH_SEPARATOR_PATTERN = re.compile(r"[　\s.,_＿〜～\―\‐\˗֊\‐\‑\‒\–\⁃\⁻\₋\−\﹣\－\—\―\━\─\-\ー]")
+SEPARATOR = "_"
+
+###########################################################
+# Characters that cannot be used in file
+# windows /:*?"<>|¥
+# mac /
+# On mac, "/" cannot be used in filenames because it is a path separator.
+# finder can use "/", but if you look at the filename in a shell,
+# you will see ":".
+###########################################################
+ALTERNATIVE_UNAVAILABLE_CHAR_IN_WINDOWS = "-"
+UNAVAILABLE_CHAR_IN_WINDOWS_PATTERN = re.compile(r'[\\/:*?"<>|¥]')
+
+ALTERNATIVE_URL_ENCODED_CHAR = "X"
+URL_ENCODED_CHAR_PATTERN = re.compile(r"[^-_a-zA-Z0-9]")
+
+ZERO_PADDING_DIGIT = 3
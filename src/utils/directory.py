@@ -0,0 +1,51 @@
+import os
+import pathlib
+import posixpath
+from typing import Iterable, Set, Union
+
+
+class DirectoryCache:
+    """Create the destination directories of a task, each only once.
+
+    Many images are output to the same directory,
+    so the directories already created are remembered and no syscall is made for them.
+    It is safe to use from threads, since creating a directory twice does no harm.
+    """
+
+    def __init__(self) -> None:
+        self.created: Set[str] = set()
+
+    def make(self, dir_path: Union[str, pathlib.Path]) -> None:
+        dir_path = os.fspath(dir_path)
+        if dir_path in self.created:
+            return
+        os.makedirs(dir_path, exist_ok=True)
+        self.created.add(dir_path)
+
+    def make_skeleton(self, root_path: Union[str, pathlib.Path], relative_dirs: Iterable[str]) -> None:
+        """Create the whole directory tree under root_path in one pass before any image is output.
+        The directories are created parent-first, so each directory costs a single mkdir.
+        :param relative_dirs: posix paths relative to root_path. An empty string is root_path itself.
+        """
+        self.make(root_path)
+        root_path = os.fspath(root_path)
+
+        all_relative_dirs: Set[str] = set()
+        for relative_dir in relative_dirs:
+            # add the ancestors as well. dir1/dir2 => dir1/dir2, dir1
+            while relative_dir and relative_dir not in all_relative_dirs:
+                all_relative_dirs.add(relative_dir)
+                relative_dir = posixpath.dirname(relative_dir)
+
+        for relative_dir in sorted(all_relative_dirs, key=lambda d: (d.count("/"), d)):
+            dir_path = os.path.join(root_path, *relative_dir.split("/"))
+            if dir_path in self.created:
+                continue
+            try:
+                os.mkdir(dir_path)
+            except FileExistsError:
+                pass
+            self.created.add(dir_path)
+
+    def __len__(self) -> int:
+        return len(self.created)
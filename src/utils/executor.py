@@ -0,0 +1,76 @@
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# The number of items submitted to a worker process ahead of the item being waited for.
+IN_FLIGHT_PER_WORKER = 4
+
+
+def execute(
+    func: Callable[[T], None], items: Iterable[T], workers: int = 1, in_flight: Optional[int] = None
+) -> Iterator[T]:
+    """Call func with each item and yield the items in the original order once they are done.
+    File operations spend most of the time waiting for the filesystem,
+    so they are performed on a bounded thread pool when workers is more than 1.
+    Since the items are yielded in the original order, the result is the same as the sequential run.
+    The items are consumed lazily and at most in_flight items are submitted at once,
+    so the memory stays bounded however many items there are.
+    :param in_flight: workers * IN_FLIGHT_PER_WORKER by default.
+    """
+    if workers < 1:
+        raise ValueError(f"'workers' should be 1 or more. {workers} is passed.")
+    if in_flight is None:
+        in_flight = workers * IN_FLIGHT_PER_WORKER
+    if in_flight < 1:
+        raise ValueError(f"'in_flight' should be 1 or more. {in_flight} is passed.")
+
+    if workers == 1:
+        for item in items:
+            func(item)
+            yield item
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Tuple[T, Future]] = collections.deque()
+        for item in items:
+            pending.append((item, executor.submit(func, item)))
+            if len(pending) >= in_flight:
+                done_item, future = pending.popleft()
+                # raises the exception of the item.
+                future.result()
+                yield done_item
+        while pending:
+            done_item, future = pending.popleft()
+            future.result()
+            yield done_item
+
+
+def execute_in_processes(func: Callable[[T], R], items: Iterable[T], workers: int = 1) -> Iterator[R]:
+    """Call func with each item in worker processes and yield the results in the original order.
+    CPU-bound work such as decoding and resizing images is not sped up by threads because of the GIL,
+    so it is performed on a process pool when workers is more than 1.
+    The items are consumed lazily and at most IN_FLIGHT_PER_WORKER items a worker are submitted at once,
+    so the memory stays bounded however many items there are.
+    func and the items are pickled, so func should be a module-level function.
+    """
+    if workers < 1:
+        raise ValueError(f"'workers' should be 1 or more. {workers} is passed.")
+
+    if workers == 1:
+        for item in items:
+            yield func(item)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = collections.deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,48 @@
+import functools
+from typing import FrozenSet, Iterable, Tuple
+
+
+class ExtensionIndex:
+    """An index of valid extensions to look up the extension of a file name.
+
+    Extensions are compared case-insensitively and only the end of the file name is looked at,
+    so the cost does not depend on the length of the path or the number of extensions.
+    >>> index = ExtensionIndex([".jpg", ".png"])
+    >>> index.extension_of("photo.vol1.JPG")
+    '.JPG'
+    >>> index.extension_of("photo.txt")
+    ''
+    """
+
+    def __init__(self, valid_extensions: Iterable[str]):
+        self.extensions: FrozenSet[str] = frozenset(ext.lower() for ext in valid_extensions if ext)
+        # '.jpg' => 1, '.tar.gz' => 2
+        self.max_dot_count: int = max((ext.count(".") for ext in self.extensions), default=0)
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _of(cls, valid_extensions: Tuple[str, ...]) -> "ExtensionIndex":
+        return cls(valid_extensions)
+
+    @classmethod
+    def of(cls, valid_extensions: Iterable[str]) -> "ExtensionIndex":
+        """Return the index shared by all callers with the same extensions."""
+        return cls._of(tuple(valid_extensions))
+
+    def extension_of(self, name: str) -> str:
+        """Return the longest valid extension at the end of the name in its original case,
+        or an empty string. As with pathlib, a leading dot is not an extension.
+        """
+        lower_name = name.lower()
+        extension = ""
+        dot_index = len(name)
+        for _ in range(self.max_dot_count):
+            dot_index = lower_name.rfind(".", 0, dot_index)
+            if dot_index <= 0:
+                break
+            if lower_name[dot_index:] in self.extensions:
+                extension = name[dot_index:]
+        return extension
+
+    def match(self, name: str) -> bool:
+        return bool(self.extension_of(name))
@@ -0,0 +1,121 @@
+import json
+import os
+import pathlib
+from typing import IO, Dict, Optional, Set, Tuple, Union
+
+
+class Journal:
+    """A write-ahead journal of the file operations of a task.
+
+    All planned operations are written and synced to the disk before any image is output,
+    and each operation is marked as done once the image is output.
+    When the task is interrupted, the task can be resumed from the journal
+    and the images already output are skipped.
+
+    journal.jsonl
+    {"op": "plan", "serial": 1, "src": "/images/a.png", "dst": "/dest/images_2023-01-01_00-00-00/a.png"}
+    {"op": "done", "serial": 1}
+    """
+
+    FILE_NAME = "journal.jsonl"
+
+    # Done records are flushed every this number of records.
+    # If the task is interrupted, at most this number of images are output again when resuming.
+    FLUSH_INTERVAL = 100
+
+    def __init__(self, dir_path: Union[str, pathlib.Path]):
+        self.dir_path = pathlib.Path(dir_path)
+        self.planned: Dict[int, Tuple[str, str]] = {}
+        self.completed: Set[int] = set()
+        self.file: Optional[IO[str]] = None
+        self.unflushed = 0
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self.dir_path / self.FILE_NAME
+
+    def load(self) -> "Journal":
+        """Read the journal of the interrupted task.
+        The loaded operations are not written again.
+        A record partially written when the task was interrupted is ignored.
+        """
+        if not self.path.is_file():
+            raise ValueError(f'No journal in "{self.dir_path}". The task cannot be resumed.')
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record["op"] == "plan":
+                    self.planned[record["serial"]] = (record["src"], record["dst"])
+                elif record["op"] == "done":
+                    self.completed.add(record["serial"])
+        return self
+
+    def open(self) -> "Journal":
+        self.dir_path.mkdir(exist_ok=True)
+        is_partially_written = self._is_partially_written()
+        self.file = open(self.path, "a", encoding="utf-8")
+        if is_partially_written:
+            # start a new line after the record partially written when the task was interrupted.
+            self.file.write("\n")
+        return self
+
+    def _is_partially_written(self) -> bool:
+        if not self.path.is_file() or self.path.stat().st_size == 0:
+            return False
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def _write(self, record: dict) -> None:
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")  # type: ignore
+
+    def plan(self, serial: int, src: Union[str, pathlib.Path], dst: Union[str, pathlib.Path]) -> None:
+        """Record a planned operation.
+        An operation already planned in the loaded journal must be the same one.
+        """
+        src, dst = str(src), str(dst)
+        if serial in self.planned:
+            self.check(serial=serial, src=src, dst=dst)
+            return
+        self.planned[serial] = (src, dst)
+        self._write({"op": "plan", "serial": serial, "src": src, "dst": dst})
+
+    def check(self, serial: int, src: Union[str, pathlib.Path], dst: Union[str, pathlib.Path]) -> None:
+        """An operation planned in the loaded journal must be the same one. Nothing is written."""
+        src, dst = str(src), str(dst)
+        if serial in self.planned and self.planned[serial] != (src, dst):
+            raise ValueError(
+                f'"{src} => {dst}" differs from "{" => ".join(self.planned[serial])}" in the journal. '
+                f"The images or the options have changed since the task was interrupted."
+            )
+
+    def sync(self) -> None:
+        """Write the planned operations to the disk before any image is output."""
+        self.file.flush()  # type: ignore
+        os.fsync(self.file.fileno())  # type: ignore
+        self.unflushed = 0
+
+    def complete(self, serial: int) -> None:
+        self.completed.add(serial)
+        self._write({"op": "done", "serial": serial})
+        self.unflushed += 1
+        if self.unflushed >= self.FLUSH_INTERVAL:
+            self.file.flush()  # type: ignore
+            self.unflushed = 0
+
+    def is_completed(self, serial: int) -> bool:
+        return serial in self.completed
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self) -> "Journal":
+        return self.open()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
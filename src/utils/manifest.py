@@ -0,0 +1,115 @@
+import enum
+import os
+import pathlib
+import sys
+from typing import IO, Iterator, List, NamedTuple, Optional, Union
+
+from utils.extension import ExtensionIndex
+from utils.stdout import reporter
+
+# The size of the chunks read from the manifest.
+READ_CHUNK_SIZE = 64 * 1024
+
+# The path and the new name of an image are separated by this character in a record.
+NEW_NAME_SEPARATOR = "\t"
+
+# The manifest is read from the standard input when this is passed as the path.
+STDIN = "-"
+
+
+class ManifestDelimiter(enum.Enum):
+    NEWLINE = "newline"
+    # as find -print0, which allows any character but NUL in the paths.
+    NUL = "nul"
+
+    @classmethod
+    def values(cls) -> List[str]:
+        return [var.value for var in cls]
+
+    @property
+    def char(self) -> str:
+        return "\0" if self is ManifestDelimiter.NUL else "\n"
+
+
+class ManifestEntry(NamedTuple):
+    path: pathlib.Path
+    # the name the image is output with instead of the converted name.
+    new_name: Optional[str] = None
+
+
+def read_records(stream: IO[str], delimiter: str = "\n") -> Iterator[str]:
+    """Read the records from the stream lazily in chunks, so the whole stream is never held as one string
+    and the new names are planned while the upstream writes the records.
+    No image is output before the end of the stream, since the whole plan is journaled first. see apply_plan
+    >>> list(read_records(io.StringIO("a.png\\0b.png\\0"), delimiter="\\0"))
+    ['a.png', 'b.png']
+    """
+    rest = ""
+    for chunk in iter(lambda: stream.read(READ_CHUNK_SIZE), ""):
+        records = (rest + chunk).split(delimiter)
+        rest = records.pop()
+        yield from records
+    if rest:
+        yield rest
+
+
+def parse_record(record: str, delimiter: str = "\n") -> Optional[ManifestEntry]:
+    """
+    >>> parse_record("dir/a.png\\tb.png")
+    ManifestEntry(path=PosixPath('dir/a.png'), new_name='b.png')
+    """
+    if delimiter == "\n":
+        record = record.rstrip("\r")
+    if not record.strip():
+        return None
+    path, separator, new_name = record.partition(NEW_NAME_SEPARATOR)
+    return ManifestEntry(path=pathlib.Path(path), new_name=new_name if separator else None)
+
+
+def manifest_entries_from(
+    manifest: Union[str, pathlib.Path],
+    dir_path: Union[str, pathlib.Path],
+    valid_extensions: List[str],
+    delimiter: str = ManifestDelimiter.NEWLINE.value,
+) -> Iterator[ManifestEntry]:
+    """The images listed in the manifest, instead of walking the directory.
+
+    Each record is the path of an image, absolute or relative to dir_path,
+    optionally followed by a tab and the new name of the image.
+    The records are read as a stream, and the images that do not exist, are out of dir_path
+    or have an invalid extension are skipped with a warning as the directory walker does.
+    """
+    dir_path = pathlib.Path(dir_path)
+    absolute_dir_path = dir_path.absolute()
+    extension_index = ExtensionIndex.of(valid_extensions)
+    delimiter_char = ManifestDelimiter(delimiter).char
+
+    stream = sys.stdin if str(manifest) == STDIN else open(manifest, encoding="utf-8", errors="surrogateescape")
+    try:
+        for record in read_records(stream, delimiter=delimiter_char):
+            entry = parse_record(record, delimiter=delimiter_char)
+            if entry is None:
+                continue
+            # the images are given relative to dir_path as the directory walker gives them.
+            if entry.path.is_absolute():
+                relative_path = pathlib.Path(os.path.relpath(entry.path, absolute_dir_path))
+            else:
+                relative_path = pathlib.Path(os.path.normpath(entry.path))
+            image_path = dir_path / relative_path
+            if not extension_index.match(image_path.name):
+                reporter.warning(f"'{image_path}' is invalid extension.")
+                continue
+            # "." has no parts, it is dir_path itself.
+            if not relative_path.parts or relative_path.parts[0] == os.pardir:
+                reporter.warning(f"'{entry.path}' is skipped. It is not in '{dir_path}'.")
+                continue
+            if not os.path.isfile(image_path):
+                reporter.warning(f"'{image_path}' is skipped. It does not exist.")
+                continue
+            if entry.new_name is not None and (not entry.new_name or os.sep in entry.new_name or "/" in entry.new_name):
+                reporter.warning(f"'{image_path}' is skipped. The new name '{entry.new_name}' is not a file name.")
+                continue
+            yield ManifestEntry(path=image_path, new_name=entry.new_name)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
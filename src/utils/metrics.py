@@ -0,0 +1,62 @@
+import contextlib
+import threading
+import time
+from typing import Dict, Iterator, List
+
+
+class OperationMetrics:
+    """The counts and the latencies of the file operations of a task, safe to use from threads.
+
+    On a network filesystem each operation is mostly a round trip,
+    so the throughput in ops/s against the mean latency shows how well the round trips overlap.
+    """
+
+    def __init__(self) -> None:
+        self.counts: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, seconds=time.monotonic() - started_at)
+            with self._lock:
+                self.in_flight -= 1
+
+    def add(self, name: str, count: int = 1, seconds: float = 0.0) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + count
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def rate(self, name: str) -> float:
+        """ops per second of the wall clock time"""
+        elapsed = self.elapsed
+        return self.counts.get(name, 0) / elapsed if elapsed > 0 else 0.0
+
+    def mean_latency(self, name: str) -> float:
+        """seconds an operation"""
+        count = self.counts.get(name, 0)
+        return self.seconds.get(name, 0.0) / count if count else 0.0
+
+    def summary(self) -> List[str]:
+        """e.g. ['transfer: 1000 ops 850.3 ops/s, mean latency 4.7ms', 'max in flight: 4']"""
+        lines = [
+            f"{name}: {count} ops {self.rate(name):.1f} ops/s, mean latency {self.mean_latency(name) * 1000:.1f}ms"
+            for name, count in self.counts.items()
+        ]
+        if self.counts:
+            lines.append(f"max in flight: {self.max_in_flight}")
+        return lines
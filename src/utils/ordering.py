@@ -0,0 +1,159 @@
+import enum
+import heapq
+import itertools
+import json
+import os
+import pathlib
+import re
+import time
+from operator import itemgetter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from utils.manifest import ManifestEntry
+
+# The number of images sorted in memory at once. The sorted chunks are merged from temporary files.
+SORT_CHUNK_SIZE = 100000
+
+# EXIF tags of the capture time.
+EXIF_IFD = 0x8769
+DATE_TIME_ORIGINAL = 36867
+DATE_TIME = 306
+EXIF_TIME_FORMAT = "%Y:%m:%d %H:%M:%S"
+
+DIGITS_PATTERN = re.compile(r"(\d+)")
+
+Image = TypeVar("Image", pathlib.Path, ManifestEntry)
+
+
+class ImageOrder(enum.Enum):
+    # the order of the directory listing, which depends on the filesystem.
+    NONE = "none"
+    # image2.png comes before image10.png.
+    NATURAL = "natural"
+    MTIME = "mtime"
+    # the capture time in EXIF, or the modification time of the images without it.
+    EXIF = "exif"
+    SIZE = "size"
+
+    @classmethod
+    def values(cls) -> List[str]:
+        return [var.value for var in cls]
+
+
+def natural_key(text: str) -> List[Union[str, int]]:
+    """The numbers in the text are compared as numbers and the rest is compared case-insensitively.
+    The text itself is the last item, so different texts never have the same key.
+    >>> sorted(["img10.png", "IMG2.png", "img2.png"], key=natural_key)
+    ['IMG2.png', 'img2.png', 'img10.png']
+    """
+    # the parts at odd indices are always the numbers, so the keys of any texts can be compared.
+    parts: List[Union[str, int]] = [
+        int(part) if index % 2 else part.casefold() for index, part in enumerate(DIGITS_PATTERN.split(text))
+    ]
+    parts.append(text)
+    return parts
+
+
+def capture_time_of(path: str) -> str:
+    """The capture time of the image in the EXIF format. e.g. 2023:01:31 12:00:00"""
+    # Pillow is imported only when the images are ordered by the capture time.
+    from PIL import Image as PILImage
+
+    value = None
+    try:
+        with PILImage.open(path) as image:
+            exif = image.getexif()
+            value = exif.get_ifd(EXIF_IFD).get(DATE_TIME_ORIGINAL) or exif.get(DATE_TIME)
+    except Exception:
+        # Pillow raises various errors for a broken EXIF block or an oversized image such as DecompressionBombError.
+        pass
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return time.strftime(EXIF_TIME_FORMAT, time.localtime(os.stat(path).st_mtime))
+
+
+SORT_KEYS: Dict[ImageOrder, Callable[[str], list]] = {
+    ImageOrder.NATURAL: lambda path: [natural_key(path)],
+    ImageOrder.MTIME: lambda path: [os.stat(path).st_mtime_ns, natural_key(path)],
+    ImageOrder.EXIF: lambda path: [capture_time_of(path), natural_key(path)],
+    ImageOrder.SIZE: lambda path: [os.stat(path).st_size, natural_key(path)],
+}
+
+# the sort key, the path and the new name of the manifest.
+Record = Tuple[list, str, Optional[str]]
+
+
+def records_of(images: Iterable[Image], order: ImageOrder) -> Iterator[Record]:
+    sort_key = SORT_KEYS[order]
+    for image in images:
+        if isinstance(image, ManifestEntry):
+            path, new_name = str(image.path), image.new_name
+        else:
+            path, new_name = str(image), None
+        yield sort_key(path), path, new_name
+
+
+def write_chunk(records: List[Record], dir_path: str, index: int) -> str:
+    chunk_path = os.path.join(dir_path, f"{index}.jsonl")
+    # json escapes the undecodable characters of the paths.
+    with open(chunk_path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+    return chunk_path
+
+
+def read_chunk(chunk_path: str) -> Iterator[Any]:
+    with open(chunk_path, encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def sort_images(
+    images: Iterable[Image], order: str = ImageOrder.NONE.value, chunk_size: int = SORT_CHUNK_SIZE
+) -> Iterator[Image]:
+    """Yield the images in the order, which is the same on any filesystem and on every run.
+
+    Up to chunk_size images are sorted in memory.
+    More images are sorted by chunks, the sorted chunks are written to temporary files,
+    and the chunks are merged, so the memory stays bounded for millions of images.
+    The images of the manifest keep their new names.
+    """
+    image_order = ImageOrder(order)
+    if image_order is ImageOrder.NONE:
+        yield from images
+        return
+
+    records = records_of(images, image_order)
+    chunk = sorted(itertools.islice(records, chunk_size), key=itemgetter(0))
+    if len(chunk) < chunk_size:
+        # all images fit in memory.
+        for _, path, new_name in chunk:
+            yield _image_of(path, new_name)
+        return
+
+    # the temporary files are needed only for more images than a chunk.
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="ic_sort_") as temp_dir:
+        chunk_paths: List[str] = []
+        while chunk:
+            chunk_paths.append(write_chunk(chunk, temp_dir, len(chunk_paths)))
+            chunk = sorted(itertools.islice(records, chunk_size), key=itemgetter(0))
+        for _, path, new_name in heapq.merge(*(read_chunk(p) for p in chunk_paths), key=itemgetter(0)):
+            yield _image_of(path, new_name)
+
+
+def _image_of(path: str, new_name: Optional[str]) -> Any:
+    if new_name is not None:
+        return ManifestEntry(path=pathlib.Path(path), new_name=new_name)
+    return pathlib.Path(path)
@@ -0,0 +1,210 @@
+import enum
+import functools
+import os
+import pathlib
+import re
+from typing import Dict, List, Optional, Pattern, Sequence, Set, Tuple, Union
+
+# The word before the replacement and the word after the replacement are separated by this character in a rule.
+RULE_SEPARATOR = "\t"
+
+# NUL separates the names replaced at once (see lib.transform.BATCH_DELIMITER),
+# and a path separator would move the image to another directory.
+FORBIDDEN_CHARS = frozenset({"\0", os.sep, "/"})
+
+Rule = Tuple[str, str]
+
+
+class ReplacementMode(enum.Enum):
+    # each rule is applied to the result of the previous rules. see Rename.replace_word
+    SUCCESSIVE = "successive"
+    # all rules are applied to the original name at once, and the longest word wins at a position.
+    SIMULTANEOUS = "simultaneous"
+
+    @classmethod
+    def values(cls) -> List[str]:
+        return [var.value for var in cls]
+
+
+def read_rules(path: Union[str, pathlib.Path]) -> List[Rule]:
+    """Read the replacement rules from a file.
+    Each line is a word before the replacement and a word after the replacement separated by a tab.
+    The word after the replacement may be empty to remove the word. Empty lines are skipped.
+    The words cannot contain a NUL character or a path separator.
+    """
+    rules = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.rstrip("\r\n")
+            if not line:
+                continue
+            before, separator, after = line.partition(RULE_SEPARATOR)
+            if not separator or not before or RULE_SEPARATOR in after:
+                raise ValueError(f'Line {line_number} of "{path}" is not "<before>\\t<after>".')
+            if FORBIDDEN_CHARS.intersection(before + after):
+                raise ValueError(f'Line {line_number} of "{path}" contains a NUL character or a path separator.')
+            rules.append((before, after))
+    return rules
+
+
+class RuleGroup:
+    """Consecutive rules which cannot affect each other.
+
+    The occurrences of a word in a text can share a character with the occurrences of another word
+    if one word contains the other, or a suffix of one word is a prefix of the other.
+    The substrings, the prefixes and the suffixes of the words of the group are indexed,
+    so checking a rule takes time in the length of the rule, not in the number of rules of the group.
+    """
+
+    def __init__(self) -> None:
+        self.rules: List[Rule] = []
+        self.words: Set[str] = set()
+        self.substrings: Set[str] = set()
+        self.prefixes: Set[str] = set()
+        self.suffixes: Set[str] = set()
+
+    def can_overlap(self, word: str) -> bool:
+        """Whether the word can overlap a word of the group.
+        >>> group = RuleGroup()
+        >>> group.add("ab", "cd")
+        >>> group.can_overlap("bx"), group.can_overlap("xc"), group.can_overlap("x")
+        (True, True, False)
+        """
+        if word in self.substrings or "" in self.words:
+            return True
+        size = len(word)
+        return (
+            any(word[start:end] in self.words for start in range(size) for end in range(start + 1, size + 1))
+            or any(word[:end] in self.suffixes for end in range(1, size))
+            or any(word[start:] in self.prefixes for start in range(size))
+        )
+
+    def add(self, before: str, after: str) -> None:
+        self.rules.append((before, after))
+        for word in (before, after):
+            size = len(word)
+            self.words.add(word)
+            self.substrings.update(word[start:end] for start in range(size) for end in range(start + 1, size + 1))
+            self.prefixes.update(word[:end] for end in range(1, size))
+            self.suffixes.update(word[start:] for start in range(size))
+
+
+def trie_pattern(words: Sequence[str]) -> str:
+    """A regular expression matching the longest of the words at a position.
+    The words sharing a prefix share a branch, so the expression checks each character once
+    instead of trying the words one by one.
+    >>> trie_pattern(["cat", "car", "cart"])
+    'ca(?:r(?:t)?|t)'
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def pattern_of(node: dict) -> str:
+        branches = [re.escape(char) + pattern_of(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # a word ends here. The greedy ? tries the longer words first.
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return pattern_of(trie)
+
+
+class MultiReplacer:
+    """Apply many replacement rules with few passes over the text.
+
+    With the successive mode, the result is the same as str.replace for each rule in order,
+    but the consecutive rules which cannot affect each other are applied in one pass of a regular expression,
+    so the cost of a name does not grow with the number of rules.
+    Two rules cannot affect each other when the words before the replacement cannot overlap,
+    and the word before the replacement of the later rule cannot overlap the word after the replacement
+    of the earlier rule.
+
+    >>> MultiReplacer([("a", "b"), ("b", "c")]).replace("abc")
+    'ccc'
+    >>> MultiReplacer([("a", "b"), ("b", "c")], mode="simultaneous").replace("abc")
+    'bcc'
+    """
+
+    def __init__(self, rules: Sequence[Rule], mode: str = ReplacementMode.SUCCESSIVE.value):
+        self.rules = list(rules)
+        self.mode = ReplacementMode(mode)
+        # a str.replace or a regular expression with the words after the replacement.
+        self.passes: List[Tuple[Union[str, Pattern], Union[str, Dict[str, str]]]] = []
+        if self.mode is ReplacementMode.SIMULTANEOUS:
+            # an empty word matches everywhere and is not a word.
+            self._add_pass([rule for rule in self.rules if rule[0]])
+        else:
+            for group in self._groups():
+                self._add_pass(group)
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def of(cls, rules: Tuple[Rule, ...], mode: str = ReplacementMode.SUCCESSIVE.value) -> "MultiReplacer":
+        """The replacer of the rules compiled once for a task."""
+        return cls(rules, mode=mode)
+
+    def _groups(self) -> List[List[Rule]]:
+        """Split the rules into the groups of consecutive rules which cannot affect each other."""
+        groups: List[List[Rule]] = []
+        group = RuleGroup()
+        for before, after in self.rules:
+            # an empty word inserts the word after the replacement between all characters, so it is not grouped.
+            if group.rules and (not before or group.can_overlap(before)):
+                groups.append(group.rules)
+                group = RuleGroup()
+            group.add(before, after)
+            if not before:
+                groups.append(group.rules)
+                group = RuleGroup()
+        if group.rules:
+            groups.append(group.rules)
+        return groups
+
+    def _add_pass(self, rules: List[Rule]) -> None:
+        if not rules:
+            return
+        if len(rules) == 1:
+            self.passes.append(rules[0])
+            return
+        replacements: Dict[str, str] = {}
+        for before, after in rules:
+            # the first rule of the same word wins.
+            replacements.setdefault(before, after)
+        self.passes.append((re.compile(trie_pattern(list(replacements))), replacements))
+
+    def replace(self, text: str) -> str:
+        for pattern, replacement in self.passes:
+            if isinstance(pattern, str):
+                text = text.replace(pattern, replacement)  # type: ignore
+            else:
+                text = pattern.sub(lambda match: replacement[match.group()], text)  # type: ignore
+        return text
+
+    def __len__(self) -> int:
+        """The number of passes over the text."""
+        return len(self.passes)
+
+
+@functools.lru_cache(maxsize=None)
+def cached_rules(path: str) -> Tuple[Rule, ...]:
+    """The rules of the file read once for a task, not for each image."""
+    return tuple(read_rules(path))
+
+
+def rules_of(
+    chars_before_replacement: Sequence[str],
+    chars_after_replacement: Sequence[str],
+    replacement_rules: Optional[Union[str, pathlib.Path]] = None,
+) -> Tuple[Rule, ...]:
+    """The rules of the command line followed by the rules of the file."""
+    # If the number of contents in the two arrays do not match,
+    # the larger portion of the array is not processed.
+    rules = list(zip(chars_before_replacement, chars_after_replacement))
+    if replacement_rules:
+        rules += cached_rules(str(replacement_rules))
+    return tuple(rules)
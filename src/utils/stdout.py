@@ -1,5 +1,7 @@
-from enum import Enum
-from typing import List
+import sys
+import time
+from enum import Enum, IntEnum
+from typing import IO, List, Optional
 
 from utils.exception import get_exception_message
 
@@ -26,6 +28,174 @@ class Bcolors(Enum):
         return [var.value for var in cls]
 
 
+class Verbosity(IntEnum):
+    # errors only
+    QUIET = 0
+    # a progress line and the summary instead of a message for each file
+    PROGRESS = 1
+    # a message for each file
+    NORMAL = 2
+
+    @classmethod
+    def names(cls) -> List[str]:
+        return [var.name.lower() for var in cls]
+
+
+class Reporter:
+    """Write messages of a task to the standard output.
+
+    Messages are buffered and written in blocks of buffer_lines lines,
+    because writing and flushing a message for each file is slow
+    when a large number of files are processed or the output is piped to a file.
+    Colors are disabled automatically when the output is not a terminal.
+    """
+
+    # seconds between updates of the progress line.
+    PROGRESS_INTERVAL = 0.5
+
+    def __init__(
+        self,
+        verbosity: Verbosity = Verbosity.NORMAL,
+        buffer_lines: int = 1,
+        color: Optional[bool] = None,
+        stream: Optional[IO[str]] = None,
+    ):
+        self.verbosity = verbosity
+        self.buffer_lines = buffer_lines
+        self.color = color
+        # sys.stdout is looked up when writing, because it may be replaced after the reporter is created.
+        self.stream = stream
+        self.buffer: List[str] = []
+
+        self.total: Optional[int] = None
+        self.done = 0
+        self.warnings = 0
+        self.started_at = time.monotonic()
+        self.progress_written_at = 0.0
+
+    def configure(
+        self,
+        verbosity: Optional[Verbosity] = None,
+        buffer_lines: Optional[int] = None,
+        color: Optional[bool] = None,
+        stream: Optional[IO[str]] = None,
+    ) -> None:
+        self.flush()
+        if verbosity is not None:
+            self.verbosity = verbosity
+        if buffer_lines is not None:
+            self.buffer_lines = buffer_lines
+        if color is not None:
+            self.color = color
+        if stream is not None:
+            self.stream = stream
+
+    @property
+    def output(self) -> IO[str]:
+        return self.stream or sys.stdout
+
+    @property
+    def is_colored(self) -> bool:
+        if self.color is not None:
+            return self.color
+        isatty = getattr(self.output, "isatty", None)
+        return bool(isatty and isatty())
+
+    def style(self, style: str, sentence: str) -> str:
+        if not self.is_colored or not style:
+            return sentence
+        return f"{style}{sentence}{Bcolors.ENDC.value}"
+
+    def report(self, style: str, sentence: str, verbosity: Verbosity = Verbosity.NORMAL) -> None:
+        """Add a message to the buffer if the verbosity of the reporter is equal to or higher than the given one."""
+        if self.verbosity < verbosity:
+            return
+        self.buffer.append(self.style(style, sentence))
+        if len(self.buffer) >= self.buffer_lines:
+            self.flush()
+
+    def warning(self, sentence: str) -> None:
+        self.warnings += 1
+        self.report(Bcolors.WARNING.value, sentence)  # type: ignore
+
+    def error(self, sentence: str) -> None:
+        self.report(Bcolors.FAIL.value, sentence, verbosity=Verbosity.QUIET)  # type: ignore
+        self.flush()
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        self.output.write("\n".join(self.buffer) + "\n")
+        self.output.flush()
+        self.buffer = []
+
+    def start(self, total: Optional[int] = None) -> None:
+        """Start counting the progress of processing total files."""
+        self.total = total
+        self.done = 0
+        self.started_at = time.monotonic()
+        self.progress_written_at = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def rate(self) -> float:
+        """files per second"""
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """seconds to finish, or None when the total is unknown."""
+        if self.total is None or self.rate == 0:
+            return None
+        return max(self.total - self.done, 0) / self.rate
+
+    @property
+    def progress(self) -> str:
+        """e.g. '120/1000 files 240.0 files/s ETA 3.7s'"""
+        total = f"/{self.total}" if self.total is not None else ""
+        eta = f" ETA {self.eta:.1f}s" if self.eta is not None else ""
+        return f"{self.done}{total} files {self.rate:.1f} files/s{eta}"
+
+    def advance(self, count: int = 1) -> None:
+        """Count processed files and update the progress line at most once per PROGRESS_INTERVAL."""
+        self.done += count
+        if self.verbosity != Verbosity.PROGRESS:
+            return
+        now = time.monotonic()
+        if now - self.progress_written_at < self.PROGRESS_INTERVAL and self.done != self.total:
+            return
+        self.progress_written_at = now
+        self.flush()
+        if self.is_colored:
+            # overwrite the progress line on a terminal.
+            self.output.write(f"\r{self.style(Bcolors.OKGREEN.value, self.progress)}")  # type: ignore
+        else:
+            self.output.write(f"{self.progress}\n")
+        self.output.flush()
+
+    def summary(self, task_name: str = "") -> None:
+        """Write the counts and the rate of the task."""
+        if self.verbosity == Verbosity.PROGRESS and self.is_colored:
+            # end the progress line.
+            self.output.write("\n")
+        task_name = f"{task_name}: " if task_name else ""
+        warnings = f", {self.warnings} warnings" if self.warnings else ""
+        self.report(
+            Bcolors.OKBLUE.value,  # type: ignore
+            f"{task_name}{self.done} files in {self.elapsed:.2f}s ({self.rate:.1f} files/s){warnings}",
+            verbosity=Verbosity.PROGRESS,
+        )
+        self.flush()
+
+
+# The reporter shared by the tasks. It is configured from the arguments of the command.
+reporter = Reporter()
+
+
 def styled_stdout(style: Bcolors = Bcolors.NONE.value, sentence: str = "") -> None:  # type:ignore
     """
     :param style: Bcolors.WARNING etc.
@@ -36,5 +206,7 @@ def styled_stdout(style: Bcolors = Bcolors.NONE.value, sentence: str = "") -> No
 
 
 def stdout_exception_message(exception: Exception) -> None:
-    message = get_exception_message(exception)
-    styled_stdout(Bcolors.FAIL.value, message)  # type:ignore
+    """Write the message of the exception through the reporter after the messages buffered before it,
+    so it is written at any verbosity and without colors when the output is not a terminal.
+    """
+    reporter.error(get_exception_message(exception))
@@ -0,0 +1,102 @@
+import enum
+import os
+import pathlib
+import shutil
+from typing import Callable, Dict, List, Union
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None  # type: ignore
+
+# ioctl request number of FICLONE on linux. (btrfs, xfs etc.)
+FICLONE = 0x40049409
+
+
+class LinkMode(enum.Enum):
+    """How an image is written to the destination.
+    The modes are ordered from the cheapest to the most expensive,
+    and if the chosen mode is not supported, the next one is tried.
+    """
+
+    HARDLINK = "hardlink"
+    REFLINK = "reflink"
+    COPY = "copy"
+
+    @classmethod
+    def values(cls) -> List[str]:
+        return [var.value for var in cls]
+
+
+def hardlink(src: pathlib.Path, dst: pathlib.Path) -> None:
+    """Create a hard link. No data is written, but the destination shares
+    the inode with the source, so editing one of them changes the other.
+    An OSError is raised if the source and the destination are on different filesystems.
+    """
+    os.link(src, dst)
+
+
+def reflink(src: pathlib.Path, dst: pathlib.Path) -> None:
+    """Create a copy-on-write clone where the kernel supports it (FICLONE),
+    otherwise let the kernel copy the data with copy_file_range,
+    which does not pass through user space and clones on some filesystems.
+    """
+    if fcntl is None and not hasattr(os, "copy_file_range"):
+        raise OSError(f"reflink is not supported on this platform. {src}")
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            if fcntl is None:
+                raise OSError("FICLONE is not supported.")
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            if not hasattr(os, "copy_file_range"):
+                raise
+            _copy_file_range(fsrc.fileno(), fdst.fileno(), os.fstat(fsrc.fileno()).st_size)
+    shutil.copystat(src, dst)
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, size: int) -> None:
+    """An OSError is raised if fewer bytes than the size are copied,
+    e.g. the source is truncated while it is copied, so the caller falls back to the next mode.
+    """
+    copied = 0
+    while copied < size:
+        sent = os.copy_file_range(src_fd, dst_fd, size - copied)  # type: ignore
+        if sent == 0:
+            raise OSError(f"copy_file_range copied {copied} of {size} bytes.")
+        copied += sent
+
+
+def copy(src: pathlib.Path, dst: pathlib.Path) -> None:
+    """Copy the data and the metadata of the image."""
+    shutil.copy2(str(src), str(dst))
+
+
+LINK_FUNCTIONS: Dict[LinkMode, Callable[[pathlib.Path, pathlib.Path], None]] = {
+    LinkMode.HARDLINK: hardlink,
+    LinkMode.REFLINK: reflink,
+    LinkMode.COPY: copy,
+}
+
+
+def transfer(src: pathlib.Path, dst: pathlib.Path, mode: Union[str, LinkMode] = LinkMode.COPY) -> LinkMode:
+    """Output the source image to the destination path with the given mode,
+    falling back to the more expensive modes when it is not supported.
+    The existing destination file is overwritten as Path.replace does.
+    :return: the mode actually used.
+    """
+    # missing_ok, since another task may remove the same file at the same time.
+    dst.unlink(missing_ok=True)
+
+    link_modes = list(LinkMode)
+    for link_mode in link_modes[link_modes.index(LinkMode(mode)) :]:
+        try:
+            LINK_FUNCTIONS[link_mode](src, dst)
+            return link_mode
+        except OSError:
+            if link_mode is LinkMode.COPY:
+                raise
+            # a partially written clone.
+            dst.unlink(missing_ok=True)
+    return LinkMode.COPY  # pragma: no cover
@@ -3,30 +3,52 @@ import sys
 from contextlib import contextmanager
 
 from utils import datetime2str
-from utils.stdout import Bcolors, styled_stdout
+from utils.stdout import Bcolors, Verbosity, reporter
+
+# The number of lines written at once by the reporter while a task runs.
+REPORTER_BUFFER_LINES = 256
 
 
 @contextmanager
 def add_extra_arguments_to(arg_parser):
-    # __enter__
-    try:
-        arg_parser.add_argument(
-            "dir_path",
-            type=str,
-            help="e.g. /Users/macbook/images. " "please do not include unavailable characters in the directory name.",
-        )
-        arg_parser.add_argument("-r", "--run", action="store_true")
-        yield arg_parser
+    """Add the arguments common to the tasks.
+    The arguments are parsed once by the caller and shown with print_arguments.
+    """
+    arg_parser.add_argument(
+        "dir_path",
+        type=str,
+        help="e.g. /Users/macbook/images. " "please do not include unavailable characters in the directory name.",
+    )
+    arg_parser.add_argument("-r", "--run", action="store_true")
+    arg_parser.add_argument(
+        "-v",
+        "--verbosity",
+        type=str,
+        choices=Verbosity.names(),
+        help="quiet: errors only. progress: a progress line and the summary. normal: a message for each image.",
+        default=Verbosity.NORMAL.name.lower(),
+    )
+    yield arg_parser
 
-    # __exit__
-    finally:
-        args, unknown = arg_parser.parse_known_args()
 
-        input_args = "\n".join(sys.argv)
-        task_settings = "\n".join([f"{k}? {v}" for k, v in args.__dict__.items()])
+def verbosity_of(args) -> Verbosity:
+    return Verbosity[getattr(args, "verbosity", Verbosity.NORMAL.name).upper()]
+
 
-        styled_stdout(Bcolors.OKCYAN.value, f"\nINPUT COMMANDS\n{input_args}\n")
-        styled_stdout(Bcolors.OKCYAN.value, f"ARGUMENTS\n{task_settings}\n")
+def print_arguments(args) -> None:
+    """Show the command line and the parsed arguments at the beginning of a task.
+    They are not shown with --verbosity quiet or progress.
+    It is called before the task configures the reporter, so the verbosity of the arguments is applied here.
+    """
+    input_args = "\n".join(sys.argv)
+    task_settings = "\n".join([f"{k}? {v}" for k, v in args.__dict__.items()])
+
+    verbosity = reporter.verbosity
+    reporter.configure(verbosity=verbosity_of(args))
+    reporter.report(Bcolors.OKCYAN.value, f"\nINPUT COMMANDS\n{input_args}\n")  # type: ignore
+    reporter.report(Bcolors.OKCYAN.value, f"ARGUMENTS\n{task_settings}\n")  # type: ignore
+    # the lines are flushed.
+    reporter.configure(verbosity=verbosity)
 
 
 @contextmanager
@@ -35,14 +57,23 @@ def task(args, task_name=""):
     output log at the beginning and end of a task.
     """
     # __enter__
+    verbosity, buffer_lines = reporter.verbosity, reporter.buffer_lines
     try:
         run = args.run
-        styled_stdout(Bcolors.HEADER.value, f"{datetime2str()}: {task_name} task starts. [RUN: {run}]")
+        # load the environment variables from .env only when a task runs, not on --help or on import.
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        reporter.configure(verbosity=verbosity_of(args), buffer_lines=REPORTER_BUFFER_LINES)
+        starts = f"{datetime2str()}: {task_name} task starts. [RUN: {run}]"
+        reporter.report(Bcolors.HEADER.value, starts)  # type: ignore
         yield args
 
     # __exit__
     finally:
-        styled_stdout(Bcolors.HEADER.value, f"{datetime2str()}: {task_name} task ends. [RUN: {run}]")
+        ends = f"{datetime2str()}: {task_name} task ends. [RUN: {run}]"
+        reporter.report(Bcolors.HEADER.value, ends)  # type: ignore
+        reporter.configure(verbosity=verbosity, buffer_lines=buffer_lines)
 
 
 @contextmanager